@@ -0,0 +1,417 @@
+import email
+import gzip
+import json
+import multiprocessing
+import random
+import re
+import requests
+import threading
+import time
+import uuid
+from collections import Counter
+from dateutil.parser import parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+# Event fields Google Calendar returns on top of the ones sent by the client
+SERVER_EVENT_FIELDS = {
+    "kind": "calendar#event",
+    "creator": {"email": "user@example.com", "self": True},
+    "organizer": {"email": "calendar@group.calendar.google.com", "displayName": "Todoist Tasks", "self": True},
+    "eventType": "default",
+    "sequence": 0,
+}
+
+CALENDAR_PATH = re.compile(r"^/calendar/v3/calendars/(?P<calendar>[^/]+)/events(?:/(?P<event>[^/]+))?$")
+
+
+class FakeApiState:
+    """
+    In-memory state of the fake Todoist and Google Calendar APIs.
+
+    Attributes:
+        tasks (Dict[str, Dict[str, Any]]): Todoist tasks keyed by ID, in REST API format.
+        calendars (Dict[str, Dict[str, Any]]): Calendars keyed by ID.
+        events (Dict[str, Dict[str, Dict[str, Any]]]): Events keyed by calendar ID and event ID.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, retry_after: float = 0.0, seed: int = 0) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.task_versions: Dict[str, int] = {}
+        self.calendars: Dict[str, Dict[str, Any]] = {}
+        self.events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.event_versions: Dict[str, Dict[str, int]] = {}
+        self.version = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.calls: Counter = Counter()
+        self.http_requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": dict(self.calls),
+            "api_calls": sum(count for key, count in self.calls.items() if not key.startswith("POST /batch")),
+            "http_requests": self.http_requests,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+    def next_version(self) -> int:
+        self.version += 1
+        return self.version
+
+    def should_throttle(self) -> bool:
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    # Todoist
+
+    def put_task(self, task: Dict[str, Any]) -> None:
+        with self.lock:
+            self.tasks[task["id"]] = task
+            self.task_versions[task["id"]] = self.next_version()
+
+    @staticmethod
+    def _item(task: Dict[str, Any]) -> Dict[str, Any]:
+        # Tasks are returned by the Sync API and the tasks endpoint with the due time in 'date'
+        due = dict(task["due"], date=task["due"].get("datetime") or task["due"]["date"]) if task.get("due") else None
+        return dict(task, due=due, checked=task.get("is_completed", False))
+
+    def sync_items(self, sync_token: str) -> Dict[str, Any]:
+        since = 0 if sync_token == "*" else int(sync_token)
+        items = [self._item(self.tasks[task_id]) for task_id, version in self.task_versions.items() if version > since]
+        return {"items": items, "sync_token": str(self.version), "full_sync": since == 0}
+
+    def list_tasks(self, query: Dict[str, str]) -> Dict[str, Any]:
+        active = [task for task in self.tasks.values() if not task.get("is_completed")]
+        offset = int(query.get("cursor") or 0)
+        limit = min(int(query.get("limit") or 50), 200)
+        next_offset = offset + limit
+        return {
+            "results": [self._item(task) for task in active[offset:next_offset]],
+            "next_cursor": str(next_offset) if next_offset < len(active) else None,
+        }
+
+    # Google Calendar
+
+    def list_events(self, calendar_id: str, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        versions = self.event_versions.get(calendar_id, {})
+        events = self.events.get(calendar_id, {})
+        sync_token = query.get("syncToken")
+        since = int(sync_token) if sync_token else None
+        time_min = parse(query["timeMin"]) if query.get("timeMin") else None
+        time_max = parse(query["timeMax"]) if query.get("timeMax") else None
+        private_filters = [value.split("=", 1) for value in query.get("privateExtendedProperty", [])]
+
+        matching = []
+        for event_id in sorted(events, key=versions.get):
+            event = events[event_id]
+            if since is not None:
+                if versions[event_id] <= since:
+                    continue
+            elif event.get("status") == "cancelled":
+                continue
+            if time_min and _event_time(event["end"]) <= time_min:
+                continue
+            if time_max and _event_time(event["start"]) >= time_max:
+                continue
+            private = event.get("extendedProperties", {}).get("private", {})
+            if any(private.get(name) != value for name, value in private_filters):
+                continue
+            matching.append(event)
+
+        offset = int(query.get("pageToken") or 0)
+        page_size = min(int(query.get("maxResults") or 250), 2500)
+        page = matching[offset:offset + page_size]
+        response: Dict[str, Any] = {"kind": "calendar#events", "summary": "Todoist Tasks", "items": page}
+        if offset + page_size < len(matching):
+            response["nextPageToken"] = str(offset + page_size)
+        else:
+            response["nextSyncToken"] = str(self.version)
+        return 200, response
+
+    def write_event(self, calendar_id: str, event_id: Optional[str], method: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        events = self.events.setdefault(calendar_id, {})
+        versions = self.event_versions.setdefault(calendar_id, {})
+        existing = events.get(event_id) if event_id else None
+
+        if method == "POST":
+            event_id = body.get("id") or uuid.uuid4().hex
+            if event_id in events:
+                return 409, _error(409, "The requested identifier already exists.", "duplicate")
+            event = {**SERVER_EVENT_FIELDS, **body, "id": event_id, "status": "confirmed"}
+        elif existing is None:
+            return 404, _error(404, "Not Found", "notFound")
+        elif method == "DELETE":
+            if existing.get("status") == "cancelled":
+                return 410, _error(410, "Resource has been deleted", "deleted")
+            event = dict(existing, status="cancelled")
+        elif method == "PATCH":
+            event = _merge(existing, body)
+        else:
+            event = {**SERVER_EVENT_FIELDS, **body, "id": event_id}
+            event.setdefault("status", "confirmed")
+
+        version = self.next_version()
+        event.update({
+            "etag": f'"{version}"',
+            "htmlLink": f"https://www.google.com/calendar/event?eid={event_id}",
+            "iCalUID": f"{event_id}@google.com",
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        })
+        events[event_id] = event
+        versions[event_id] = version
+        return (204, None) if method == "DELETE" else (200, event)
+
+
+def _event_time(event_time: Dict[str, Any]):
+    if "dateTime" not in event_time:
+        return parse(event_time["date"]).replace(tzinfo=ZoneInfo("UTC"))
+    parsed = parse(event_time["dateTime"])
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=ZoneInfo(event_time.get("timeZone") or "UTC"))
+    return parsed
+
+
+def _merge(resource: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Applies patch semantics: nested objects are merged, any other value is replaced."""
+    merged = dict(resource)
+    for name, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(name), dict):
+            merged[name] = _merge(merged[name], value)
+        else:
+            merged[name] = value
+    return merged
+
+
+def _parse_fields(fields: str) -> Dict[str, Any]:
+    """Parses a 'fields' parameter such as 'items(id,start),nextPageToken' into a tree."""
+    tree: Dict[str, Any] = {}
+    stack = [tree]
+    name = ""
+    for character in fields + ",":
+        if character in ",()":
+            if name.strip():
+                stack[-1][name.strip()] = {}
+            if character == "(":
+                stack.append(stack[-1][name.strip()])
+            elif character == ")":
+                stack.pop()
+            name = ""
+        else:
+            name += character
+    return tree
+
+
+def _project(payload: Any, tree: Dict[str, Any]) -> Any:
+    """Keeps only the fields selected by a parsed 'fields' parameter."""
+    if not tree:
+        return payload
+    if isinstance(payload, list):
+        return [_project(item, tree) for item in payload]
+    if not isinstance(payload, dict):
+        return payload
+    return {name: _project(payload[name], subtree) for name, subtree in tree.items() if name in payload}
+
+
+def _error(code: int, message: str, reason: str) -> Dict[str, Any]:
+    return {"error": {"code": code, "message": message, "errors": [{"reason": reason, "message": message}]}}
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """
+    Serves the Todoist REST and Sync APIs and the Google Calendar v3 API from FakeApiState.
+
+    Like Google, it honors the 'fields' parameter and compresses responses with gzip when
+    the client accepts it and its user agent contains 'gzip'.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which Nagle's algorithm would delay by the
+    # client's delayed ACK on every keep-alive request
+    disable_nagle_algorithm = True
+    state: FakeApiState
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def do_PUT(self) -> None:
+        self._handle()
+
+    def do_PATCH(self) -> None:
+        self._handle()
+
+    def do_DELETE(self) -> None:
+        self._handle()
+
+    def _handle(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = urlparse(self.path).path
+
+        if path.startswith("/__"):
+            status, headers, content = self._control(path, body)
+        else:
+            state = self.state
+            if state.latency:
+                time.sleep(state.latency)
+            with state.lock:
+                state.http_requests += 1
+                state.bytes_in += len(body)
+                if path.startswith("/batch/"):
+                    state.calls["POST /batch"] += 1
+                    status, headers, content = self._batch(body)
+                else:
+                    status, headers, content = self._dispatch(self.command, self.path, self.headers, body)
+                if content and "gzip" in self.headers.get("Accept-Encoding", "") \
+                        and "gzip" in self.headers.get("User-Agent", ""):
+                    content = gzip.compress(content)
+                    headers = dict(headers, **{"Content-Encoding": "gzip"})
+                state.bytes_out += len(content)
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _control(self, path: str, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        state = self.state
+        with state.lock:
+            if path == "/__stats":
+                result = state.stats()
+            elif path == "/__reset":
+                state.reset_stats()
+                result = {}
+            elif path == "/__tasks":
+                for task in json.loads(body):
+                    state.put_task(task)
+                result = {"tasks": len(state.tasks)}
+            else:
+                return 404, {}, b""
+        return 200, {"Content-Type": "application/json"}, json.dumps(result).encode("utf-8")
+
+    def _dispatch(self, method: str, target: str, headers: Any, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        state = self.state
+        url = urlparse(target)
+        query = {name: values if name == "privateExtendedProperty" else values[0]
+                 for name, values in parse_qs(url.query).items()}
+        path = url.path
+        match = CALENDAR_PATH.match(path)
+        endpoint = f"{method} {CALENDAR_PATH.sub('/calendar/v3/calendars/{calendar}/events', path)}"
+        if match and match.group("event"):
+            endpoint += "/{event}"
+        state.calls[endpoint] += 1
+
+        if state.should_throttle():
+            status, payload = 429, _error(429, "Rate Limit Exceeded", "rateLimitExceeded")
+            return status, {"Content-Type": "application/json", "Retry-After": str(state.retry_after)}, json.dumps(payload).encode("utf-8")
+
+        payload: Any
+        if path == "/api/v1/tasks":
+            status, payload = 200, state.list_tasks(query)
+        elif path == "/api/v1/sync":
+            form = parse_qs(body.decode("utf-8"))
+            status, payload = 200, state.sync_items(form.get("sync_token", ["*"])[0])
+        elif path == "/calendar/v3/users/me/calendarList":
+            status, payload = 200, {"kind": "calendar#calendarList", "items": list(state.calendars.values())}
+        elif path == "/calendar/v3/calendars" and method == "POST":
+            calendar = dict(json.loads(body), id=f"{uuid.uuid4().hex}@group.calendar.google.com")
+            state.calendars[calendar["id"]] = calendar
+            status, payload = 200, calendar
+        elif match and method == "GET" and not match.group("event"):
+            status, payload = state.list_events(match.group("calendar"), query)
+        elif match:
+            data = json.loads(body) if body else {}
+            status, payload = state.write_event(match.group("calendar"), match.group("event"), method, data)
+        else:
+            status, payload = 404, _error(404, "Not Found", "notFound")
+
+        if query.get("fields") and status < 300:
+            payload = _project(payload, _parse_fields(query["fields"]))
+        content = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        return status, {"Content-Type": "application/json"}, content
+
+    def _batch(self, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+        message = email.message_from_bytes(header + body)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts: List[str] = []
+        for part in message.get_payload():
+            request_line, _, rest = part.get_payload().replace("\r\n", "\n").partition("\n")
+            method, target, _ = request_line.split(" ", 2)
+            head, _, request_body = rest.partition("\n\n")
+            status, headers, content = self._dispatch(method, target, None, request_body.encode("utf-8"))
+            response_headers = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+            content_id = part["Content-ID"][1:-1]
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n{response_headers}\r\n"
+                f"{content.decode('utf-8')}\r\n"
+            )
+        content = ("".join(parts) + f"--{boundary}--\r\n").encode("utf-8")
+        return 200, {"Content-Type": f"multipart/mixed; boundary={boundary}"}, content
+
+
+def _serve(port_queue: "multiprocessing.Queue", latency: float, error_rate: float, retry_after: float) -> None:
+    handler = type("Handler", (FakeApiHandler,), {"state": FakeApiState(latency, error_rate, retry_after)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeApiServer:
+    """
+    Runs the fake APIs in a separate process, so the server's own work and memory do not
+    count towards the measurements of the sync under test.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, retry_after: float = 0.0) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._process: Optional[multiprocessing.Process] = None
+        self.url = ""
+
+    def __enter__(self) -> "FakeApiServer":
+        port_queue: multiprocessing.Queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(port_queue, self.latency, self.error_rate, self.retry_after), daemon=True
+        )
+        self._process.start()
+        self.url = f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+    def _control(self, path: str, payload: Any = None) -> Dict[str, Any]:
+        response = requests.post(f"{self.url}{path}", json=payload, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def add_tasks(self, tasks: List[Dict[str, Any]]) -> None:
+        self._control("/__tasks", tasks)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._control("/__stats")
+
+    def reset_stats(self) -> None:
+        self._control("/__reset")
@@ -0,0 +1,263 @@
+"""
+Runs sync_todoist_to_gcal against local fake Todoist and Google Calendar APIs and reports
+how a run scales with the number of tasks.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--sizes 10 1000 10000] [--latency 0.05] [--error-rate 0.01]
+    python -m benchmarks.run_benchmarks --async [--concurrency 10]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+# Config validates these at import time
+os.environ.setdefault("TIME_ZONE", "UTC")
+os.environ.setdefault("TODOIST_API_KEY", "benchmark")
+
+import httplib2
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document, Resource
+from unittest.mock import patch
+
+from benchmarks.fake_servers import FakeApiServer
+from src.metrics import METRICS
+from src.rate_limiter import RateLimiter
+from src.sync import sync_todoist_to_gcal, sync_todoist_to_gcal_async
+
+
+def make_tasks(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Generates synthetic Todoist tasks in REST API format.
+
+    Parameters:
+        count (int): Number of tasks.
+        seed (int): Seed of the random generator, so workloads are reproducible.
+
+    Returns:
+        List[Dict[str, Any]]: The tasks.
+    """
+    generator = random.Random(seed)
+    start = date(2024, 5, 1)
+    tasks = []
+    for number in range(count):
+        due_date = (start + timedelta(days=generator.randrange(90))).isoformat()
+        due = {"date": due_date, "datetime": None, "timezone": None, "string": due_date, "is_recurring": False}
+        if generator.random() < 0.6:
+            due["datetime"] = f"{due_date}T{generator.randrange(7, 20):02d}:{generator.choice(['00', '30'])}:00"
+        duration = generator.choice(["", " [30m]", " [1h]", " [1h 30m]"])
+        tasks.append({
+            "id": str(8000000000 + number),
+            "content": f"Synthetic task {number}{duration}",
+            "description": "Generated for benchmarking" if generator.random() < 0.3 else "",
+            "project_id": "1",
+            "parent_id": None,
+            "labels": [],
+            "due": due,
+            "duration": None,
+        })
+    return tasks
+
+
+def build_local_service(base_url: str) -> Resource:
+    """
+    Builds a Google Calendar service whose requests, including batches, go to the fake API.
+
+    Parameters:
+        base_url (str): Base URL of the fake API.
+
+    Returns:
+        Resource: The service.
+    """
+    document = json.loads(discovery_cache.get_static_doc("calendar", "v3"))
+    document["rootUrl"] = f"{base_url}/"
+    document["baseUrl"] = f"{base_url}/calendar/v3/"
+    return build_from_document(document, http=httplib2.Http())
+
+
+def run_sync(
+    server: FakeApiServer,
+    state_dir: str,
+    sync_options: Dict[str, Any],
+    gcal_rate: float,
+    use_async: bool = False
+) -> Dict[str, Any]:
+    """
+    Runs one sync against the fake APIs and measures it.
+
+    Parameters:
+        server (FakeApiServer): The running fake APIs.
+        state_dir (str): Directory for the sync's persisted state.
+        sync_options (Dict[str, Any]): Keyword arguments for sync_todoist_to_gcal, or for
+            sync_todoist_to_gcal_async with 'use_async'.
+        gcal_rate (float): Highest rate of Google Calendar requests per second.
+        use_async (bool): If True, run sync_todoist_to_gcal_async.
+
+    Returns:
+        Dict[str, Any]: Wall time, peak memory, the time of each sync phase and the fake
+        APIs' request statistics.
+    """
+    thread_services = threading.local()
+
+    def get_thread_service(credentials: Any) -> Resource:
+        if not hasattr(thread_services, "service"):
+            thread_services.service = build_local_service(server.url)
+        return thread_services.service
+
+    gcal_limiter = RateLimiter(gcal_rate, base_delay=0.05)
+    todoist_limiter = RateLimiter(1000, base_delay=0.05)
+    patches = [
+        patch("config.settings.Config.STATE_DIR", state_dir),
+        patch("src.gcal_client.gcal_rate_limiter", return_value=gcal_limiter),
+        patch("src.todoist_client.todoist_rate_limiter", return_value=todoist_limiter),
+        patch("src.async_client.gcal_rate_limiter", return_value=gcal_limiter),
+        patch("src.async_client.todoist_rate_limiter", return_value=todoist_limiter),
+        patch("src.async_client.GCAL_API_URL", f"{server.url}/calendar/v3"),
+        patch("src.async_client.TODOIST_TASKS_URL", f"{server.url}/api/v1/tasks"),
+        patch("src.todoist_client.TODOIST_SYNC_URL", f"{server.url}/api/v1/sync"),
+        patch("src.todoist_client.TODOIST_TASKS_URL", f"{server.url}/api/v1/tasks"),
+        patch("src.sync.get_google_credentials", return_value=None),
+        patch("src.sync.create_gcal_service", lambda credentials=None: build_local_service(server.url)),
+        patch("src.sync.get_thread_gcal_service", get_thread_service),
+    ]
+
+    server.reset_stats()
+    with contextlib.ExitStack() as stack:
+        for active_patch in patches:
+            stack.enter_context(active_patch)
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        tracemalloc.start()
+        started = time.perf_counter()
+        if use_async:
+            asyncio.run(sync_todoist_to_gcal_async(**sync_options))
+        else:
+            sync_todoist_to_gcal(**sync_options)
+        elapsed = time.perf_counter() - started
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return dict(server.stats(), wall_time=elapsed, peak_memory=peak_memory, phases=METRICS.summary()["phases"])
+
+
+def reschedule_tasks(tasks: List[Dict[str, Any]], fraction: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Moves the due time of a fraction of the tasks an hour later.
+
+    Parameters:
+        tasks (List[Dict[str, Any]]): The tasks, as generated by make_tasks.
+        fraction (float): Fraction of the tasks to move.
+
+    Returns:
+        List[Dict[str, Any]]: The moved tasks.
+    """
+    moved = []
+    for task in tasks[:max(1, int(len(tasks) * fraction))]:
+        due = dict(task["due"])
+        if due["datetime"]:
+            hour = int(due["datetime"][11:13]) + 1
+            due["datetime"] = f"{due['datetime'][:11]}{hour:02d}{due['datetime'][13:]}"
+        else:
+            due["datetime"] = f"{due['date']}T10:00:00"
+        moved.append(dict(task, due=due))
+    return moved
+
+
+def benchmark(size: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Runs a cold sync, a sync with no changes, and a sync after a tenth of the tasks were
+    rescheduled, for a synthetic workload.
+
+    Parameters:
+        size (int): Number of tasks.
+        args (argparse.Namespace): The command line options.
+
+    Returns:
+        List[Dict[str, Any]]: The measurements of each run.
+    """
+    sync_options: Dict[str, Any] = {
+        "workers": args.workers,
+        "match_strategy": args.strategy,
+        "delta": args.delta,
+        "incremental": args.incremental,
+    }
+    if args.use_async:
+        sync_options = {"max_concurrency": args.concurrency}
+    results = []
+    with FakeApiServer(args.latency, args.error_rate, args.retry_after) as server, \
+            tempfile.TemporaryDirectory() as state_dir:
+        tasks = make_tasks(size)
+        server.add_tasks(tasks)
+        for run in ("cold", "warm", "moved"):
+            if run == "moved":
+                server.add_tasks(reschedule_tasks(tasks))
+            result = run_sync(server, state_dir, sync_options, args.gcal_rate, args.use_async)
+            results.append(dict(result, size=size, run=run, api_calls_per_task=result["api_calls"] / size))
+    return results
+
+
+RESULT_HEADER = f"{'tasks':>7} {'run':>5} {'wall (s)':>9} {'calls':>7} {'calls/task':>10} " \
+                f"{'http reqs':>9} {'KB sent':>9} {'KB recv':>9} {'peak MB':>8}"
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """
+    Formats the measurements of one run as a table row below RESULT_HEADER.
+
+    Parameters:
+        result (Dict[str, Any]): The measurements.
+
+    Returns:
+        str: The row.
+    """
+    return (
+        f"{result['size']:>7} {result['run']:>5} {result['wall_time']:>9.2f} {result['api_calls']:>7} "
+        f"{result['api_calls_per_task']:>10.3f} {result['http_requests']:>9} "
+        f"{result['bytes_in'] / 1024:>9.1f} {result['bytes_out'] / 1024:>9.1f} "
+        f"{result['peak_memory'] / 1024 / 1024:>8.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000], help="Numbers of tasks.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every HTTP request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API calls answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=0.0, help="Retry-After sent with injected 429s.")
+    parser.add_argument("--gcal-rate", type=float, default=1000.0, help="Google Calendar requests per second.")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent batch writers.")
+    parser.add_argument("--strategy", default="summary", help="Match strategy passed to the sync.")
+    parser.add_argument("--delta", action="store_true", help="Fetch tasks through the Todoist Sync API.")
+    parser.add_argument("--incremental", action="store_true", help="Use the incremental calendar mirror.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run the asyncio sync, which ignores the options of the threaded one.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight with --async.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(RESULT_HEADER)
+        print("-" * len(RESULT_HEADER))
+
+    results = []
+    for size in args.sizes:
+        for result in benchmark(size, args):
+            results.append(result)
+            if not args.json:
+                print(format_result(result), flush=True)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measures the startup cost of a sync run: importing the sync module, loading credentials
+and building the Google Calendar service, each in a fresh interpreter as for a cron run.
+
+Usage:
+    python -m benchmarks.startup [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the fresh interpreter and prints the duration of each startup step as JSON
+PROBE = """
+import json, time
+import httplib2
+timings = {}
+
+started = time.perf_counter()
+import src.sync
+timings["import"] = time.perf_counter() - started
+
+from src.authentication import get_google_credentials
+from src.gcal_client import build_gcal_service, events_resource
+
+started = time.perf_counter()
+credentials = get_google_credentials()
+timings["credentials"] = time.perf_counter() - started
+started = time.perf_counter()
+get_google_credentials()
+timings["credentials (cached)"] = time.perf_counter() - started
+
+started = time.perf_counter()
+service = build_gcal_service(http=httplib2.Http())
+timings["service"] = time.perf_counter() - started
+started = time.perf_counter()
+service = build_gcal_service(http=httplib2.Http())
+timings["service (cached)"] = time.perf_counter() - started
+
+started = time.perf_counter()
+events_resource(service).insert(calendarId="primary", body={})
+timings["first request"] = time.perf_counter() - started
+started = time.perf_counter()
+events_resource(service).insert(calendarId="primary", body={})
+timings["next request"] = time.perf_counter() - started
+
+print(json.dumps(timings))
+"""
+
+
+def write_token(directory: str) -> None:
+    """
+    Writes a 'token.json' holding credentials valid for an hour, so they load without refreshing.
+
+    Parameters:
+        directory (str): Directory to write the token file to.
+    """
+    token = {
+        "token": "startup-benchmark",
+        "refresh_token": "startup-benchmark",
+        "client_id": "startup-benchmark",
+        "client_secret": "startup-benchmark",
+        "expiry": (datetime.now(timezone.utc) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    with open(os.path.join(directory, "token.json"), "w") as token_file:
+        json.dump(token, token_file)
+
+
+def measure_startup(runs: int) -> Dict[str, List[float]]:
+    """
+    Runs the startup probe in fresh interpreters.
+
+    Parameters:
+        runs (int): Number of interpreters to start.
+
+    Returns:
+        Dict[str, List[float]]: The durations of each step, in seconds, one per run.
+    """
+    environment = dict(os.environ, PYTHONPATH=REPOSITORY_ROOT)
+    environment.setdefault("TIME_ZONE", "UTC")
+    environment.setdefault("TODOIST_API_KEY", "benchmark")
+
+    timings: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        write_token(directory)
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", PROBE], cwd=directory, env=environment,
+                capture_output=True, text=True, check=True
+            ).stdout
+            for step, seconds in json.loads(output).items():
+                timings.setdefault(step, []).append(seconds)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to measure.")
+    args = parser.parse_args()
+
+    print(f"{'step':<22} {'median (ms)':>12} {'min (ms)':>10}")
+    for step, durations in measure_startup(args.runs).items():
+        print(f"{step:<22} {statistics.median(durations) * 1000:>12.2f} {min(durations) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
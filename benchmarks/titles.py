@@ -0,0 +1,121 @@
+"""
+Measures title parsing: the single-pass parse_title, cold and cached, and parse_titles
+on a page of titles, against the regular expressions it replaced.
+
+Usage:
+    python -m benchmarks.titles [--titles 2500] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import timeit
+from typing import Callable, Dict, List, Optional
+
+from src.titles import parse_title, parse_titles
+
+PREVIOUS_PATTERN = r'\[(\d+)\s*(hours?|hrs?|h|horas?|hora|mins?|minutes?|min|m|minutos?)?\s*(\d+)?\s*(mins?|minutes?|min|m|minutos?)?\]'
+previous_pattern = re.compile(PREVIOUS_PATTERN, re.IGNORECASE)
+
+WORDS = ["Buy", "groceries", "Call", "mom", "Review", "pull", "request", "Write", "report", "Gym"]
+DURATIONS = ["", "", " [30]", " [45m]", " [1h]", " [2 hours]", " [1 hora 15 minutos]", " [1h] [30m]"]
+
+
+def previous_remove_duration_pattern(summary: str) -> str:
+    return re.sub(' +', ' ', previous_pattern.sub(' ', summary)).strip()
+
+
+def previous_extract_duration(task_summary: str) -> Optional[int]:
+    matches = re.findall(PREVIOUS_PATTERN, task_summary, re.IGNORECASE)
+    if not matches:
+        return None
+    total_minutes = 0
+    for hours, hour_unit, minutes, _ in matches:
+        if hour_unit and ('hour' in hour_unit.lower() or 'hora' in hour_unit.lower() or 'h' in hour_unit.lower()):
+            total_minutes += int(hours) * 60
+        else:
+            total_minutes += int(hours)
+        if minutes:
+            total_minutes += int(minutes)
+    return total_minutes
+
+
+def make_titles(count: int) -> List[str]:
+    """
+    Builds task titles with and without durations, each repeated as the task and its event.
+
+    Parameters:
+        count (int): Number of distinct titles.
+
+    Returns:
+        List[str]: The titles, two of each.
+    """
+    generator = random.Random(count)
+    titles = [
+        f"{' '.join(generator.choices(WORDS, k=3))} {index}{generator.choice(DURATIONS)}"
+        for index in range(count)
+    ]
+    return titles + titles
+
+
+def measure(titles: List[str], repeat: int) -> Dict[str, float]:
+    """
+    Times each way of parsing the titles, keeping the best of the repeats.
+
+    Parameters:
+        titles (List[str]): Titles to parse.
+        repeat (int): Number of times each measurement is repeated.
+
+    Returns:
+        Dict[str, float]: Seconds taken to parse all the titles, by method.
+    """
+    def previous() -> None:
+        for title in titles:
+            previous_remove_duration_pattern(title)
+            previous_extract_duration(title)
+
+    def single_pass() -> None:
+        for title in titles:
+            parse_title.__wrapped__(title)
+
+    def cached() -> None:
+        for title in titles:
+            parse_title(title)
+
+    def batch() -> None:
+        parse_titles(titles)
+
+    def cold(method: Callable[[], None]) -> Callable[[], None]:
+        def run() -> None:
+            parse_title.cache_clear()
+            method()
+        return run
+
+    methods = {
+        "previous regexes": previous,
+        "single pass": single_pass,
+        "parse_title (cold)": cold(cached),
+        "parse_title (cached)": cached,
+        "parse_titles (cold)": cold(batch),
+    }
+    return {name: min(timeit.repeat(method, number=1, repeat=repeat)) for name, method in methods.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=int, default=2500, help="Number of distinct titles.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of repeats, the fastest is kept.")
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles)
+    for title in titles:
+        assert parse_title(title) == (previous_remove_duration_pattern(title), previous_extract_duration(title))
+
+    timings = measure(titles, args.repeat)
+    baseline = timings["previous regexes"]
+    print(f"{'method':<22} {'total (ms)':>11} {'per title (us)':>15} {'speedup':>8}")
+    for name, seconds in timings.items():
+        print(f"{name:<22} {seconds * 1000:>11.2f} {seconds / len(titles) * 1e6:>15.2f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,60 @@
 import os
-from dotenv import load_dotenv
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Mapping, Optional
 
 
-class Config:
+class _ConfigMeta(type):
+    """
+    Metaclass resolving settings read from the Config class to the active configuration,
+    so code can keep reading 'Config.SETTING' while each account has its own instance.
+    """
+
+    def __getattr__(cls, name: str) -> Any:
+        if name.isupper() and not name.startswith("_"):
+            return getattr(cls.current(), name)
+        raise AttributeError(f"type object '{cls.__name__}' has no attribute '{name}'")
+
+
+class Config(metaclass=_ConfigMeta):
     """
     Configuration class for the application.
 
+    Each instance holds the settings of one account, read from a mapping of environment
+    variables. Reading a setting from the class itself returns the setting of the active
+    configuration: the one activated with Config.activate, or otherwise the default
+    configuration, loaded from the process environment and a .env file on first access.
+    One configuration is active at a time per process.
+
     Attributes:
         TODOIST_API_KEY (str): Todoist API key retrieved from environment variables.
         TIME_ZONE (str): Time zone retrieved from environment variables.
+        STATE_DIR (str): Directory where sync state is persisted between runs.
+        TOKEN_FILE (str): Path of the Google API token file. Defaults to 'token.json'.
+        CREDENTIALS_FILE (str): Path of the Google API client credentials file. Defaults
+            to 'credentials.json'.
+        GCAL_REQUESTS_PER_SECOND (float): Highest rate of Google Calendar API requests.
+        TODOIST_REQUESTS_PER_SECOND (float): Highest rate of Todoist API requests.
+        METRICS_FILE (str): Path of the JSON metrics of the last run. Defaults to
+            'metrics.json' in STATE_DIR.
+        PROMETHEUS_METRICS_FILE (str): Optional path where the metrics of the last run are
+            also written in the Prometheus text format.
+        TODOIST_CLIENT_SECRET (str): Optional client secret of the Todoist app, used by the
+            daemon to verify the signature of webhook requests.
+        GCAL_CHANNEL_TOKEN (str): Optional token set on Google Calendar notification channels,
+            used by the daemon to verify push notifications.
+        CALENDAR_ROUTES_FILE (str): Optional path of a JSON file routing tasks to calendars
+            by project or label. Without it, every task goes to the 'Todoist Tasks' calendar.
+        POLL_MIN_INTERVAL (float): Shortest interval, in seconds, between the polls of the
+            scheduler. Defaults to 60.
+        POLL_MAX_INTERVAL (float): Longest interval, in seconds, between the polls of the
+            scheduler. Defaults to 1800.
         SCOPES (list): List of Google Calendar API scopes.
     """
 
-    # Load environment variables from a .env file if present
-    load_dotenv()
-
-    TODOIST_API_KEY: str = os.getenv("TODOIST_API_KEY")
-    TIME_ZONE: str = os.getenv("TIME_ZONE")
-
-    try:
-        # Validate the provided time zone
-        ZoneInfo(TIME_ZONE)
-    except ZoneInfoNotFoundError:
-        raise EnvironmentError(f"Invalid timezone: {TIME_ZONE}")
+    _lock = threading.Lock()
+    _default: Optional["Config"] = None
+    _active: Optional["Config"] = None
 
     SCOPES: list = [
         "https://www.googleapis.com/auth/calendar.app.created",
@@ -32,24 +63,110 @@ class Config:
         "https://www.googleapis.com/auth/calendar.calendarlist"
     ]
 
+    def __init__(self, environ: Optional[Mapping[str, str]] = None) -> None:
+        """
+        Parameters:
+            environ (Optional[Mapping[str, str]]): Environment variables to read the settings
+                from. Defaults to the process environment.
+
+        Raises:
+            EnvironmentError: If a required variable is missing or the time zone is invalid.
+        """
+        from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+        environ = os.environ if environ is None else environ
+        self.validate(environ)
+
+        self.TODOIST_API_KEY: str = environ.get("TODOIST_API_KEY")
+        self.TIME_ZONE: str = environ.get("TIME_ZONE")
+        self.STATE_DIR: str = environ.get("STATE_DIR", ".sync_state")
+        self.TOKEN_FILE: str = environ.get("TOKEN_FILE", "token.json")
+        self.CREDENTIALS_FILE: str = environ.get("CREDENTIALS_FILE", "credentials.json")
+        self.GCAL_REQUESTS_PER_SECOND: float = float(environ.get("GCAL_REQUESTS_PER_SECOND", "10"))
+        self.TODOIST_REQUESTS_PER_SECOND: float = float(environ.get("TODOIST_REQUESTS_PER_SECOND", "0.5"))
+        self.METRICS_FILE: str = environ.get("METRICS_FILE")
+        self.PROMETHEUS_METRICS_FILE: str = environ.get("PROMETHEUS_METRICS_FILE")
+        self.TODOIST_CLIENT_SECRET: str = environ.get("TODOIST_CLIENT_SECRET")
+        self.GCAL_CHANNEL_TOKEN: str = environ.get("GCAL_CHANNEL_TOKEN")
+        self.CALENDAR_ROUTES_FILE: str = environ.get("CALENDAR_ROUTES_FILE")
+        self.POLL_MIN_INTERVAL: float = float(environ.get("POLL_MIN_INTERVAL", "60"))
+        self.POLL_MAX_INTERVAL: float = float(environ.get("POLL_MAX_INTERVAL", "1800"))
+
+        try:
+            # Validate the provided time zone
+            ZoneInfo(self.TIME_ZONE)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise EnvironmentError(f"Invalid timezone: {self.TIME_ZONE}")
+
+    @classmethod
+    def load(cls) -> "Config":
+        """
+        Loads the default configuration from the process environment, after loading a
+        .env file if present.
+
+        Returns:
+            Config: The default configuration.
+
+        Raises:
+            EnvironmentError: If a required variable is missing or the time zone is invalid.
+        """
+        from dotenv import load_dotenv
+
+        with cls._lock:
+            if cls._default is None:
+                load_dotenv()
+                cls._default = cls()
+        return cls._default
+
+    @classmethod
+    def current(cls) -> "Config":
+        """
+        Returns the active configuration.
+
+        Returns:
+            Config: The configuration activated with Config.activate, or the default one.
+        """
+        return cls._active or cls._default or cls.load()
+
+    @classmethod
+    @contextmanager
+    def activate(cls, config: "Config") -> Iterator["Config"]:
+        """
+        Makes a configuration the active one for the duration of the block.
+
+        Parameters:
+            config (Config): The configuration to activate.
+
+        Yields:
+            Config: The activated configuration.
+        """
+        previous = cls._active
+        cls._active = config
+        try:
+            yield config
+        finally:
+            cls._active = previous
+
     @staticmethod
-    def validate() -> None:
+    def validate(environ: Optional[Mapping[str, str]] = None) -> None:
         """
         Validates the presence of necessary environment variables.
         Raises an exception if any required variable is missing.
+
+        Parameters:
+            environ (Optional[Mapping[str, str]]): Environment variables to check. Defaults
+                to the process environment.
         """
+        environ = os.environ if environ is None else environ
         missing_vars = [
             var
             for var in [
                 "TODOIST_API_KEY",
                 "TIME_ZONE"
             ]
-            if not os.getenv(var)
+            if not environ.get(var)
         ]
         if missing_vars:
             raise EnvironmentError(
                 f"Missing required environment variables: {', '.join(missing_vars)}"
             )
-
-# Validate configuration
-Config.validate()
@@ -1,6 +1,93 @@
+import argparse
+
+
 def main() -> None:
-    ...
+    """
+    Command line entry point: runs a single sync, the sync daemon with 'daemon', repeated
+    syncs at an adaptive interval with 'poll', or the syncs of every account in a roster
+    with 'accounts'.
+    """
+    parser = argparse.ArgumentParser(description="Sync Todoist tasks to Google Calendar.")
+    parser.add_argument("--duration", type=int, default=30, help="Default event duration in minutes.")
+    parser.add_argument("--strategy", default="summary", choices=["summary", "task_id", "extended_property"],
+                        help="How tasks are matched to their events.")
+    commands = parser.add_subparsers(dest="command")
+
+    sync_parser = commands.add_parser("sync", help="Run a single sync (the default).")
+    sync_parser.add_argument("--incremental", action="store_true", help="Use the incremental calendar mirror.")
+    sync_parser.add_argument("--delta", action="store_true", help="Only sync the tasks changed since the last run.")
+    sync_parser.add_argument("--reconcile", action="store_true", help="Delete the events of tasks no longer synced.")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Only print the events reconcile would delete.")
+    sync_parser.add_argument("--reconcile-untagged", action="store_true",
+                             help="Also delete untagged events of the default calendar matching no task by summary.")
+    sync_parser.add_argument("--workers", type=int, default=1, help="Event batches written concurrently.")
+    sync_parser.add_argument("--async", dest="use_async", action="store_true",
+                             help="Run the sync on asyncio, matching tasks by summary.")
+    sync_parser.add_argument("--concurrency", type=int, help="Requests in flight at once with --async.")
+
+    daemon_parser = commands.add_parser("daemon", help="Keep syncing from Todoist webhooks and calendar notifications.")
+    daemon_parser.add_argument("--host", default="127.0.0.1", help="Interface the webhook server listens on.")
+    daemon_parser.add_argument("--port", type=int, default=8080, help="Port the webhook server listens on.")
+    daemon_parser.add_argument("--public-url", help="Public HTTPS URL of the server, to receive calendar notifications.")
+    daemon_parser.add_argument("--debounce", type=float, default=5.0, help="Seconds to wait for more changes.")
+    daemon_parser.add_argument("--reconcile-interval", type=float, default=3600.0,
+                               help="Seconds between full syncs. 0 disables them.")
+
+    poll_parser = commands.add_parser("poll", help="Keep polling Todoist for changes and sync them.")
+    poll_parser.add_argument("--min-interval", type=float, help="Shortest seconds between polls. Defaults to POLL_MIN_INTERVAL.")
+    poll_parser.add_argument("--max-interval", type=float, help="Longest seconds between polls. Defaults to POLL_MAX_INTERVAL.")
+    poll_parser.add_argument("--jitter", type=float, default=0.1, help="Random deviation of each delay, as a fraction.")
+
+    accounts_parser = commands.add_parser("accounts", help="Sync every account listed in a roster file.")
+    accounts_parser.add_argument("roster", help="JSON file listing the accounts.")
+    accounts_parser.add_argument("--processes", type=int, help="Accounts synced in parallel. Defaults to the CPU count.")
+
+    args = parser.parse_args()
+
+    if args.command == "daemon":
+        from src.daemon import run_daemon
+
+        run_daemon(
+            args.host, args.port, args.public_url, args.debounce, args.reconcile_interval or None,
+            args.duration, args.strategy
+        )
+    elif args.command == "poll":
+        from config.settings import Config
+        from src.scheduler import run_scheduler
+
+        min_interval = args.min_interval or Config.POLL_MIN_INTERVAL
+        max_interval = max(args.max_interval or Config.POLL_MAX_INTERVAL, min_interval)
+        run_scheduler(min_interval, max_interval, args.jitter, args.duration, args.strategy)
+    elif args.command == "accounts":
+        from src.multi_account import load_roster, run_accounts
+
+        results = run_accounts(load_roster(args.roster), args.processes)
+        for result in results:
+            status = "ok" if result.ok else f"failed: {result.error}"
+            print(f"{result.name}: {status} ({result.duration_seconds:.1f}s)")
+        if not all(result.ok for result in results):
+            raise SystemExit(1)
+    elif getattr(args, "use_async", False):
+        import asyncio
+        from src.sync import MATCH_BY_SUMMARY, sync_todoist_to_gcal_async
+
+        if args.incremental or args.delta or args.reconcile or args.workers != 1 or args.strategy != MATCH_BY_SUMMARY:
+            parser.error("--async does not support --incremental, --delta, --reconcile, --workers or --strategy.")
+        asyncio.run(sync_todoist_to_gcal_async(args.duration, max_concurrency=args.concurrency))
+    else:
+        from src.sync import sync_todoist_to_gcal
+
+        sync_todoist_to_gcal(
+            args.duration,
+            incremental=getattr(args, "incremental", False),
+            delta=getattr(args, "delta", False),
+            workers=getattr(args, "workers", 1),
+            match_strategy=args.strategy,
+            reconcile=getattr(args, "reconcile", False),
+            dry_run=getattr(args, "dry_run", False),
+            reconcile_untagged=getattr(args, "reconcile_untagged", False),
+        )
 
 
 if __name__ == "__main__":
-    pass
+    main()
@@ -0,0 +1,622 @@
+import asyncio
+import email
+import json
+import logging
+import uuid
+import httpx
+from config.settings import Config
+from google.oauth2.credentials import Credentials
+from src.authentication import get_google_credentials, get_todoist_headers
+from src.gcal_client import (
+    EVENT_FIELDS, EVENT_LIST_FIELDS, MAX_BATCH_SIZE, MAX_EVENTS_PAGE_SIZE, RETRYABLE_STATUSES, EventIndex, EventWrite,
+    gcal_rate_limiter, get_calendar_cache_path, match_event, patch_body
+)
+from src.metrics import METRICS
+from src.persistence import load_json_state, save_json_state
+from src.rate_limiter import RateLimiter, parse_retry_after
+from src.todoist_client import TASK_PAGE_SIZE, TODOIST_TASKS_URL, SyncTask, todoist_rate_limiter
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import quote, urlencode, urlsplit
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+GCAL_API_URL = "https://www.googleapis.com/calendar/v3"
+
+# Highest number of requests in flight at once, across both APIs
+MAX_CONCURRENT_REQUESTS = 10
+
+# Seconds to wait for a response before giving up on a request
+REQUEST_TIMEOUT = 30.0
+
+# Google only compresses responses for user agents containing 'gzip'
+USER_AGENT = "todoist-gcal-sync (gzip)"
+
+
+def _throttle_delay(error: Exception) -> Optional[float]:
+    """
+    Returns the delay requested by a throttling response, for use with RateLimiter.call_async.
+
+    Parameters:
+        error (Exception): The error raised by a request.
+
+    Returns:
+        Optional[float]: None if the error is not a 429 response or a Google Calendar 403
+        rateLimitExceeded/userRateLimitExceeded response, otherwise the 'Retry-After' delay
+        in seconds, or 0 if there is none.
+    """
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    response = error.response
+    if response.status_code == 403:
+        if b'rateLimitExceeded' not in response.content and b'userRateLimitExceeded' not in response.content:
+            return None
+    elif response.status_code != 429:
+        return None
+    return parse_retry_after(response.headers.get('Retry-After'))
+
+
+class AsyncApiClient:
+    """
+    Asyncio client of the Todoist and Google Calendar APIs.
+
+    Both APIs share a single pool of HTTP/1.1 keep-alive connections, so requests reuse
+    open connections instead of each setting up its own, and a request to one API never
+    waits for one to the other. A semaphore caps the requests in flight, and each request
+    also goes through the rate limiter of its API, like the blocking clients.
+
+    The client is used as an async context manager, which closes its connections on exit.
+    """
+
+    def __init__(
+        self,
+        credentials: Optional[Credentials] = None,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ) -> None:
+        """
+        Parameters:
+            credentials (Optional[Credentials]): Google API credentials to authorize
+                Calendar requests with. Without them, requests are sent unauthorized.
+            max_concurrency (int): Highest number of requests in flight at once.
+            transport (Optional[httpx.AsyncBaseTransport]): Transport to send requests
+                through instead of the network.
+        """
+        self._credentials = credentials
+        self._credentials_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=REQUEST_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Closes the pooled connections.
+        """
+        await self._client.aclose()
+
+    async def _gcal_headers(self) -> Dict[str, str]:
+        # Credentials are refreshed on a worker thread, as the refresh is a blocking request
+        if self._credentials is None:
+            return {}
+        async with self._credentials_lock:
+            if not self._credentials.valid:
+                self._credentials = await asyncio.to_thread(get_google_credentials)
+        return {"Authorization": f"Bearer {self._credentials.token}"}
+
+    async def send(
+        self,
+        service: str,
+        endpoint: str,
+        method: str,
+        url: str,
+        rate_limiter: RateLimiter,
+        tokens: float = 1.0,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """
+        Sends a request once the semaphore and the rate limiter allow it, retrying it with
+        backoff while the server throttles it.
+
+        Parameters:
+            service (str): 'gcal' or 'todoist', to authorize and record the request.
+            endpoint (str): Name of the endpoint, to record the request.
+            method (str): HTTP method.
+            url (str): URL of the request.
+            rate_limiter (RateLimiter): Rate limiter of the API.
+            tokens (float): Number of requests it counts as, e.g. the size of a batch.
+            **kwargs (Any): Additional httpx request arguments, such as 'params' or 'json'.
+
+        Returns:
+            httpx.Response: The successful response.
+
+        Raises:
+            httpx.HTTPStatusError: If the request fails or keeps being throttled.
+        """
+        extra_headers = kwargs.pop("headers", {})
+
+        async def send_once() -> httpx.Response:
+            headers = await self._gcal_headers() if service == "gcal" else get_todoist_headers()
+            async with self._semaphore:
+                with METRICS.track_api_call(service, endpoint):
+                    response = await self._client.request(
+                        method, url, headers={**headers, **extra_headers}, **kwargs
+                    )
+                    response.raise_for_status()
+            return response
+
+        return await rate_limiter.call_async(send_once, _throttle_delay, tokens)
+
+    async def request(
+        self,
+        service: str,
+        endpoint: str,
+        method: str,
+        url: str,
+        rate_limiter: RateLimiter,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Sends a request through send and decodes its response.
+
+        Parameters:
+            service (str): 'gcal' or 'todoist', to authorize and record the request.
+            endpoint (str): Name of the endpoint, to record the request.
+            method (str): HTTP method.
+            url (str): URL of the request.
+            rate_limiter (RateLimiter): Rate limiter of the API.
+            **kwargs (Any): Additional httpx request arguments, such as 'params' or 'json'.
+
+        Returns:
+            Any: The decoded JSON response, or None if it has no content.
+
+        Raises:
+            httpx.HTTPStatusError: If the request fails or keeps being throttled.
+        """
+        response = await self.send(service, endpoint, method, url, rate_limiter, **kwargs)
+        return response.json() if response.content else None
+
+
+def _events_url(calendar_id: str, event_id: Optional[str] = None) -> str:
+    url = f"{GCAL_API_URL}/calendars/{quote(calendar_id, safe='')}/events"
+    return f"{url}/{quote(event_id, safe='')}" if event_id else url
+
+
+async def iter_task_pages_async(
+    client: AsyncApiClient,
+    project_id: Optional[str] = None,
+    label: Optional[str] = None,
+    page_size: int = TASK_PAGE_SIZE
+) -> AsyncIterator[List[SyncTask]]:
+    """
+    Yields the active tasks of the account page by page, following the cursor returned
+    with each page of the Todoist API. The asyncio counterpart of iter_task_pages.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        project_id (Optional[str]): ID of the project to filter tasks.
+        label (Optional[str]): Name of the label to filter tasks.
+        page_size (int): Number of tasks per page, at most TASK_PAGE_SIZE.
+
+    Yields:
+        List[SyncTask]: The tasks of each page.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while retrieving tasks from Todoist.
+    """
+    params: Dict[str, Any] = {"limit": page_size}
+    if project_id:
+        params["project_id"] = project_id
+    if label:
+        params["label"] = label
+
+    pages, count = 0, 0
+    while True:
+        try:
+            response = await client.request(
+                "todoist", "tasks", "GET", TODOIST_TASKS_URL, todoist_rate_limiter(), params=dict(params)
+            )
+        except httpx.HTTPStatusError as e:
+            logging.error(f"An error occurred while retrieving tasks from Todoist: {e}")
+            raise
+        page = [SyncTask.from_sync_item(item) for item in response.get("results", [])]
+        pages, count = pages + 1, count + len(page)
+        yield page
+
+        params["cursor"] = response.get("next_cursor")
+        if not params["cursor"]:
+            break
+    logging.info(f"Retrieved {count} tasks from Todoist in {pages} pages.")
+
+
+async def get_tasks_async(
+    client: AsyncApiClient,
+    project_id: Optional[str] = None,
+    label: Optional[str] = None
+) -> List[SyncTask]:
+    """
+    Retrieves the active tasks from Todoist, optionally filtered by project or label.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        project_id (Optional[str]): ID of the project to filter tasks.
+        label (Optional[str]): Name of the label to filter tasks.
+
+    Returns:
+        List[SyncTask]: List of tasks.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while retrieving tasks from Todoist.
+    """
+    return [task async for page in iter_task_pages_async(client, project_id, label) for task in page]
+
+
+async def iter_events_async(
+    client: AsyncApiClient,
+    calendar_id: str,
+    time_min: Optional[str] = None,
+    time_max: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yields the events of a calendar, following every page of the listing. The asyncio
+    counterpart of iter_events.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_id (str): ID of the calendar to list.
+        time_min (Optional[str]): RFC 3339 lower bound for the events' end time.
+        time_max (Optional[str]): RFC 3339 upper bound for the events' start time.
+
+    Yields:
+        Dict[str, Any]: Google Calendar event resources.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while listing the events.
+    """
+    params: Dict[str, Any] = {"maxResults": MAX_EVENTS_PAGE_SIZE, "fields": EVENT_LIST_FIELDS}
+    if time_min:
+        params["timeMin"] = time_min
+    if time_max:
+        params["timeMax"] = time_max
+    while True:
+        try:
+            response = await client.request(
+                "gcal", "calendar.events.list", "GET", _events_url(calendar_id), gcal_rate_limiter(), params=dict(params)
+            )
+        except httpx.HTTPStatusError as error:
+            logging.error(f"An error occurred while listing calendar events: {error}")
+            raise
+        for event in response.get('items', []):
+            yield event
+
+        params['pageToken'] = response.get('nextPageToken')
+        if not params['pageToken']:
+            break
+
+
+async def create_event_async(client: AsyncApiClient, calendar_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Creates an event in Google Calendar. The asyncio counterpart of create_event.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_id (str): ID of the calendar where the event will be created.
+        event (Dict[str, Any]): Dictionary containing event details.
+
+    Returns:
+        Dict[str, Any]: The created event.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while creating the event.
+    """
+    try:
+        created_event = await client.request(
+            "gcal", "calendar.events.insert", "POST", _events_url(calendar_id), gcal_rate_limiter(),
+            params={"fields": EVENT_FIELDS}, json=event
+        )
+        logging.info("Event created: %s", created_event.get('htmlLink'), extra={"sample": "event_created"})
+        return created_event
+    except httpx.HTTPStatusError as error:
+        logging.error(f"An error occurred while creating an event: {error}")
+        raise
+
+
+async def update_event_async(
+    client: AsyncApiClient,
+    calendar_id: str,
+    event_id: str,
+    event: Dict[str, Any],
+    existing_event: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Updates an existing event in Google Calendar through a patch, sending only the fields
+    that differ from the existing event when it is known. The asyncio counterpart of
+    update_event.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_id (str): ID of the calendar where the event will be updated.
+        event_id (str): ID of the event to update.
+        event (Dict[str, Any]): Dictionary containing updated event details.
+        existing_event (Optional[Dict[str, Any]]): The event as currently stored. If not
+            given, every field of 'event' is sent.
+
+    Returns:
+        Dict[str, Any]: The updated event.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while updating the event.
+    """
+    try:
+        updated_event = await client.request(
+            "gcal", "calendar.events.patch", "PATCH", _events_url(calendar_id, event_id), gcal_rate_limiter(),
+            params={"fields": EVENT_FIELDS}, json=patch_body(event, existing_event)
+        )
+        logging.info("Event updated: %s", updated_event.get('htmlLink'), extra={"sample": "event_updated"})
+        return updated_event
+    except httpx.HTTPStatusError as error:
+        logging.error(f"An error occurred while updating an event: {error}")
+        raise
+
+
+async def sync_event_async(
+    client: AsyncApiClient,
+    calendar_id: str,
+    event: Dict[str, Any],
+    event_index: EventIndex
+) -> Dict[str, Any]:
+    """
+    Syncs an event by either creating a new event or updating the matching one if
+    necessary. The asyncio counterpart of sync_event.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_id (str): ID of the calendar where the event will be created or updated.
+        event (Dict[str, Any]): Dictionary containing event details.
+        event_index (EventIndex): Index of the calendar's events, updated with the result.
+
+    Returns:
+        Dict[str, Any]: The created, already existing or updated event.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while writing the event.
+    """
+    existing_event, identical = match_event(event, event_index)
+    if existing_event is not None:
+        if identical:
+            logging.info(
+                "Duplicate event detected: %s", existing_event.get('htmlLink'), extra={"sample": "event_unchanged"}
+            )
+            return existing_event
+        updated_event = await update_event_async(client, calendar_id, existing_event['id'], event, existing_event)
+        event_index.add(updated_event)
+        return updated_event
+
+    created_event = await create_event_async(client, calendar_id, event)
+    event_index.add(created_event)
+    return created_event
+
+
+async def create_calendar_async(client: AsyncApiClient, calendar_name: str) -> Dict[str, Any]:
+    """
+    Creates a new Google Calendar with the given name, ensuring it's not a duplicate. The
+    asyncio counterpart of create_calendar.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_name (str): The name of the calendar to be created.
+
+    Returns:
+        Dict[str, Any]: The created calendar or the existing calendar with the same name.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while creating the calendar.
+    """
+    try:
+        params: Dict[str, Any] = {"fields": "items(id,summary),nextPageToken"}
+        while True:
+            response = await client.request(
+                "gcal", "calendar.calendarList.list", "GET", f"{GCAL_API_URL}/users/me/calendarList",
+                gcal_rate_limiter(), params=dict(params)
+            )
+            for calendar_entry in response.get('items', []):
+                if calendar_entry['summary'] == calendar_name:
+                    logging.info(f"Calendar '{calendar_name}' already exists.")
+                    return calendar_entry
+            params['pageToken'] = response.get('nextPageToken')
+            if not params['pageToken']:
+                break
+
+        created_calendar = await client.request(
+            "gcal", "calendar.calendars.insert", "POST", f"{GCAL_API_URL}/calendars", gcal_rate_limiter(),
+            params={"fields": "id,summary"}, json={'summary': calendar_name, 'timeZone': Config.TIME_ZONE}
+        )
+        logging.info(f"Calendar created: {created_calendar['summary']}")
+        return created_calendar
+    except httpx.HTTPStatusError as error:
+        logging.error(f"An error occurred while creating a calendar: {error}")
+        raise
+
+
+async def resolve_calendar_id_async(client: AsyncApiClient, calendar_name: str) -> str:
+    """
+    Finds the ID of a calendar by name, creating the calendar if it does not exist yet.
+    IDs are read from and added to the same cache as resolve_calendar_ids.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_name (str): Name of the calendar.
+
+    Returns:
+        str: The calendar ID.
+
+    Raises:
+        httpx.HTTPStatusError: If an error occurs while listing or creating the calendar.
+    """
+    path = get_calendar_cache_path()
+    calendar_id = load_json_state(path, {}).get(calendar_name)
+    if calendar_id is None:
+        calendar_id = (await create_calendar_async(client, calendar_name))['id']
+        # Reloaded, as the cache may have changed while the calendar was created
+        save_json_state(path, dict(load_json_state(path, {}), **{calendar_name: calendar_id}))
+    return calendar_id
+
+
+def _batch_part(calendar_id: str, position: int, write: EventWrite) -> str:
+    # The sub-request of a write, addressed by its path on the API's host
+    if write.action == 'delete':
+        method, body = 'DELETE', None
+    elif write.action == 'update':
+        method, body = 'PATCH', patch_body(write.event, write.existing_event)
+    else:
+        method, body = 'POST', write.event
+    path = urlsplit(_events_url(calendar_id, write.event_id if write.action != 'insert' else None)).path
+    query = "" if write.action == 'delete' else f"?{urlencode({'fields': EVENT_FIELDS})}"
+    request = f"{method} {path}{query} HTTP/1.1\r\n"
+    if body is not None:
+        request += f"Content-Type: application/json\r\n\r\n{json.dumps(body)}"
+    else:
+        request += "\r\n"
+    return f"Content-Type: application/http\r\nContent-ID: <{position}>\r\n\r\n{request}"
+
+
+def _parse_batch_response(response: httpx.Response) -> Dict[int, httpx.Response]:
+    """
+    Splits the multipart response of a batch into the responses of its sub-requests.
+
+    Parameters:
+        response (httpx.Response): The response of the batch request.
+
+    Returns:
+        Dict[int, httpx.Response]: The responses, keyed by the position of their write.
+    """
+    header = f"Content-Type: {response.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+    message = email.message_from_bytes(header + response.content)
+    responses = {}
+    for part in message.get_payload():
+        content_id = part["Content-ID"].strip("<>")
+        position = int(content_id.rsplit("-", 1)[-1])
+        status_line, _, rest = part.get_payload().replace("\r\n", "\n").partition("\n")
+        head, _, content = rest.partition("\n\n")
+        headers = [tuple(line.split(":", 1)) for line in head.splitlines() if ":" in line]
+        responses[position] = httpx.Response(
+            int(status_line.split(" ")[1]), headers=[(name.strip(), value.strip()) for name, value in headers],
+            content=content.strip().encode("utf-8"), request=response.request
+        )
+    return responses
+
+
+def _is_retryable(error: httpx.HTTPStatusError) -> bool:
+    return _throttle_delay(error) is not None or error.response.status_code in RETRYABLE_STATUSES
+
+
+async def _execute_write_batch(client: AsyncApiClient, calendar_id: str, writes: List[EventWrite]) -> None:
+    """
+    Executes a single batch of writes, storing each outcome on its write.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_id (str): ID of the calendar where the events are written.
+        writes (List[EventWrite]): At most MAX_BATCH_SIZE writes.
+    """
+    boundary = f"batch_{uuid.uuid4().hex}"
+    body = "".join(
+        f"--{boundary}\r\n{_batch_part(calendar_id, position, write)}\r\n" for position, write in enumerate(writes)
+    ) + f"--{boundary}--\r\n"
+    api_url = urlsplit(GCAL_API_URL)
+    batch_url = f"{api_url.scheme}://{api_url.netloc}/batch{api_url.path}"
+
+    for write in writes:
+        write.result, write.error = None, None
+    try:
+        # Throttled sub-requests are retried by the caller, so only the whole batch is retried here
+        response = await client.send(
+            "gcal", "batch", "POST", batch_url, gcal_rate_limiter(), tokens=len(writes),
+            content=body.encode("utf-8"), headers={"Content-Type": f"multipart/mixed; boundary={boundary}"}
+        )
+        responses = _parse_batch_response(response)
+    except httpx.HTTPStatusError as error:
+        # The batch as a whole failed, so every write failed with it
+        for write in writes:
+            write.error = error
+        return
+
+    for position, write in enumerate(writes):
+        part = responses.get(position)
+        status = part.status_code if part is not None else 500
+        endpoint = 'patch' if write.action == 'update' else write.action
+        METRICS.record_api_call("gcal", f"calendar.events.{endpoint}", status)
+        if part is None or part.is_error:
+            part = part or httpx.Response(500, request=response.request)
+            write.error = httpx.HTTPStatusError(
+                f"Batched {write.action} failed with status {status}", request=response.request, response=part
+            )
+        elif write.action == 'delete':
+            write.result = {}
+            logging.info("Event deleted: %s", write.event_id, extra={"sample": "event_deleted"})
+        else:
+            write.result = part.json()
+            action = "updated" if write.action == 'update' else "created"
+            logging.info("Event %s: %s", action, write.result.get('htmlLink'), extra={"sample": f"event_{action}"})
+
+
+async def execute_event_writes_async(
+    client: AsyncApiClient,
+    calendar_id: str,
+    writes: List[EventWrite],
+    max_retries: int = 3
+) -> List[EventWrite]:
+    """
+    Executes queued writes in batches of up to MAX_BATCH_SIZE requests, all batches
+    concurrently. The asyncio counterpart of execute_event_writes.
+
+    The outcome of every write is stored on it, any error being an httpx.HTTPStatusError.
+    Writes that failed with a rate limit or transient server error are retried, with
+    jittered exponential backoff, in new batches containing only the failed writes.
+
+    Parameters:
+        client (AsyncApiClient): The API client.
+        calendar_id (str): ID of the calendar where the events are written.
+        writes (List[EventWrite]): The writes to execute.
+        max_retries (int): Maximum number of times a failed write is retried.
+
+    Returns:
+        List[EventWrite]: The same writes, with either 'result' or 'error' set.
+    """
+    rate_limiter = gcal_rate_limiter()
+    pending = list(writes)
+    retry_after = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            await asyncio.sleep(rate_limiter.backoff_delay(attempt - 1, retry_after))
+            logging.info(f"Retrying {len(pending)} failed event writes (attempt {attempt}).")
+
+        await asyncio.gather(*(
+            _execute_write_batch(client, calendar_id, pending[start:start + MAX_BATCH_SIZE])
+            for start in range(0, len(pending), MAX_BATCH_SIZE)
+        ))
+
+        pending = [write for write in pending if write.error is not None and _is_retryable(write.error)]
+        throttled = [write for write in pending if _throttle_delay(write.error) is not None]
+        if throttled:
+            retry_after = max(_throttle_delay(write.error) for write in throttled)
+            rate_limiter.record_throttle(retry_after)
+        else:
+            retry_after = None
+        if not pending:
+            break
+
+    for write in writes:
+        if write.error is not None:
+            logging.error(f"An error occurred while writing an event: {write.error}")
+    return writes
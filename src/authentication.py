@@ -1,19 +1,16 @@
 import logging
 import os
+import threading
+from datetime import datetime, timedelta, timezone
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google.auth.exceptions import RefreshError
-from google_auth_oauthlib.flow import InstalledAppFlow
 from config.settings import Config
 from typing import Dict, Optional
+from src.logging_setup import configure_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename="sync.log",
-    filemode="a",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+configure_logging()
 
 def get_todoist_headers() -> Dict[str, str]:
     """
@@ -25,42 +22,93 @@ def get_todoist_headers() -> Dict[str, str]:
     headers = {"Authorization": f"Bearer {Config.TODOIST_API_KEY}"}
     return headers
 
-def get_google_credentials() -> Optional[Credentials]:
+# Credentials are refreshed this long before they expire, so no request is sent with a token about to expire
+CREDENTIALS_REFRESH_MARGIN = timedelta(minutes=5)
+
+_credentials_lock = threading.Lock()
+# Credentials loaded by this process, keyed by the absolute path of their token file
+_cached_credentials: Dict[str, Credentials] = {}
+
+
+def _needs_refresh(credentials: Credentials) -> bool:
+    """
+    Checks whether credentials are invalid or expire within CREDENTIALS_REFRESH_MARGIN.
+
+    Parameters:
+        credentials (Credentials): The Google API credentials.
+
+    Returns:
+        bool: True if the credentials should be refreshed before use.
+    """
+    if not credentials.valid:
+        return True
+    if credentials.expiry is None:
+        return False
+    # Credentials hold their expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return credentials.expiry - now < CREDENTIALS_REFRESH_MARGIN
+
+
+def get_google_credentials(
+    token_file: Optional[str] = None,
+    credentials_file: Optional[str] = None
+) -> Optional[Credentials]:
     """
     Retrieves Google API credentials, refreshing the token if necessary or initiating 
     an authorization flow if no valid credentials are found.
 
-    This function checks for existing credentials in 'token.json'. If found and valid, 
+    Credentials are kept in memory per token file, so each token file is only read on
+    the first call of the process. Later calls return the same credentials until they
+    come within CREDENTIALS_REFRESH_MARGIN of expiring, at which point they are refreshed.
+
+    This function checks for existing credentials in the token file. If found and valid, 
     it returns them. If the credentials are expired and have a refresh token, it attempts 
     to refresh them. If no valid credentials are found, it initiates an OAuth2 flow to 
-    obtain new credentials and saves them to 'token.json'.
+    obtain new credentials. New and refreshed credentials are saved to the token file, so
+    the next run does not need to refresh them again.
+
+    Parameters:
+        token_file (Optional[str]): Path of the token file. Defaults to Config.TOKEN_FILE.
+        credentials_file (Optional[str]): Path of the client credentials file used by the
+            authorization flow. Defaults to Config.CREDENTIALS_FILE.
 
     Returns:
         Optional[Credentials]: The Google API credentials or None if credentials are 
         not available or an error occurs during the refresh process.
     """
-    credentials = None
-
-    # Check if the token file exists and load credentials from it
-    if os.path.exists("token.json"):
-        credentials = Credentials.from_authorized_user_file("token.json", Config.SCOPES)
-
-    # If there are no valid credentials, refresh or initiate the OAuth flow
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            try:
-                # Refresh the token if it has expired
-                credentials.refresh(Request())
-                logging.info("Google credentials refreshed successfully.")
-            except RefreshError as e:
-                logging.error(f"Error refreshing Google credentials: {e}")
-                raise
-        else:
-            # Initiate the OAuth2 flow to obtain new credentials
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", Config.SCOPES)
-            credentials = flow.run_local_server(port=0)
-            # Save the new credentials to 'token.json'
-            with open("token.json", "w") as token_file:
-                token_file.write(credentials.to_json())
-
-    return credentials
+    token_file = token_file or Config.TOKEN_FILE
+    credentials_file = credentials_file or Config.CREDENTIALS_FILE
+    cache_key = os.path.abspath(token_file)
+
+    with _credentials_lock:
+        credentials = _cached_credentials.get(cache_key)
+        if credentials is not None and not _needs_refresh(credentials):
+            return credentials
+
+        # Check if the token file exists and load credentials from it
+        if credentials is None and os.path.exists(token_file):
+            credentials = Credentials.from_authorized_user_file(token_file, Config.SCOPES)
+
+        # If there are no valid credentials, refresh or initiate the OAuth flow
+        if not credentials or _needs_refresh(credentials):
+            if credentials and credentials.refresh_token:
+                try:
+                    # Refresh the token if it has expired or is about to
+                    credentials.refresh(Request())
+                    logging.info("Google credentials refreshed successfully.")
+                except RefreshError as e:
+                    logging.error(f"Error refreshing Google credentials: {e}")
+                    raise
+            else:
+                # Only needed for the first authorization, so imported on demand
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
+                # Initiate the OAuth2 flow to obtain new credentials
+                flow = InstalledAppFlow.from_client_secrets_file(credentials_file, Config.SCOPES)
+                credentials = flow.run_local_server(port=0)
+            # Save the new credentials to the token file
+            with open(token_file, "w") as token:
+                token.write(credentials.to_json())
+
+        _cached_credentials[cache_key] = credentials
+        return credentials
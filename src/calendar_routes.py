@@ -0,0 +1,123 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from config.settings import Config
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from src.logging_setup import configure_logging
+
+if TYPE_CHECKING:
+    from todoist_api_python.api import Task
+
+# Configure logging
+configure_logging()
+
+# Calendar every task is synced to when no routes are configured
+DEFAULT_CALENDAR_NAME = "Todoist Tasks"
+
+
+@dataclass
+class CalendarRoutes:
+    """
+    Routing of tasks to calendars, by label or project.
+
+    Attributes:
+        default (Optional[str]): Calendar of the tasks no route matches, or None to not
+            sync them.
+        projects (Dict[str, str]): Calendar names keyed by Todoist project ID.
+        labels (Dict[str, str]): Calendar names keyed by Todoist label name. Labels take
+            precedence over projects.
+    """
+    default: Optional[str] = DEFAULT_CALENDAR_NAME
+    projects: Dict[str, str] = field(default_factory=dict)
+    labels: Dict[str, str] = field(default_factory=dict)
+
+    def calendar_for(self, task: "Task") -> Optional[str]:
+        """
+        Finds the calendar a task is synced to.
+
+        The first label of the task that has a route wins, then the task's project.
+
+        Parameters:
+            task (Task): The Todoist task.
+
+        Returns:
+            Optional[str]: The calendar name, or None if the task is not synced.
+        """
+        for label in getattr(task, 'labels', None) or []:
+            if label in self.labels:
+                return self.labels[label]
+        return self.projects.get(str(getattr(task, 'project_id', None)), self.default)
+
+    def calendar_names(self) -> List[str]:
+        """
+        Returns every calendar tasks can be routed to.
+
+        Returns:
+            List[str]: The calendar names, without duplicates, the default one first.
+        """
+        names = [self.default] if self.default else []
+        names += list(self.projects.values()) + list(self.labels.values())
+        return list(dict.fromkeys(names))
+
+
+def load_calendar_routes(path: Optional[str] = None) -> CalendarRoutes:
+    """
+    Loads the routing of tasks to calendars.
+
+    The file holds an optional 'default' calendar name, which may be null, and optional
+    'projects' and 'labels' objects mapping project IDs and label names to calendar names.
+    Legacy numeric project IDs are translated to the current IDs tasks carry.
+
+    Parameters:
+        path (Optional[str]): Path of the JSON routes file. Defaults to CALENDAR_ROUTES_FILE.
+
+    Returns:
+        CalendarRoutes: The routes, or the routing of every task to DEFAULT_CALENDAR_NAME
+        when no file is configured.
+
+    Raises:
+        ValueError: If the file is not valid JSON.
+        requests.HTTPError: If legacy project IDs cannot be translated.
+    """
+    from src.todoist_client import get_id_mappings, is_legacy_id
+
+    path = path or Config.CALENDAR_ROUTES_FILE
+    if not path:
+        return CalendarRoutes()
+    try:
+        with open(path, "r") as routes_file:
+            routes = json.load(routes_file)
+    except json.JSONDecodeError as e:
+        logging.error(f"Invalid calendar routes file {path}: {e}")
+        raise ValueError(f"Invalid calendar routes file {path}: {e}")
+    projects = {str(project_id): name for project_id, name in routes.get('projects', {}).items()}
+    legacy_ids = [project_id for project_id in projects if is_legacy_id(project_id)]
+    if legacy_ids:
+        project_ids = get_id_mappings("projects", legacy_ids)
+        projects = {project_ids.get(project_id, project_id): name for project_id, name in projects.items()}
+        logging.warning(f"Calendar routes use legacy Todoist project IDs; replace them with: {project_ids}")
+    return CalendarRoutes(
+        default=routes.get('default', DEFAULT_CALENDAR_NAME),
+        projects=projects,
+        labels=dict(routes.get('labels', {})),
+    )
+
+
+def partition_tasks(tasks: Iterable["Task"], routes: CalendarRoutes) -> Dict[str, List["Task"]]:
+    """
+    Groups tasks by the calendar they are synced to.
+
+    Parameters:
+        tasks (Iterable[Task]): The tasks.
+        routes (CalendarRoutes): The routing of tasks to calendars.
+
+    Returns:
+        Dict[str, List[Task]]: The tasks of each calendar, keyed by calendar name. Tasks
+        that are not routed anywhere are left out.
+    """
+    partitions: Dict[str, List["Task"]] = {}
+    for task in tasks:
+        calendar_name = routes.calendar_for(task)
+        if calendar_name is not None:
+            partitions.setdefault(calendar_name, []).append(task)
+    return partitions
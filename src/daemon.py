@@ -0,0 +1,430 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import signal
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import Config
+from src.todoist_client import SyncTask
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+# Todoist webhook events that change a task
+TODOIST_TASK_EVENTS = ("item:added", "item:updated", "item:completed", "item:uncompleted", "item:deleted")
+
+# Largest request body accepted by the webhook server
+MAX_REQUEST_BODY = 1024 * 1024
+
+# Seconds a client has to send its request
+REQUEST_TIMEOUT = 10
+
+# Notification channels are renewed this many seconds before they expire
+WATCH_RENEWAL_MARGIN = 600
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 413: "Payload Too Large"}
+
+
+def verify_todoist_signature(body: bytes, signature: Optional[str], client_secret: str) -> bool:
+    """
+    Checks the signature Todoist sends with every webhook request.
+
+    Parameters:
+        body (bytes): The raw request body.
+        signature (Optional[str]): The 'X-Todoist-Hmac-SHA256' header.
+        client_secret (str): Client secret of the Todoist app.
+
+    Returns:
+        bool: True if the signature is the base64 HMAC-SHA256 of the body keyed with the secret.
+    """
+    digest = hmac.new(client_secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode("ascii"), signature or "")
+
+
+class SyncDaemon:
+    """
+    Keeps Google Calendar in sync with Todoist from an asyncio event loop.
+
+    Todoist webhooks report individual task changes. They are collected, keeping only the
+    latest state of each task, and synced together once no change has arrived for the
+    debounce window, or at the latest max_delay_seconds after the first one. If a sync
+    fails, a full sync is retried after retry_delay_seconds, and changes arriving meanwhile
+    wait for it. Google Calendar push notifications and a periodic timer request
+    a full reconciliation, as a safety net for missed webhooks and for changes made in the
+    calendar itself.
+
+    Syncs are blocking, so they run one at a time on a dedicated thread while the event
+    loop keeps receiving requests.
+    """
+
+    def __init__(
+        self,
+        sync_changes: Callable[[List[SyncTask]], None],
+        full_sync: Callable[[], None],
+        debounce_seconds: float = 5.0,
+        max_delay_seconds: float = 30.0,
+        reconcile_interval_seconds: Optional[float] = 3600.0,
+        retry_delay_seconds: float = 60.0,
+        echo_window_seconds: float = 10.0,
+        todoist_client_secret: Optional[str] = None,
+        channel_token: Optional[str] = None,
+        watch: Optional[Callable[[], float]] = None
+    ) -> None:
+        """
+        Parameters:
+            sync_changes (Callable[[List[SyncTask]], None]): Syncs the given changed tasks.
+            full_sync (Callable[[], None]): Syncs and reconciles every task.
+            debounce_seconds (float): Quiet period after a change before it is synced.
+            max_delay_seconds (float): Longest time a change waits while changes keep arriving.
+            reconcile_interval_seconds (Optional[float]): Interval of the periodic full sync.
+                None disables it.
+            retry_delay_seconds (float): Delay of the full sync retried after a failed sync.
+            echo_window_seconds (float): Calendar notifications received while syncing or
+                within this many seconds after are ignored, as they report the daemon's own writes.
+            todoist_client_secret (Optional[str]): If set, webhooks without a valid signature are rejected.
+            channel_token (Optional[str]): If set, calendar notifications without this token are rejected.
+            watch (Optional[Callable[[], float]]): Subscribes to calendar notifications and
+                returns the expiration of the channel as a Unix timestamp.
+        """
+        self.sync_changes = sync_changes
+        self.full_sync = full_sync
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        self.retry_delay_seconds = retry_delay_seconds
+        self.echo_window_seconds = echo_window_seconds
+        self.todoist_client_secret = todoist_client_secret
+        self.channel_token = channel_token
+        self.watch = watch
+
+        self._pending: Dict[str, SyncTask] = {}
+        self._full_sync_requested = False
+        self._first_pending_at: Optional[float] = None
+        self._retry_at: Optional[float] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_again = False
+        self._echo_until = 0.0
+        self._background: List[asyncio.Task] = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync")
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, initial_sync: bool = True) -> int:
+        """
+        Starts the webhook server and the background timers.
+
+        Parameters:
+            host (str): Interface to listen on.
+            port (int): Port to listen on, or 0 for any free port.
+            initial_sync (bool): If True, start with a full sync to catch up on the changes
+                made while the daemon was not running.
+
+        Returns:
+            int: The port the server listens on.
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        bound_port = self._server.sockets[0].getsockname()[1]
+        logging.info(f"Sync daemon listening on {host}:{bound_port}.")
+
+        if self.reconcile_interval_seconds:
+            self._background.append(asyncio.ensure_future(self._reconcile_periodically()))
+        if self.watch is not None:
+            self._background.append(asyncio.ensure_future(self._keep_watching()))
+        if initial_sync:
+            self.request_full_sync()
+        return bound_port
+
+    async def stop(self) -> None:
+        """
+        Stops accepting requests, waits for a running sync and stops the background timers.
+        Changes received but not synced yet are left to the next run's full sync.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        for task in self._background:
+            task.cancel()
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        logging.info("Sync daemon stopped.")
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """
+        Runs the daemon until it receives SIGINT or SIGTERM.
+
+        Parameters:
+            host (str): Interface to listen on.
+            port (int): Port to listen on.
+        """
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, stopped.set)
+            except NotImplementedError:
+                pass  # Signal handlers are not supported on Windows event loops
+        await self.start(host, port)
+        try:
+            await stopped.wait()
+        finally:
+            await self.stop()
+
+    # Change tracking
+
+    def add_changes(self, tasks: List[SyncTask]) -> None:
+        """
+        Queues changed tasks to be synced once the debounce window has passed.
+
+        Parameters:
+            tasks (List[SyncTask]): The latest state of each changed task.
+        """
+        for task in tasks:
+            self._pending[str(task.id)] = task
+        self._schedule_flush(self.debounce_seconds)
+
+    def request_full_sync(self, delay: float = 0.0) -> None:
+        """
+        Requests a full sync, together with any pending changes.
+
+        Parameters:
+            delay (float): Seconds to wait before starting it.
+        """
+        self._full_sync_requested = True
+        self._schedule_flush(delay)
+
+    def _schedule_flush(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._first_pending_at is None:
+            self._first_pending_at = now
+        # Each new change pushes the flush back, but never past max_delay_seconds
+        deadline = min(now + delay, self._first_pending_at + self.max_delay_seconds)
+        # After a failed sync, nothing runs before the retry is due
+        if self._retry_at is not None:
+            deadline = max(deadline, self._retry_at)
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = loop.call_at(deadline, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        if self._flush_task is not None:
+            # Flushed as soon as the running sync finishes
+            self._flush_again = True
+            return
+        self._flush_task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        changes = list(self._pending.values())
+        full_sync = self._full_sync_requested
+        self._pending.clear()
+        self._full_sync_requested = False
+        self._first_pending_at = None
+        self._retry_at = None
+
+        try:
+            if full_sync:
+                # A full sync also covers the pending changes
+                logging.info("Running a full sync.")
+                await loop.run_in_executor(self._executor, self.full_sync)
+            elif changes:
+                logging.info(f"Syncing {len(changes)} changed tasks.")
+                await loop.run_in_executor(self._executor, self.sync_changes, changes)
+        except Exception as e:
+            logging.error(f"An error occurred in the sync daemon: {e}")
+            # The changes taken by the failed sync are only synced again by a full sync
+            self._retry_at = loop.time() + self.retry_delay_seconds
+            self.request_full_sync(self.retry_delay_seconds)
+        finally:
+            self._echo_until = loop.time() + self.echo_window_seconds
+            self._flush_task = None
+            if self._flush_again:
+                self._flush_again = False
+                self._start_flush()
+
+    async def _reconcile_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval_seconds)
+            self.request_full_sync()
+
+    async def _keep_watching(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                expiration = await loop.run_in_executor(self._executor, self.watch)
+                delay = max(expiration - time.time() - WATCH_RENEWAL_MARGIN, 60)
+            except Exception as e:
+                logging.error(f"An error occurred while watching the calendar: {e}")
+                delay = self.retry_delay_seconds
+            await asyncio.sleep(delay)
+
+    # HTTP server
+
+    def handle_request(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """
+        Handles a request received by the webhook server.
+
+        Parameters:
+            method (str): HTTP method.
+            path (str): Request path, without the query string.
+            headers (Dict[str, str]): Request headers, with lowercase names.
+            body (bytes): Request body.
+
+        Returns:
+            Tuple[int, Dict[str, Any]]: The HTTP status and JSON payload of the response.
+        """
+        if method == "GET" and path == "/health":
+            return 200, {"pending": len(self._pending), "syncing": self._flush_task is not None}
+        if method == "POST" and path == "/todoist/webhook":
+            return self._handle_todoist_webhook(headers, body)
+        if method == "POST" and path == "/gcal/notifications":
+            return self._handle_calendar_notification(headers)
+        return 404, {"error": "Not found"}
+
+    def _handle_todoist_webhook(self, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if self.todoist_client_secret and not verify_todoist_signature(
+            body, headers.get("x-todoist-hmac-sha256"), self.todoist_client_secret
+        ):
+            logging.warning("Rejected a Todoist webhook with an invalid signature.")
+            return 401, {"error": "Invalid signature"}
+        try:
+            payload = json.loads(body)
+            event_name = payload["event_name"]
+            item = payload["event_data"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": "Invalid webhook payload"}
+
+        if event_name in TODOIST_TASK_EVENTS:
+            task = SyncTask.from_sync_item(item)
+            task.is_completed = task.is_completed or event_name == "item:completed"
+            task.is_deleted = task.is_deleted or event_name == "item:deleted"
+            self.add_changes([task])
+        return 200, {}
+
+    def _handle_calendar_notification(self, headers: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        if self.channel_token and not hmac.compare_digest(headers.get("x-goog-channel-token", ""), self.channel_token):
+            logging.warning("Rejected a calendar notification with an invalid channel token.")
+            return 401, {"error": "Invalid channel token"}
+        # 'sync' only confirms that a new channel works
+        if headers.get("x-goog-resource-state") == "sync":
+            return 200, {}
+        loop = asyncio.get_running_loop()
+        if self._flush_task is None and loop.time() >= self._echo_until:
+            self.request_full_sync(self.debounce_seconds)
+        return 200, {}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, payload = await asyncio.wait_for(self._read_request(reader), REQUEST_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            status, payload = 400, {"error": "Malformed request"}
+
+        content = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\nConnection: close\r\n\r\n"
+            .encode("latin-1") + content
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any]]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, target, _ = request_line.split(" ", 2)
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_REQUEST_BODY:
+            return 413, {"error": "Request body too large"}
+        body = await reader.readexactly(length) if length else b""
+        return self.handle_request(method, target.split("?", 1)[0], headers, body)
+
+
+def run_daemon(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    public_url: Optional[str] = None,
+    debounce_seconds: float = 5.0,
+    reconcile_interval_seconds: Optional[float] = 3600.0,
+    default_event_duration: int = 30,
+    match_strategy: Optional[str] = None
+) -> None:
+    """
+    Runs the sync daemon until it is interrupted.
+
+    Parameters:
+        host (str): Interface the webhook server listens on.
+        port (int): Port the webhook server listens on.
+        public_url (Optional[str]): Public HTTPS URL of the server. If set, every calendar tasks
+            are routed to is watched and Google Calendar posts its notifications to
+            '<public_url>/gcal/notifications'.
+        debounce_seconds (float): Quiet period after a change before it is synced.
+        reconcile_interval_seconds (Optional[float]): Interval of the periodic full sync.
+        default_event_duration (int): The default duration for tasks/events in minutes.
+        match_strategy (Optional[str]): Strategy for finding the event a task was synced to.
+    """
+    # The sync pulls in the API clients, so it is only imported once the daemon actually runs
+    from src.authentication import get_google_credentials
+    from src.calendar_routes import load_calendar_routes
+    from src.gcal_client import create_gcal_service, resolve_calendar_ids, stop_channel, watch_calendar
+    from src.sync import MATCH_BY_SUMMARY, sync_todoist_changes_to_gcal, sync_todoist_to_gcal
+
+    match_strategy = match_strategy or MATCH_BY_SUMMARY
+
+    def sync_changes(tasks: List[SyncTask]) -> None:
+        sync_todoist_changes_to_gcal(tasks, default_event_duration, match_strategy=match_strategy)
+
+    def full_sync() -> None:
+        sync_todoist_to_gcal(default_event_duration, match_strategy=match_strategy, reconcile=True)
+
+    channels: List[Dict[str, Any]] = []
+
+    def watch() -> float:
+        service = create_gcal_service(get_google_credentials())
+        calendar_ids = resolve_calendar_ids(service, load_calendar_routes().calendar_names())
+        new_channels = [
+            watch_calendar(
+                service, calendar_id, f"{public_url.rstrip('/')}/gcal/notifications", str(uuid.uuid4()),
+                Config.GCAL_CHANNEL_TOKEN
+            )
+            for calendar_id in calendar_ids.values()
+        ]
+        # The previous channels are only stopped once the new ones are active, so no change is missed
+        while channels:
+            try:
+                stop_channel(service, channels.pop())
+            except Exception:
+                pass  # It expires on its own
+        channels.extend(new_channels)
+        return min(int(channel["expiration"]) for channel in new_channels) / 1000
+
+    daemon = SyncDaemon(
+        sync_changes,
+        full_sync,
+        debounce_seconds=debounce_seconds,
+        reconcile_interval_seconds=reconcile_interval_seconds,
+        todoist_client_secret=Config.TODOIST_CLIENT_SECRET,
+        channel_token=Config.GCAL_CHANNEL_TOKEN,
+        watch=watch if public_url else None,
+    )
+    asyncio.run(daemon.serve_forever(host, port))
@@ -1,24 +1,75 @@
+import base64
+import json
 import logging
+import os
 import re
+import threading
+import uuid
+import weakref
+import httplib2
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
 from dateutil.parser import parse
-from googleapiclient.discovery import build, Resource
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document, Resource
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
 from src.authentication import get_google_credentials
+from src.metrics import METRICS, error_status
+from src.persistence import load_json_state, save_json_state
+from src.rate_limiter import RateLimiter, parse_retry_after
+from src.state_store import HASHED_EVENT_FIELDS
+from src.titles import parse_title, parse_titles
 from config.settings import Config
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from src.logging_setup import configure_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename="sync.log",
-    filemode="a",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
-
-pattern = re.compile(
-    r'\[(\d+)\s*(hours?|hrs?|h|horas?|hora|mins?|minutes?|min|m|minutos?)?\s*(\d+)?\s*(mins?|minutes?|min|m|minutos?)?\]',
-    re.IGNORECASE
-)
+configure_logging()
+
+# Largest page size accepted by events().list
+MAX_EVENTS_PAGE_SIZE = 2500
+
+# Largest number of requests the Calendar API accepts in a single batch
+MAX_BATCH_SIZE = 50
+
+# HTTP statuses of batched sub-requests worth retrying
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# Private extended properties linking an event to the task it was synced from
+TODOIST_ID_PROPERTY = "todoist_id"
+CONTENT_HASH_PROPERTY = "content_hash"
+
+# Event fields read by the sync. Requests ask for these fields only, through the 'fields'
+# parameter, so responses carry none of the many fields Google Calendar adds to events.
+EVENT_FIELDS = "id,status,htmlLink,summary,description,start,end,recurrence,reminders,extendedProperties"
+EVENT_LIST_FIELDS = f"items({EVENT_FIELDS}),nextPageToken,nextSyncToken"
+
+# Rate limiter of each configuration, shared by every request sent with it to the Google
+# Calendar API, since they all count against the quota of one account
+_gcal_rate_limiters: "weakref.WeakKeyDictionary[Config, RateLimiter]" = weakref.WeakKeyDictionary()
+_gcal_rate_limiters_lock = threading.Lock()
+
+
+def gcal_rate_limiter() -> RateLimiter:
+    """
+    Returns the rate limiter shared by the Google Calendar API requests of the active
+    configuration, creating it on first use.
+
+    Returns:
+        RateLimiter: The rate limiter of the active configuration.
+    """
+    config = Config.current()
+    with _gcal_rate_limiters_lock:
+        limiter = _gcal_rate_limiters.get(config)
+        if limiter is None:
+            limiter = _gcal_rate_limiters[config] = RateLimiter(config.GCAL_REQUESTS_PER_SECOND)
+    return limiter
+
 
 def remove_duration_pattern(summary: str) -> str:
     """
@@ -30,8 +81,7 @@ def remove_duration_pattern(summary: str) -> str:
     Returns:
         str: The summary with the duration pattern removed.
     """
-    
-    return re.sub(' +', ' ', pattern.sub(' ', summary)).strip()
+    return parse_title(summary).summary
 
 
 def summaries_are_identical(summary1: str, summary2: str) -> bool:
@@ -45,18 +95,439 @@ def summaries_are_identical(summary1: str, summary2: str) -> bool:
     Returns:
         bool: True if the summaries are identical excluding the duration pattern, False otherwise.
     """
-    cleaned_summary1 = remove_duration_pattern(summary1)
-    cleaned_summary2 = remove_duration_pattern(summary2)
-    return cleaned_summary1 == cleaned_summary2
+    return summary1 == summary2 or parse_title(summary1).summary == parse_title(summary2).summary
+
+
+class EventIndex:
+    """
+    In-memory index of the events of a calendar, keyed by normalized summary.
+
+    The index is built once per sync run and kept up to date as events are created
+    or updated, so every task can be matched with a single dictionary lookup instead
+    of listing and scanning the whole calendar.
+
+    Each entry holds the event itself together with its pre-parsed start and end
+    datetimes, so no date parsing is needed when comparing against a new event.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]]) -> "EventIndex":
+        """
+        Builds an index from already fetched events.
+
+        When several events share the same normalized summary, the first one wins,
+        matching the order in which the calendar returned them.
+
+        Parameters:
+            events (Iterable[Dict[str, Any]]): Google Calendar event resources.
+
+        Returns:
+            EventIndex: The populated index.
+        """
+        index = cls()
+        index.extend(events)
+        return index
+
+    @classmethod
+    def build(
+        cls,
+        service: Resource,
+        calendar_id: str,
+        time_min: Optional[str] = None,
+        time_max: Optional[str] = None
+    ) -> "EventIndex":
+        """
+        Lists the events of a calendar and builds an index from them.
+
+        Parameters:
+            service (Resource): Authenticated Google Calendar API service instance.
+            calendar_id (str): ID of the calendar to index.
+            time_min (Optional[str]): RFC 3339 lower bound for the events' end time.
+            time_max (Optional[str]): RFC 3339 upper bound for the events' start time.
+
+        Returns:
+            EventIndex: The populated index.
+
+        Raises:
+            HttpError: If an error occurs while listing the events.
+        """
+        index = cls.from_events(iter_events(service, calendar_id, time_min, time_max))
+        logging.info(f"Indexed {len(index)} events from calendar {calendar_id}.")
+        return index
+
+    @staticmethod
+    def _key(event: Dict[str, Any]) -> Optional[str]:
+        summary = event.get('summary')
+        if summary is None:
+            return None
+        return remove_duration_pattern(summary)
+
+    @staticmethod
+    def _entry(event: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'event': event,
+            'start': _parse_event_time(event.get('start', {})),
+            'end': _parse_event_time(event.get('end', {})),
+        }
+
+    def extend(self, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        Adds listed events to the index, keeping the entries already indexed when
+        summaries collide, as from_events does.
+
+        Parameters:
+            events (Iterable[Dict[str, Any]]): Google Calendar event resources.
+        """
+        events = iter(events)
+        while True:
+            # Summaries are normalized a page at a time
+            page = list(islice(events, MAX_EVENTS_PAGE_SIZE))
+            if not page:
+                return
+            titles = parse_titles(event.get('summary') or '' for event in page)
+            for event, title in zip(page, titles):
+                if event.get('summary') is not None and title.summary not in self._entries:
+                    self._entries[title.summary] = self._entry(event)
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """
+        Adds or replaces an event in the index.
+
+        Parameters:
+            event (Dict[str, Any]): The created or updated event resource.
+        """
+        key = self._key(event)
+        if key is not None:
+            self._entries[key] = self._entry(event)
+
+    def lookup(self, summary: str) -> Optional[Dict[str, Any]]:
+        """
+        Finds the indexed entry whose summary matches, ignoring the duration pattern.
+
+        Parameters:
+            summary (str): The summary of the event to match.
+
+        Returns:
+            Optional[Dict[str, Any]]: The entry with the keys 'event', 'start' and 'end',
+            or None if no event matches.
+        """
+        return self._entries.get(remove_duration_pattern(summary))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _is_rate_limited(error: HttpError) -> bool:
+    """
+    Checks whether a request was rejected because a quota was exceeded.
+
+    Parameters:
+        error (HttpError): The error returned for the request.
+
+    Returns:
+        bool: True for 429 responses and 403 rateLimitExceeded/userRateLimitExceeded responses.
+    """
+    status = error.resp.status
+    if status == 403:
+        content = error.content or b''
+        return b'rateLimitExceeded' in content or b'userRateLimitExceeded' in content
+    return status == 429
 
 
-def create_gcal_service() -> Resource:
+def _throttle_delay(error: Exception) -> Optional[float]:
+    """
+    Returns the delay requested by a throttling response, for use with RateLimiter.call.
+
+    Parameters:
+        error (Exception): The error raised by a request.
+
+    Returns:
+        Optional[float]: None if the error is not a throttling response, otherwise the
+        'Retry-After' delay in seconds, or 0 if there is none.
+    """
+    if not isinstance(error, HttpError) or not _is_rate_limited(error):
+        return None
+    return parse_retry_after(error.resp.get('retry-after'))
+
+
+def execute_request(request: HttpRequest) -> Any:
+    """
+    Executes a Google Calendar API request through the shared rate limiter, retrying it
+    with backoff while the quota is exceeded.
+
+    Parameters:
+        request (HttpRequest): The request to execute.
+
+    Returns:
+        Any: The decoded response.
+
+    Raises:
+        HttpError: If the request fails for another reason or keeps being throttled.
+    """
+    def execute() -> Any:
+        with METRICS.track_api_call("gcal", request.methodId):
+            return request.execute()
+
+    return gcal_rate_limiter().call(execute, _throttle_delay)
+
+
+def _iter_event_pages(service: Resource, calendar_id: str, **params: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every page of an events().list call, following nextPageToken.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to list.
+        **params (Any): Additional events().list parameters. Only the fields in
+            EVENT_LIST_FIELDS are requested, unless 'fields' is given.
+
+    Yields:
+        Dict[str, Any]: The raw list responses, the last one carrying 'nextSyncToken'.
+
+    Raises:
+        HttpError: If an error occurs while listing the events.
+    """
+    params.setdefault('fields', EVENT_LIST_FIELDS)
+    page_token = None
+    while True:
+        try:
+            response = execute_request(events_resource(service).list(
+                calendarId=calendar_id,
+                maxResults=MAX_EVENTS_PAGE_SIZE,
+                pageToken=page_token,
+                **params
+            ))
+        except HttpError as error:
+            logging.error(f"An error occurred while listing calendar events: {error}")
+            raise
+
+        yield response
+
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+
+def iter_events(
+    service: Resource,
+    calendar_id: str,
+    time_min: Optional[str] = None,
+    time_max: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the events of a calendar, following every page of the listing.
+
+    Pages are requested at the maximum page size and fetched lazily, so only one
+    page is held in memory at a time.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to list.
+        time_min (Optional[str]): RFC 3339 lower bound for the events' end time.
+        time_max (Optional[str]): RFC 3339 upper bound for the events' start time.
+
+    Yields:
+        Dict[str, Any]: Google Calendar event resources.
+
+    Raises:
+        HttpError: If an error occurs while listing the events.
+    """
+    for response in _iter_event_pages(service, calendar_id, timeMin=time_min, timeMax=time_max):
+        yield from response.get('items', [])
+
+
+def get_event_mirror_path(calendar_id: str) -> str:
+    """
+    Returns the path of the local mirror file for a calendar.
+
+    Parameters:
+        calendar_id (str): ID of the mirrored calendar.
+
+    Returns:
+        str: Path of the mirror file inside the state directory.
+    """
+    safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', calendar_id)
+    return os.path.join(Config.STATE_DIR, f"gcal_mirror_{safe_id}.json")
+
+
+def sync_event_mirror(service: Resource, calendar_id: str, path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Brings the persisted local mirror of a calendar up to date and returns its events.
+
+    The first run lists the whole calendar and stores the resulting 'nextSyncToken'.
+    Later runs list with that token, so only events changed since the previous run
+    are transferred; cancelled events are removed from the mirror. If the server
+    rejects the token with 410 Gone, the mirror is discarded and fully rebuilt.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to mirror.
+        path (Optional[str]): Path of the mirror file. Defaults to get_event_mirror_path.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The mirrored events keyed by event ID.
+
+    Raises:
+        HttpError: If an error other than 410 Gone occurs while listing the events.
+    """
+    path = path or get_event_mirror_path(calendar_id)
+    mirror = load_json_state(path, {'sync_token': None, 'events': {}})
+
+    try:
+        sync_token = _apply_event_deltas(service, calendar_id, mirror)
+    except HttpError as error:
+        if error.resp.status != 410:
+            raise
+        logging.info(f"Sync token for calendar {calendar_id} expired, running a full resync.")
+        mirror = {'sync_token': None, 'events': {}}
+        sync_token = _apply_event_deltas(service, calendar_id, mirror)
+
+    mirror['sync_token'] = sync_token
+    save_json_state(path, mirror)
+    return mirror['events']
+
+
+def _apply_event_deltas(service: Resource, calendar_id: str, mirror: Dict[str, Any]) -> Optional[str]:
+    """
+    Lists the events changed since the mirror's sync token and applies them in place.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the mirrored calendar.
+        mirror (Dict[str, Any]): Mirror with the keys 'sync_token' and 'events'.
+
+    Returns:
+        Optional[str]: The sync token to use on the next run.
+    """
+    events = mirror['events']
+    changed, deleted = 0, 0
+    sync_token = None
+    for response in _iter_event_pages(service, calendar_id, syncToken=mirror['sync_token']):
+        for event in response.get('items', []):
+            if event.get('status') == 'cancelled':
+                deleted += events.pop(event['id'], None) is not None
+            else:
+                events[event['id']] = event
+                changed += 1
+        sync_token = response.get('nextSyncToken', sync_token)
+
+    logging.info(f"Calendar mirror synced: {changed} changed, {deleted} deleted, {len(events)} total.")
+    return sync_token
+
+
+def _parse_event_time(event_time: Dict[str, Any]) -> Optional[datetime]:
+    """
+    Parses the start or end of an event into a timezone-aware datetime.
+
+    Naive datetimes, as built for new events, are localized to the time zone
+    given alongside them.
+
+    Parameters:
+        event_time (Dict[str, Any]): The 'start' or 'end' field of an event.
+
+    Returns:
+        Optional[datetime]: The aware datetime, or None for all-day events.
+    """
+    date_time = event_time.get('dateTime')
+    if not date_time:
+        return None
+    parsed = parse(date_time)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=ZoneInfo(event_time.get('timeZone') or Config.TIME_ZONE))
+    return parsed
+
+
+_discovery_lock = threading.Lock()
+_discovery_document: Optional[Dict[str, Any]] = None
+
+_events_lock = threading.Lock()
+_events_resources: "weakref.WeakKeyDictionary[Resource, Resource]" = weakref.WeakKeyDictionary()
+
+
+def get_discovery_document() -> Optional[Dict[str, Any]]:
+    """
+    Returns the Calendar API discovery document bundled with the client library, read and
+    parsed once per process.
+
+    Building a service completes the document's method descriptions in place, so a
+    service is built from it once before it is shared, leaving later builds with nothing
+    to modify.
+
+    Returns:
+        Optional[Dict[str, Any]]: The parsed document, or None if the installed client
+        library does not bundle discovery documents.
+    """
+    global _discovery_document
+    with _discovery_lock:
+        if _discovery_document is None:
+            content = discovery_cache.get_static_doc("calendar", "v3")
+            if content is None:
+                return None
+            document = json.loads(content)
+            service = build_from_document(document, http=httplib2.Http())
+            for name in document.get("resources", {}):
+                getattr(service, name)()
+            _discovery_document = document
+    return _discovery_document
+
+
+def build_gcal_service(
+    credentials: Optional[Credentials] = None,
+    http: Optional[httplib2.Http] = None
+) -> Resource:
+    """
+    Builds a Google Calendar API service from the cached discovery document, without any
+    network access or parsing.
+
+    Parameters:
+        credentials (Optional[Credentials]): Google API credentials to authorize requests with.
+        http (Optional[httplib2.Http]): Transport to use instead, already authorized.
+
+    Returns:
+        Resource: The Google Calendar API service.
+    """
+    document = get_discovery_document()
+    if document is None:
+        return build("calendar", "v3", credentials=credentials, http=http)
+    return build_from_document(document, credentials=credentials, http=http)
+
+
+def events_resource(service: Resource) -> Resource:
+    """
+    Returns the events collection of a service.
+
+    Every call of service.events() creates the collection anew, generating all of its
+    methods, which costs milliseconds. The collection is therefore created once per
+    service and reused by every request.
+
+    Parameters:
+        service (Resource): Google Calendar API service instance.
+
+    Returns:
+        Resource: The service's events collection.
+    """
+    resource = _events_resources.get(service)
+    if resource is None:
+        with _events_lock:
+            resource = _events_resources.get(service)
+            if resource is None:
+                resource = _events_resources[service] = service.events()
+    return resource
+
+
+def create_gcal_service(credentials: Optional[Credentials] = None) -> Resource:
     """
     Creates and returns the Google Calendar API service.
 
-    This function uses the credentials obtained from `get_google_credentials` to create
-    an instance of the Google Calendar API service. If there is an error during the creation 
-    of the service, it logs the error and raises an exception.
+    This function uses the given credentials, or those obtained from `get_google_credentials`,
+    to create an instance of the Google Calendar API service. If there is an error during the
+    creation of the service, it logs the error and raises an exception.
+
+    Parameters:
+        credentials (Optional[Credentials]): Google API credentials to use.
 
     Returns:
         Resource: An instance of the Google Calendar API service.
@@ -64,7 +535,7 @@ def create_gcal_service() -> Resource:
     Raises:
         HttpError: If an error occurs while creating the Google Calendar service.
     """
-    credentials = get_google_credentials()
+    credentials = credentials or get_google_credentials()
     
     if not credentials:
         logging.error("Failed to obtain Google credentials.")
@@ -72,7 +543,7 @@ def create_gcal_service() -> Resource:
 
     try:
         # Build the Google Calendar service using the obtained credentials
-        service = build("calendar", "v3", credentials=credentials)
+        service = build_gcal_service(credentials=credentials)
         logging.info("Google Calendar service created successfully.")
         return service
     except HttpError as error:
@@ -80,6 +551,32 @@ def create_gcal_service() -> Resource:
         raise
 
 
+_thread_services = threading.local()
+
+
+def get_thread_gcal_service(credentials: Credentials) -> Resource:
+    """
+    Returns a Google Calendar API service owned by the calling thread.
+
+    Services are built on httplib2, which is not thread-safe, so each thread gets its own
+    authorized HTTP transport and service, built from the shared credentials on first use.
+
+    Parameters:
+        credentials (Credentials): Google API credentials shared by all threads.
+
+    Returns:
+        Resource: The calling thread's Google Calendar API service.
+    """
+    services = getattr(_thread_services, 'by_credentials', None)
+    if services is None:
+        services = _thread_services.by_credentials = {}
+    service = services.get(id(credentials))
+    if service is None:
+        http = AuthorizedHttp(credentials, http=httplib2.Http())
+        service = services[id(credentials)] = build_gcal_service(http=http)
+    return service
+
+
 def create_event(service: Resource, calendar_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
     """
     Creates an event in Google Calendar.
@@ -97,23 +594,34 @@ def create_event(service: Resource, calendar_id: str, event: Dict[str, Any]) ->
     """
     try:
         # Create the event
-        created_event = service.events().insert(calendarId=calendar_id, body=event).execute()
-        logging.info(f"Event created: {created_event.get('htmlLink')}")
+        created_event = execute_request(
+            events_resource(service).insert(calendarId=calendar_id, body=event, fields=EVENT_FIELDS)
+        )
+        logging.info("Event created: %s", created_event.get('htmlLink'), extra={"sample": "event_created"})
         return created_event
     except HttpError as error:
         logging.error(f"An error occurred while creating an event: {error}")
         raise
 
 
-def update_event(service: Resource, calendar_id: str, event_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+def update_event(
+    service: Resource,
+    calendar_id: str,
+    event_id: str,
+    event: Dict[str, Any],
+    existing_event: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
-    Updates an existing event in Google Calendar.
+    Updates an existing event in Google Calendar through events().patch, sending only the
+    fields that differ from the existing event when it is known.
     
     Parameters:
         service (Resource): Authenticated Google Calendar API service instance.
         calendar_id (str): ID of the calendar where the event will be updated.
         event_id (str): ID of the event to update.
         event (Dict[str, Any]): Dictionary containing updated event details.
+        existing_event (Optional[Dict[str, Any]]): The event as currently stored. If not
+            given, every field of 'event' is sent.
     
     Return:
         Dict[str, Any]: The updated event.
@@ -122,15 +630,23 @@ def update_event(service: Resource, calendar_id: str, event_id: str, event: Dict
         HttpError: If an error occurs while creating the event.
     """
     try:
-        updated_event = service.events().update(calendarId=calendar_id, eventId=event_id, body=event).execute()
-        logging.info(f"Event updated: {updated_event.get('htmlLink')}")
+        body = patch_body(event, existing_event)
+        updated_event = execute_request(
+            events_resource(service).patch(calendarId=calendar_id, eventId=event_id, body=body, fields=EVENT_FIELDS)
+        )
+        logging.info("Event updated: %s", updated_event.get('htmlLink'), extra={"sample": "event_updated"})
         return updated_event
     except HttpError as error:
         logging.error(f"An error occurred while updating an event: {error}")
         raise
 
 
-def sync_event(service: Resource, calendar_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+def sync_event(
+    service: Resource,
+    calendar_id: str,
+    event: Dict[str, Any],
+    event_index: Optional[EventIndex] = None
+) -> Dict[str, Any]:
     """
     Syncs an event by either creating a new event or updating an existing one if necessary. 
     
@@ -138,6 +654,8 @@ def sync_event(service: Resource, calendar_id: str, event: Dict[str, Any]) -> Di
         service (Resource): Authenticated Google Calendar API service instance.
         calendar_id (str): ID of the calendar where the event will be created or updated.
         event (Dict[str, Any]): Dictionary containing event details.
+        event_index (Optional[EventIndex]): Index of the calendar's events. If not given,
+            the calendar is listed to build one. The index is updated with the result.
     
     Return:
         Dict[str, Any]: The created, already existing or updated event.
@@ -146,37 +664,484 @@ def sync_event(service: Resource, calendar_id: str, event: Dict[str, Any]) -> Di
         HttpError: If an error occurs while creating the event.
     """
     try:
-        new_start = parse(event['start']['dateTime']).replace(tzinfo=None)
-        new_end = parse(event['end']['dateTime']).replace(tzinfo=None)
-        existing_events = service.events().list(calendarId=calendar_id).execute().get('items', [])
-        for existing_event in existing_events:
-            summary_match  = summaries_are_identical(existing_event['summary'], event['summary'])
-            if summary_match:
-                timezones_match = (
-                    existing_event['start']['timeZone'] == event['start']['timeZone'] and 
-                    existing_event['end']['timeZone'] == event['end']['timeZone']
+        if event_index is None:
+            event_index = EventIndex.build(service, calendar_id)
+
+        existing_event, identical = match_event(event, event_index)
+        if existing_event is not None:
+            if identical:
+                logging.info(
+                    "Duplicate event detected: %s", existing_event.get('htmlLink'), extra={"sample": "event_unchanged"}
                 )
-                existing_start = parse(existing_event['start']['dateTime'])
-                existing_end = parse(existing_event['end']['dateTime'])
-                
-                if (existing_start == new_start) and (existing_end == new_end) and timezones_match:
-                    logging.info(f"Duplicate event detected: {existing_event.get('htmlLink')}")
-                    return existing_event
-                else:
-                    # Update the event if the start, end datetime or timezone has changed
-                    updated_event = update_event(service, calendar_id, existing_event['id'], event)
-                    logging.info(f"Event updated: {updated_event.get('htmlLink')}")
-                    return updated_event
+                return existing_event
+
+            # Update the event if the start, end datetime or timezone has changed
+            updated_event = update_event(service, calendar_id, existing_event['id'], event, existing_event)
+            event_index.add(updated_event)
+            return updated_event
 
         # Create new event if there are no matches with existing events
         created_event = create_event(service, calendar_id, event)
-        logging.info(f"Event created: {created_event.get('htmlLink')}")
+        event_index.add(created_event)
         return created_event
     except HttpError as error:
         logging.error(f"An error occurred while syncing an event: {error}")
         raise
 
 
+def set_private_properties(event: Dict[str, Any], **properties: str) -> Dict[str, Any]:
+    """
+    Sets private extended properties on an event.
+
+    Parameters:
+        event (Dict[str, Any]): Dictionary containing event details.
+        **properties (str): The properties to set.
+
+    Returns:
+        Dict[str, Any]: The event with the properties set.
+    """
+    extended_properties = event.setdefault('extendedProperties', {})
+    extended_properties.setdefault('private', {}).update(properties)
+    return event
+
+
+def get_private_property(event: Dict[str, Any], name: str) -> Optional[str]:
+    """
+    Reads a private extended property of an event.
+
+    Parameters:
+        event (Dict[str, Any]): Dictionary containing event details.
+        name (str): Name of the property.
+
+    Returns:
+        Optional[str]: The property's value, or None if it is not set.
+    """
+    return event.get('extendedProperties', {}).get('private', {}).get(name)
+
+
+def diff_event(event: Dict[str, Any], existing_event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Computes the body of an events().patch call turning an existing event into a new one.
+
+    Start and end times are compared as instants together with their time zone, since
+    Google Calendar returns them with a UTC offset. Missing and empty descriptions are
+    equal. A recurrence the new event no longer has is cleared. Only the private extended
+    properties whose value changed are included; the server merges them with the others.
+
+    Parameters:
+        event (Dict[str, Any]): The event as it should be.
+        existing_event (Dict[str, Any]): The event as currently stored.
+
+    Returns:
+        Dict[str, Any]: The changed fields, with their new values.
+    """
+    changes: Dict[str, Any] = {}
+    for field in HASHED_EVENT_FIELDS:
+        if field not in event:
+            continue
+        value, existing_value = event[field], existing_event.get(field)
+        if field in ('start', 'end'):
+            existing_value = existing_value or {}
+            changed = (
+                _parse_event_time(value) != _parse_event_time(existing_value) or
+                value.get('date') != existing_value.get('date') or
+                value.get('timeZone') != existing_value.get('timeZone')
+            )
+        elif field == 'description':
+            changed = (value or None) != (existing_value or None)
+        else:
+            changed = value != existing_value
+        if changed:
+            changes[field] = value
+
+    if (event.get('recurrence') or []) != (existing_event.get('recurrence') or []):
+        changes['recurrence'] = event.get('recurrence') or []
+
+    if 'status' in event and event['status'] != existing_event.get('status'):
+        changes['status'] = event['status']
+
+    properties = {
+        name: value
+        for name, value in event.get('extendedProperties', {}).get('private', {}).items()
+        if get_private_property(existing_event, name) != value
+    }
+    if properties:
+        changes['extendedProperties'] = {'private': properties}
+    return changes
+
+
+def patch_body(event: Dict[str, Any], existing_event: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Computes the body of an events().patch call turning an event into a new one.
+
+    Parameters:
+        event (Dict[str, Any]): The event as it should be.
+        existing_event (Optional[Dict[str, Any]]): The event as currently stored, if known.
+
+    Returns:
+        Dict[str, Any]: The changed fields when the existing event is known. Otherwise
+        every field of 'event', clearing any recurrence it does not have, since a patch
+        leaves the fields missing from its body untouched.
+    """
+    if existing_event is not None:
+        return diff_event(event, existing_event)
+    return {'recurrence': [], **event}
+
+
+def find_events_by_task_ids(
+    service: Resource,
+    calendar_id: str,
+    task_ids: List[str],
+    max_retries: int = 3
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Finds the events synced from the given tasks, letting the server filter on the
+    'todoist_id' private extended property.
+
+    Each task needs its own filtered listing, as extended property constraints can only be
+    combined with AND, so the listings are sent in batches of up to MAX_BATCH_SIZE.
+    Listings throttled by the server are retried with backoff.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to search.
+        task_ids (List[str]): IDs of the Todoist tasks.
+        max_retries (int): Maximum number of times a throttled listing is retried.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The events found, keyed by task ID.
+
+    Raises:
+        HttpError: If a listing fails for another reason or keeps being throttled.
+    """
+    rate_limiter = gcal_rate_limiter()
+    found: Dict[str, Dict[str, Any]] = {}
+    pending = list(task_ids)
+    for attempt in range(max_retries + 1):
+        if attempt:
+            rate_limiter.sleep(rate_limiter.backoff_delay(attempt - 1))
+
+        throttled: List[str] = []
+        errors: List[HttpError] = []
+        for start in range(0, len(pending), MAX_BATCH_SIZE):
+            chunk = pending[start:start + MAX_BATCH_SIZE]
+
+            def callback(request_id: str, response: Dict[str, Any], exception: Optional[HttpError]) -> None:
+                task_id = chunk[int(request_id)]
+                METRICS.record_api_call(
+                    "gcal", "calendar.events.list", 200 if exception is None else error_status(exception)
+                )
+                if exception is None:
+                    items = response.get('items', [])
+                    if items:
+                        found[task_id] = items[0]
+                elif _is_rate_limited(exception) and attempt < max_retries:
+                    throttled.append(task_id)
+                else:
+                    errors.append(exception)
+
+            batch = service.new_batch_http_request(callback=callback)
+            for position, task_id in enumerate(chunk):
+                batch.add(
+                    events_resource(service).list(
+                        calendarId=calendar_id,
+                        privateExtendedProperty=f"{TODOIST_ID_PROPERTY}={task_id}",
+                        maxResults=1,
+                        fields=f"items({EVENT_FIELDS})"
+                    ),
+                    request_id=str(position)
+                )
+            rate_limiter.acquire(len(chunk))
+            with METRICS.track_api_call("gcal", "batch"):
+                batch.execute()
+
+        if errors:
+            logging.error(f"An error occurred while looking up events by task ID: {errors[0]}")
+            raise errors[0]
+        if not throttled:
+            rate_limiter.record_success()
+            break
+        rate_limiter.record_throttle()
+        pending = throttled
+
+    return found
+
+
+def match_event(event: Dict[str, Any], event_index: EventIndex) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Finds the existing event matching a new event and checks whether it needs an update.
+
+    Parameters:
+        event (Dict[str, Any]): Dictionary containing event details.
+        event_index (EventIndex): Index of the calendar's events.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], bool]: The matching event, or None if there is none,
+        and whether it is identical to the new event. When the new event carries a content
+        hash, the hashes are compared, and an existing event without one is never identical,
+        so it gets patched with its tags. Otherwise the start, end and time zones are compared.
+    """
+    entry = event_index.lookup(event['summary'])
+    if entry is None:
+        return None, False
+
+    existing_event = entry['event']
+    existing_hash = get_private_property(existing_event, CONTENT_HASH_PROPERTY)
+    new_hash = get_private_property(event, CONTENT_HASH_PROPERTY)
+    if new_hash:
+        return existing_event, existing_hash == new_hash
+
+    timezones_match = (
+        existing_event['start'].get('timeZone') == event['start']['timeZone'] and 
+        existing_event['end'].get('timeZone') == event['end']['timeZone']
+    )
+    identical = (
+        entry['start'] == _parse_event_time(event['start']) and
+        entry['end'] == _parse_event_time(event['end']) and
+        timezones_match
+    )
+    return existing_event, identical
+
+
+@dataclass
+class EventWrite:
+    """
+    A queued insert, update or delete of an event, filled in with its outcome once executed.
+
+    Updates are sent through events().patch. When the existing event is known, only the
+    fields that differ from it are sent; otherwise every field of the event is.
+
+    Attributes:
+        event (Optional[Dict[str, Any]]): Dictionary containing event details. An 'id' in it
+            sets the ID of an inserted event. Unused for deletes.
+        event_id (Optional[str]): ID of the event to update or delete, or None to insert a new event.
+        tag (Any): Caller data used to match the outcome back to its source.
+        action (Optional[str]): 'insert', 'update' or 'delete'. Defaults to 'update' when an
+            event ID is given and 'insert' otherwise.
+        existing_event (Optional[Dict[str, Any]]): The event as currently stored, for updates.
+        result (Optional[Dict[str, Any]]): The written event, once successful.
+        error (Optional[HttpError]): The error of the last attempt, if it failed.
+    """
+    event: Optional[Dict[str, Any]]
+    event_id: Optional[str] = None
+    tag: Any = None
+    action: Optional[str] = None
+    existing_event: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[HttpError] = None
+
+    def __post_init__(self) -> None:
+        if self.action is None:
+            self.action = 'update' if self.event_id else 'insert'
+
+
+def task_event_id(task_id: str) -> str:
+    """
+    Derives the ID of the event synced from a Todoist task.
+
+    Google Calendar accepts client-supplied event IDs made of base32hex characters
+    (lowercase a-v and digits), 5 to 1024 characters long, so the task ID is encoded
+    with a fixed prefix. The same task always maps to the same event.
+
+    Parameters:
+        task_id (str): ID of the Todoist task.
+
+    Returns:
+        str: The event ID.
+    """
+    encoded = base64.b32hexencode(f"todoist:{task_id}".encode("utf-8")).decode("ascii")
+    return encoded.rstrip("=").lower()
+
+
+def new_event_id() -> str:
+    """
+    Generates a random ID for a new event, so the event's ID is known before it is
+    inserted and the insert can be repeated without creating a duplicate.
+
+    Returns:
+        str: The event ID, made of hexadecimal digits, which are all base32hex characters.
+    """
+    return uuid.uuid4().hex
+
+
+def _is_retryable(error: HttpError) -> bool:
+    """
+    Checks whether a failed request is worth retrying.
+
+    Parameters:
+        error (HttpError): The error returned for the request.
+
+    Returns:
+        bool: True for rate limiting and transient server errors.
+    """
+    return _is_rate_limited(error) or error.resp.status in RETRYABLE_STATUSES
+
+
+def execute_event_writes(
+    service: Resource,
+    calendar_id: str,
+    writes: List[EventWrite],
+    max_retries: int = 3,
+    rate_limiter: Optional[RateLimiter] = None
+) -> List[EventWrite]:
+    """
+    Executes queued inserts and updates in batches of up to MAX_BATCH_SIZE requests.
+
+    The outcome of every write is stored on it. Writes that failed with a rate limit or
+    transient server error are retried, with jittered exponential backoff, in new batches
+    containing only the failed writes. Every sub-request counts against the rate limiter.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar where the events are written.
+        writes (List[EventWrite]): The writes to execute.
+        max_retries (int): Maximum number of times a failed write is retried.
+        rate_limiter (Optional[RateLimiter]): Limiter to use. Defaults to the limiter of
+            the active configuration.
+
+    Returns:
+        List[EventWrite]: The same writes, with either 'result' or 'error' set.
+    """
+    rate_limiter = rate_limiter or gcal_rate_limiter()
+    pending = list(writes)
+    retry_after = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            rate_limiter.sleep(rate_limiter.backoff_delay(attempt - 1, retry_after))
+            logging.info(f"Retrying {len(pending)} failed event writes (attempt {attempt}).")
+
+        for start in range(0, len(pending), MAX_BATCH_SIZE):
+            chunk = pending[start:start + MAX_BATCH_SIZE]
+            rate_limiter.acquire(len(chunk))
+            _execute_write_batch(service, calendar_id, chunk)
+
+        pending = [write for write in pending if write.error is not None and _is_retryable(write.error)]
+        throttled = [write for write in pending if _is_rate_limited(write.error)]
+        if throttled:
+            retry_after = max(_throttle_delay(write.error) for write in throttled)
+            rate_limiter.record_throttle(retry_after)
+        else:
+            retry_after = None
+            rate_limiter.record_success()
+        if not pending:
+            break
+
+    for write in writes:
+        if write.error is not None:
+            logging.error(f"An error occurred while writing an event: {write.error}")
+    return writes
+
+
+def _execute_write_batch(service: Resource, calendar_id: str, writes: List[EventWrite]) -> None:
+    """
+    Executes a single batch of writes, storing each outcome on its write.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar where the events are written.
+        writes (List[EventWrite]): At most MAX_BATCH_SIZE writes.
+    """
+    completed = set()
+
+    def callback(request_id: str, response: Optional[Dict[str, Any]], exception: Optional[HttpError]) -> None:
+        write = writes[int(request_id)]
+        write.result, write.error = response or None, exception
+        completed.add(int(request_id))
+        status = (204 if write.action == 'delete' else 200) if exception is None else error_status(exception)
+        endpoint = 'patch' if write.action == 'update' else write.action
+        METRICS.record_api_call("gcal", f"calendar.events.{endpoint}", status)
+        if exception is None:
+            if write.action == 'delete':
+                logging.info("Event deleted: %s", write.event_id, extra={"sample": "event_deleted"})
+            else:
+                action = "updated" if write.action == 'update' else "created"
+                # Logged lazily, as most records of a large sync are dropped by the sampling
+                logging.info("Event %s: %s", action, response.get('htmlLink'), extra={"sample": f"event_{action}"})
+
+    batch = service.new_batch_http_request(callback=callback)
+    for position, write in enumerate(writes):
+        write.result, write.error = None, None
+        if write.action == 'delete':
+            request = events_resource(service).delete(calendarId=calendar_id, eventId=write.event_id)
+        elif write.action == 'update':
+            body = patch_body(write.event, write.existing_event)
+            request = events_resource(service).patch(
+                calendarId=calendar_id, eventId=write.event_id, body=body, fields=EVENT_FIELDS
+            )
+        else:
+            request = events_resource(service).insert(calendarId=calendar_id, body=write.event, fields=EVENT_FIELDS)
+        batch.add(request, request_id=str(position))
+
+    try:
+        with METRICS.track_api_call("gcal", "batch"):
+            batch.execute()
+    except HttpError as error:
+        # The batch as a whole failed, so every write without an outcome failed with it
+        for position, write in enumerate(writes):
+            if position not in completed:
+                write.error = error
+
+
+def watch_calendar(
+    service: Resource,
+    calendar_id: str,
+    address: str,
+    channel_id: str,
+    token: Optional[str] = None,
+    ttl_seconds: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Subscribes a webhook to the changes of a calendar's events through events().watch.
+
+    Google Calendar then posts a notification to the address whenever an event of the
+    calendar changes, until the channel expires or is stopped.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to watch.
+        address (str): HTTPS URL receiving the notifications.
+        channel_id (str): Unique ID of the notification channel.
+        token (Optional[str]): Value echoed in the 'X-Goog-Channel-Token' header of every notification.
+        ttl_seconds (Optional[int]): Requested lifetime of the channel.
+
+    Returns:
+        Dict[str, Any]: The channel, including its 'resourceId' and 'expiration' in milliseconds.
+
+    Raises:
+        HttpError: If an error occurs while creating the channel.
+    """
+    body: Dict[str, Any] = {"id": channel_id, "type": "web_hook", "address": address}
+    if token:
+        body["token"] = token
+    if ttl_seconds:
+        body["params"] = {"ttl": str(ttl_seconds)}
+    try:
+        channel = execute_request(events_resource(service).watch(calendarId=calendar_id, body=body))
+        logging.info(f"Watching calendar {calendar_id} through channel {channel_id}.")
+        return channel
+    except HttpError as error:
+        logging.error(f"An error occurred while watching the calendar: {error}")
+        raise
+
+
+def stop_channel(service: Resource, channel: Dict[str, Any]) -> None:
+    """
+    Stops a notification channel created by watch_calendar.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        channel (Dict[str, Any]): The channel, as returned by watch_calendar.
+
+    Raises:
+        HttpError: If an error occurs while stopping the channel.
+    """
+    try:
+        execute_request(service.channels().stop(body={"id": channel["id"], "resourceId": channel["resourceId"]}))
+    except HttpError as error:
+        logging.error(f"An error occurred while stopping the notification channel: {error}")
+        raise
+
+
 def add_reminder(event: Dict[str, Any], method: str = "popup", minutes_before_start: int = 10) -> Dict[str, Any]:
     """
     Adds a reminder to the event.
@@ -199,6 +1164,50 @@ def add_reminder(event: Dict[str, Any], method: str = "popup", minutes_before_st
     return event
 
 
+def iter_calendars(service: Resource) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the calendars in the user's calendar list, following every page of the listing.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+
+    Yields:
+        Dict[str, Any]: Calendar list entries, with their 'id' and 'summary' only.
+
+    Raises:
+        HttpError: If an error occurs while listing the calendars.
+    """
+    page_token = None
+    while True:
+        response = execute_request(service.calendarList().list(
+            pageToken=page_token, fields="items(id,summary),nextPageToken"
+        ))
+        yield from response.get('items', [])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+
+def _insert_calendar(service: Resource, calendar_name: str) -> Dict[str, Any]:
+    """
+    Creates a calendar, without checking for an existing one with the same name.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_name (str): The name of the calendar to be created.
+
+    Returns:
+        Dict[str, Any]: The created calendar.
+    """
+    calendar = {
+        'summary': calendar_name,
+        'timeZone': Config.TIME_ZONE
+    }
+    created_calendar = execute_request(service.calendars().insert(body=calendar, fields="id,summary"))
+    logging.info(f"Calendar created: {created_calendar['summary']}")
+    return created_calendar
+
+
 def create_calendar(service: Resource, calendar_name: str) -> Dict[str, Any]:
     """
     Creates a new Google Calendar with the given name, ensuring it's not a duplicate.
@@ -215,20 +1224,80 @@ def create_calendar(service: Resource, calendar_name: str) -> Dict[str, Any]:
     """
     try:
         # Check if the calendar already exists
-        calendar_list = service.calendarList().list().execute()
-        for calendar_entry in calendar_list['items']:
+        for calendar_entry in iter_calendars(service):
             if calendar_entry['summary'] == calendar_name:
                 logging.info(f"Calendar '{calendar_name}' already exists.")
                 return calendar_entry
         
         # Create a new calendar if not found
-        calendar = {
-            'summary': calendar_name,
-            'timeZone': Config.TIME_ZONE
-        }
-        created_calendar = service.calendars().insert(body=calendar).execute()
-        logging.info(f"Calendar created: {created_calendar['summary']}")
-        return created_calendar
+        return _insert_calendar(service, calendar_name)
     except HttpError as error:
         logging.error(f"An error occurred while creating a calendar: {error}")
         raise
+
+
+def get_calendar_cache_path() -> str:
+    """
+    Returns the path of the cache of calendar IDs.
+
+    Returns:
+        str: Path of the JSON file inside the state directory.
+    """
+    return os.path.join(Config.STATE_DIR, "calendars.json")
+
+
+_calendar_cache_lock = threading.Lock()
+
+
+def resolve_calendar_ids(service: Resource, calendar_names: Iterable[str]) -> Dict[str, str]:
+    """
+    Finds the IDs of calendars by name, creating the calendars that do not exist yet.
+
+    Resolved IDs are cached in the state directory, so later runs make no request for
+    them. Names missing from the cache are looked up in a single listing of the calendar
+    list, through all of its pages.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_names (Iterable[str]): Names of the calendars.
+
+    Returns:
+        Dict[str, str]: The calendar IDs keyed by name.
+
+    Raises:
+        HttpError: If an error occurs while listing or creating the calendars.
+    """
+    with _calendar_cache_lock:
+        path = get_calendar_cache_path()
+        cache = load_json_state(path, {})
+        names = list(dict.fromkeys(calendar_names))
+        missing = [name for name in names if name not in cache]
+        if missing:
+            try:
+                for calendar_entry in iter_calendars(service):
+                    if calendar_entry['summary'] in missing:
+                        cache.setdefault(calendar_entry['summary'], calendar_entry['id'])
+                for name in missing:
+                    if name not in cache:
+                        cache[name] = _insert_calendar(service, name)['id']
+            except HttpError as error:
+                logging.error(f"An error occurred while resolving calendars: {error}")
+                raise
+            save_json_state(path, cache)
+        return {name: cache[name] for name in names}
+
+
+def forget_calendar_ids(calendar_names: Iterable[str]) -> None:
+    """
+    Removes calendars from the cache of calendar IDs, so the next run looks them up again,
+    for instance after syncing to one of them failed because it was deleted.
+
+    Parameters:
+        calendar_names (Iterable[str]): Names of the calendars.
+    """
+    with _calendar_cache_lock:
+        path = get_calendar_cache_path()
+        cache = load_json_state(path, {})
+        for name in calendar_names:
+            cache.pop(name, None)
+        save_json_state(path, cache)
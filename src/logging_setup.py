@@ -0,0 +1,195 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+# File the log is written to, and the size at which it is rotated
+LOG_FILE = "sync.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Records of each sampled kind logged in full before only one in every LOG_SAMPLE_EVERY is
+LOG_SAMPLE_FIRST = 20
+LOG_SAMPLE_EVERY = 100
+
+# Attributes every log record has, so any other attribute was passed through 'extra'
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_file_handler: Optional[logging.Handler] = None
+_forwarding = False
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as a single line of JSON holding its time, level, logger and
+    message, any fields passed through 'extra' and the traceback of an exception.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((name, value) for name, value in vars(record).items() if name not in RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Samples the records logged with a 'sample' kind in 'extra', such as one per event
+    written: the first LOG_SAMPLE_FIRST of each kind pass, then one in every
+    LOG_SAMPLE_EVERY. Each record passed carries its 'occurrence' number, and the totals
+    are logged and reset by log_sampled_counts.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        kind = getattr(record, "sample", None)
+        if kind is None:
+            return True
+        with self._lock:
+            self._counts[kind] += 1
+            occurrence = self._counts[kind]
+        if occurrence > LOG_SAMPLE_FIRST and occurrence % LOG_SAMPLE_EVERY:
+            return False
+        record.occurrence = occurrence
+        return True
+
+    def pop_counts(self) -> Dict[str, int]:
+        """
+        Returns the number of records of each kind since the last call, and resets them.
+
+        Returns:
+            Dict[str, int]: The number of records by kind.
+        """
+        with self._lock:
+            counts, self._counts = dict(self._counts), Counter()
+        return counts
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the formatting to the writer thread. Only the message and the
+    traceback are resolved when a record is logged, since its arguments may change after.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+SAMPLING_FILTER = SamplingFilter()
+
+
+def configure_logging(path: str = LOG_FILE) -> None:
+    """
+    Sends the log records of the process to a background thread, which writes them to
+    'path' as JSON lines and rotates the file once it reaches LOG_MAX_BYTES. Logging a
+    record only puts it on a queue, so no thread waits for the disk. Records logged with a
+    'sample' kind are sampled by SAMPLING_FILTER.
+
+    Only the first call configures logging, like logging.basicConfig; it is made by each
+    module on import. The queue is drained when the process exits.
+
+    Parameters:
+        path (str): Path of the log file.
+    """
+    global _listener, _queue_handler, _file_handler
+    with _lock:
+        if _listener is not None or _forwarding:
+            return
+        _file_handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True)
+        _file_handler.setFormatter(JsonFormatter())
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _queue_handler = BackgroundQueueHandler(records)
+        _queue_handler.addFilter(SAMPLING_FILTER)
+
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        root.addHandler(_queue_handler)
+        _listener = QueueListener(records, _file_handler)
+        _listener.start()
+        atexit.register(_stop_listener)
+
+
+def _stop_listener() -> None:
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+
+def forward_logging(records: Any) -> None:
+    """
+    Sends the log records of a worker process to 'records', a multiprocessing queue whose
+    records the parent process writes with write_forwarded_records, so that a single
+    process ever writes and rotates the log file. Records are still sampled in the worker.
+
+    Replaces the logging set up by configure_logging, which then does nothing in this
+    process. Meant as the initializer of a pool of worker processes.
+
+    Parameters:
+        records (multiprocessing.Queue): Queue read by the parent process.
+    """
+    global _listener, _queue_handler, _forwarding
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            root.removeHandler(_queue_handler)
+            _listener.stop()
+            _listener = None
+        _queue_handler = BackgroundQueueHandler(records)
+        _queue_handler.addFilter(SAMPLING_FILTER)
+        root.setLevel(logging.INFO)
+        root.addHandler(_queue_handler)
+        _forwarding = True
+
+
+def write_forwarded_records(records: Any) -> QueueListener:
+    """
+    Writes the records worker processes send to 'records' through forward_logging to the
+    log file of this process, on a background thread.
+
+    Parameters:
+        records (multiprocessing.Queue): Queue the worker processes send their records to.
+
+    Returns:
+        QueueListener: The started listener; stop it once the workers are done, to write
+        the remaining records.
+    """
+    configure_logging()
+    listener = QueueListener(records, _file_handler)
+    listener.start()
+    return listener
+
+
+def log_sampled_counts() -> None:
+    """
+    Logs how many records of each sampled kind were logged since the last call, including
+    those the sampling dropped.
+    """
+    for kind, count in sorted(SAMPLING_FILTER.pop_counts().items()):
+        logged = min(count, LOG_SAMPLE_FIRST) + max(count // LOG_SAMPLE_EVERY - LOG_SAMPLE_FIRST // LOG_SAMPLE_EVERY, 0)
+        logging.info(f"Sampled {logged} of {count} '{kind}' records.", extra={"kind": kind, "count": count})
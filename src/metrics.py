@@ -0,0 +1,268 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from config.settings import Config
+from src.persistence import save_json_state
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from src.logging_setup import configure_logging, log_sampled_counts
+
+# Configure logging
+configure_logging()
+
+# Upper bounds, in seconds, of the API latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of every exported Prometheus metric
+PROMETHEUS_PREFIX = "todoist_gcal_sync"
+
+Status = Union[int, str]
+
+
+def error_status(error: Exception) -> Status:
+    """
+    Extracts the HTTP status of a failed API call.
+
+    Parameters:
+        error (Exception): The error raised by the call.
+
+    Returns:
+        Status: The HTTP status of Google API and requests errors, otherwise the error's class name.
+    """
+    status = getattr(getattr(error, "resp", None), "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return int(status) if status is not None else type(error).__name__
+
+
+class SyncMetrics:
+    """
+    Thread-safe collector of the timings and API calls of a sync run.
+
+    Phases are timed with the 'phase' context manager; a phase entered several times,
+    such as the build phase entered once per task, accumulates its time. API calls are
+    counted by service, endpoint and status, and their latencies are kept in cumulative
+    histograms with the LATENCY_BUCKETS bounds.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Discards everything recorded so far and restarts the run clock.
+        """
+        with self._lock:
+            self.started_at = time.time()
+            self._started = time.perf_counter()
+            self.phases: Dict[str, List[float]] = {}
+            self.api_calls: Counter = Counter()
+            self.latencies: Dict[Tuple[str, str], List[float]] = {}
+            self.schedule: Optional[Dict[str, float]] = None
+
+    def record_schedule(self, **schedule: float) -> None:
+        """
+        Records the outcome of a polling cycle, such as its cost and the time of the next
+        one, to be exported with the metrics of the run.
+
+        Parameters:
+            **schedule (float): Numeric fields describing the cycle.
+        """
+        with self._lock:
+            self.schedule = dict(schedule)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times the enclosed block as part of a sync phase.
+
+        Parameters:
+            name (str): Name of the phase.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                totals = self.phases.setdefault(name, [0.0, 0])
+                totals[0] += elapsed
+                totals[1] += 1
+
+    def record_api_call(self, service: str, endpoint: str, status: Status, latency: Optional[float] = None) -> None:
+        """
+        Records a completed API call.
+
+        Parameters:
+            service (str): 'gcal' or 'todoist'.
+            endpoint (str): Name of the endpoint, such as 'calendar.events.list'.
+            status (Status): HTTP status of the response, or the error's class name.
+            latency (Optional[float]): Duration of the call in seconds. None for calls sent
+                in a batch, whose own latency is not known.
+        """
+        endpoint = str(endpoint)
+        with self._lock:
+            self.api_calls[(service, endpoint, str(status))] += 1
+            if latency is None:
+                return
+            histogram = self.latencies.setdefault((service, endpoint), [0] * (len(LATENCY_BUCKETS) + 3))
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    histogram[position] += 1
+            # The last three slots hold the count, the sum and the maximum
+            histogram[-3] += 1
+            histogram[-2] += latency
+            histogram[-1] = max(histogram[-1], latency)
+
+    @contextmanager
+    def track_api_call(self, service: str, endpoint: str) -> Iterator[None]:
+        """
+        Records the enclosed block as an API call, with its latency and outcome.
+
+        Parameters:
+            service (str): 'gcal' or 'todoist'.
+            endpoint (str): Name of the endpoint.
+        """
+        started = time.perf_counter()
+        status: Status = 200
+        try:
+            yield
+        except Exception as error:
+            status = error_status(error)
+            raise
+        finally:
+            self.record_api_call(service, endpoint, status, time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns the recorded metrics in a JSON-serializable form.
+
+        Returns:
+            Dict[str, Any]: The run's start time and duration, the time and entry count of
+            each phase, the API calls by service, endpoint and status, and the latency
+            histogram of each endpoint, plus the polling schedule if one was recorded.
+        """
+        with self._lock:
+            latency = {}
+            for (service, endpoint), histogram in sorted(self.latencies.items()):
+                buckets = {str(bound): count for bound, count in zip(LATENCY_BUCKETS, histogram)}
+                buckets["+Inf"] = histogram[-3]
+                latency[f"{service} {endpoint}"] = {
+                    "count": histogram[-3],
+                    "total_seconds": round(histogram[-2], 6),
+                    "max_seconds": round(histogram[-1], 6),
+                    "buckets": buckets,
+                }
+            summary: Dict[str, Any] = {
+                "started_at": self.started_at,
+                "duration_seconds": round(time.perf_counter() - self._started, 6),
+                "phases": {
+                    name: {"seconds": round(seconds, 6), "count": count}
+                    for name, (seconds, count) in self.phases.items()
+                },
+                "api_calls": [
+                    {"service": service, "endpoint": endpoint, "status": status, "count": count}
+                    for (service, endpoint, status), count in sorted(self.api_calls.items())
+                ],
+                "latency": latency,
+            }
+            if self.schedule is not None:
+                summary["schedule"] = dict(self.schedule)
+            return summary
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the recorded metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        summary = self.summary()
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_duration_seconds Duration of the last sync run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_duration_seconds {summary['duration_seconds']}",
+            f"# HELP {PROMETHEUS_PREFIX}_phase_seconds Time spent in each phase of the last sync run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_phase_seconds gauge",
+        ]
+        for name, phase in summary["phases"].items():
+            lines.append(f'{PROMETHEUS_PREFIX}_phase_seconds{{phase="{name}"}} {phase["seconds"]}')
+
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_api_calls Number of API calls in the last sync run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_api_calls gauge",
+        ]
+        for call in summary["api_calls"]:
+            labels = f'service="{call["service"]}",endpoint="{call["endpoint"]}",status="{call["status"]}"'
+            lines.append(f"{PROMETHEUS_PREFIX}_api_calls{{{labels}}} {call['count']}")
+
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_api_latency_seconds Latency of the API calls in the last sync run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_api_latency_seconds histogram",
+        ]
+        for key, histogram in summary["latency"].items():
+            service, endpoint = key.split(" ", 1)
+            labels = f'service="{service}",endpoint="{endpoint}"'
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{PROMETHEUS_PREFIX}_api_latency_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{PROMETHEUS_PREFIX}_api_latency_seconds_sum{{{labels}}} {histogram['total_seconds']}")
+            lines.append(f"{PROMETHEUS_PREFIX}_api_latency_seconds_count{{{labels}}} {histogram['count']}")
+
+        for name, value in summary.get("schedule", {}).items():
+            lines += [
+                f"# TYPE {PROMETHEUS_PREFIX}_schedule_{name} gauge",
+                f"{PROMETHEUS_PREFIX}_schedule_{name} {value}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+# Collects the metrics of the current sync run across the clients
+METRICS = SyncMetrics()
+
+
+def get_metrics_path() -> str:
+    """
+    Returns the path of the JSON summary of the last sync run.
+
+    Returns:
+        str: METRICS_FILE if set, otherwise 'metrics.json' in the state directory.
+    """
+    return Config.METRICS_FILE or os.path.join(Config.STATE_DIR, "metrics.json")
+
+
+def export_metrics(metrics: Optional[SyncMetrics] = None) -> Dict[str, Any]:
+    """
+    Logs a one-line overview of a sync run, with the number of per-event records the log
+    sampling dropped, and writes its JSON summary, and its Prometheus metrics if
+    PROMETHEUS_METRICS_FILE is set. Export failures are logged, never raised.
+
+    Parameters:
+        metrics (Optional[SyncMetrics]): Metrics to export. Defaults to METRICS.
+
+    Returns:
+        Dict[str, Any]: The JSON summary.
+    """
+    metrics = metrics or METRICS
+    summary = metrics.summary()
+    phases = ", ".join(f"{name} {phase['seconds']:.3f}s" for name, phase in summary["phases"].items())
+    api_calls = sum(call["count"] for call in summary["api_calls"])
+    logging.info(f"Sync metrics: {summary['duration_seconds']:.3f}s total ({phases}); {api_calls} API calls.")
+    log_sampled_counts()
+
+    try:
+        save_json_state(get_metrics_path(), summary)
+        if Config.PROMETHEUS_METRICS_FILE:
+            directory = os.path.dirname(Config.PROMETHEUS_METRICS_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Replaced atomically, as the file may be read by a collector at any time
+            temp_path = f"{Config.PROMETHEUS_METRICS_FILE}.tmp"
+            with open(temp_path, "w") as metrics_file:
+                metrics_file.write(metrics.to_prometheus())
+            os.replace(temp_path, Config.PROMETHEUS_METRICS_FILE)
+    except OSError as e:
+        logging.warning(f"Could not write sync metrics: {e}")
+    return summary
@@ -0,0 +1,271 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from config.settings import Config
+from src.persistence import load_json_state
+from src.logging_setup import configure_logging, forward_logging, write_forwarded_records
+
+# Configure logging
+configure_logging()
+
+# Settings holding paths, resolved relative to the account directory
+PATH_SETTINGS = (
+    "TOKEN_FILE", "CREDENTIALS_FILE", "STATE_DIR", "METRICS_FILE", "PROMETHEUS_METRICS_FILE", "CALENDAR_ROUTES_FILE"
+)
+
+# Number of times an account whose worker process died is synced again
+MAX_CRASH_RETRIES = 1
+
+# Queue a worker process reports the accounts it starts syncing to, set by _init_worker
+_started_accounts: Optional[Any] = None
+
+
+@dataclass
+class Account:
+    """
+    An account synced by the multi-account runner.
+
+    Attributes:
+        name (str): Unique name of the account, used in logs and results.
+        environ (Dict[str, str]): Environment variables the account's Config is built from.
+        options (Dict[str, Any]): Keyword arguments passed to sync_todoist_to_gcal.
+    """
+    name: str
+    environ: Dict[str, str]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class AccountResult:
+    """
+    Outcome of syncing one account.
+
+    Attributes:
+        name (str): Name of the account.
+        ok (bool): Whether the sync succeeded.
+        duration_seconds (float): Wall time of the sync.
+        error (Optional[str]): Description of the error if the sync failed.
+    """
+    name: str
+    ok: bool
+    duration_seconds: float
+    error: Optional[str] = None
+
+
+def load_roster(path: str) -> List[Account]:
+    """
+    Loads the accounts listed in a JSON roster file.
+
+    The roster holds an 'accounts' list and optional 'defaults'. Each account has a 'name'
+    and optionally a 'directory' (defaults to the account name), an 'env' of settings and
+    the 'options' of its sync; 'defaults' may hold an 'env' and 'options' shared by every
+    account. Directories are relative to the roster file. An account's settings are read,
+    in increasing order of precedence, from the default env, the '.env' file in its
+    directory and its own env. Its token file, credentials file and state directory
+    default to 'token.json', 'credentials.json' and '.sync_state' in its directory.
+
+    Parameters:
+        path (str): Path of the roster file.
+
+    Returns:
+        List[Account]: The accounts, in roster order.
+
+    Raises:
+        ValueError: If an account has no name or two accounts share a name.
+    """
+    from dotenv import dotenv_values
+
+    with open(path, "r") as roster_file:
+        roster = json.load(roster_file)
+    root = os.path.dirname(os.path.abspath(path))
+    defaults = roster.get("defaults", {})
+
+    accounts: List[Account] = []
+    for entry in roster.get("accounts", []):
+        name = entry.get("name")
+        if not name:
+            raise ValueError(f"Roster account without a name: {entry}")
+        if any(account.name == name for account in accounts):
+            raise ValueError(f"Duplicate account name in roster: {name}")
+        directory = os.path.join(root, entry.get("directory", name))
+
+        environ = {
+            "TOKEN_FILE": "token.json",
+            "CREDENTIALS_FILE": "credentials.json",
+            "STATE_DIR": ".sync_state",
+        }
+        environ.update(defaults.get("env", {}))
+        env_file = os.path.join(directory, ".env")
+        if os.path.exists(env_file):
+            environ.update({key: value for key, value in dotenv_values(env_file).items() if value is not None})
+        environ.update(entry.get("env", {}))
+        for setting in PATH_SETTINGS:
+            if environ.get(setting):
+                environ[setting] = os.path.join(directory, environ[setting])
+
+        options = dict(defaults.get("options", {}), **entry.get("options", {}))
+        accounts.append(Account(name, {key: str(value) for key, value in environ.items()}, options))
+    return accounts
+
+
+def get_previous_duration(account: Account) -> Optional[float]:
+    """
+    Returns how long the previous sync of an account took, from its metrics file.
+
+    Parameters:
+        account (Account): The account.
+
+    Returns:
+        Optional[float]: The duration in seconds, or None if the account has not been
+        synced yet or its configuration is invalid.
+    """
+    from src.metrics import get_metrics_path
+
+    try:
+        with Config.activate(Config(account.environ)):
+            metrics = load_json_state(get_metrics_path(), {})
+    except EnvironmentError:
+        return None
+    return metrics.get("duration_seconds")
+
+
+def schedule_accounts(accounts: List[Account]) -> List[Account]:
+    """
+    Orders accounts so that a large account does not hold up the others.
+
+    Accounts are dispatched shortest previous sync first, after the accounts never synced
+    before. A worker process takes the next account as soon as it is free, so a slow
+    account only ever occupies one worker while the others keep draining the queue.
+
+    Parameters:
+        accounts (List[Account]): The accounts to sync.
+
+    Returns:
+        List[Account]: The accounts in dispatch order.
+    """
+    durations = {account.name: get_previous_duration(account) for account in accounts}
+    return sorted(accounts, key=lambda account: (durations[account.name] is not None, durations[account.name] or 0.0))
+
+
+def sync_account(account: Account) -> AccountResult:
+    """
+    Syncs one account with its own configuration. Runs in a worker process.
+
+    Any error is caught and returned in the result, so one account's failure never
+    affects the others.
+
+    Parameters:
+        account (Account): The account to sync.
+
+    Returns:
+        AccountResult: The outcome of the sync.
+    """
+    from src.sync import sync_todoist_to_gcal
+
+    started = time.perf_counter()
+    logging.info(f"Syncing account {account.name}.")
+    try:
+        with Config.activate(Config(account.environ)):
+            sync_todoist_to_gcal(**account.options)
+    except Exception as e:
+        logging.error(f"An error occurred while syncing account {account.name}: {e}")
+        return AccountResult(account.name, False, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+    logging.info(f"Account {account.name} synced successfully.")
+    return AccountResult(account.name, True, time.perf_counter() - started)
+
+
+def _init_worker(log_records: Any, started_accounts: Any) -> None:
+    global _started_accounts
+    forward_logging(log_records)
+    _started_accounts = started_accounts
+
+
+def _sync_account_in_worker(account: Account) -> AccountResult:
+    _started_accounts.put(account.name)
+    return sync_account(account)
+
+
+def run_accounts(accounts: List[Account], processes: Optional[int] = None) -> List[AccountResult]:
+    """
+    Syncs accounts in parallel, in a pool of worker processes.
+
+    Worker processes are spawned rather than forked, so no account inherits state from the
+    parent. They send their log records to the parent, which writes them to its log file.
+
+    If a worker process dies, the pool is broken and every account it had not finished is
+    synced again. The crash only counts against an account if it was the only one being
+    synced: the accounts that had not started yet are resubmitted as they were, and those
+    synced alongside the crashed one are each synced again alone, to find out which one
+    crashed. An account whose worker dies more than MAX_CRASH_RETRIES times fails.
+
+    Parameters:
+        accounts (List[Account]): The accounts to sync.
+        processes (Optional[int]): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        List[AccountResult]: The outcome of each account, in the order of 'accounts'.
+    """
+    results: Dict[str, AccountResult] = {}
+    crashes: Dict[str, int] = {}
+    pending = schedule_accounts(accounts)
+    isolated: List[Account] = []
+    context = multiprocessing.get_context("spawn")
+    log_records = context.Queue()
+    started_accounts = context.Queue()
+    log_listener = write_forwarded_records(log_records)
+
+    try:
+        while pending or isolated:
+            if isolated:
+                batch, workers = [isolated.pop(0)], 1
+            else:
+                batch, pending, workers = pending, [], processes
+            broken: List[Account] = []
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=_init_worker,
+                initargs=(log_records, started_accounts)
+            ) as pool:
+                futures = {pool.submit(_sync_account_in_worker, account): account for account in batch}
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future].name] = future.result()
+                    except BrokenProcessPool:
+                        broken.append(futures[future])
+
+            started = set()
+            while True:
+                try:
+                    started.add(started_accounts.get_nowait())
+                except queue.Empty:
+                    break
+            if not broken:
+                continue
+
+            # Accounts that had not started are innocent, unless none had
+            in_flight = [account for account in broken if account.name in started] or broken
+            if len(in_flight) > 1:
+                logging.warning(f"A worker process died, syncing {len(in_flight)} accounts again one at a time.")
+                isolated.extend(in_flight)
+            else:
+                account = in_flight[0]
+                crashes[account.name] = crashes.get(account.name, 0) + 1
+                if crashes[account.name] > MAX_CRASH_RETRIES:
+                    logging.error(f"The worker process syncing account {account.name} died.")
+                    results[account.name] = AccountResult(account.name, False, 0.0, "Worker process died")
+                else:
+                    logging.warning(f"The worker process syncing account {account.name} died, syncing it again.")
+                    isolated.append(account)
+            pending.extend(account for account in broken if account not in in_flight)
+    finally:
+        log_listener.stop()
+
+    failed = [result.name for result in results.values() if not result.ok]
+    logging.info(f"Synced {len(accounts) - len(failed)} of {len(accounts)} accounts.")
+    return [results[account.name] for account in accounts]
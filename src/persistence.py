@@ -0,0 +1,46 @@
+import json
+import logging
+import os
+from typing import Any
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+def load_json_state(path: str, default: Any) -> Any:
+    """
+    Loads state persisted as JSON from a previous run.
+
+    Parameters:
+        path (str): Path of the state file.
+        default (Any): Value returned if the file does not exist or cannot be read.
+
+    Returns:
+        Any: The persisted state, or the default.
+    """
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r") as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable state file {path}: {e}")
+        return default
+
+
+def save_json_state(path: str, state: Any) -> None:
+    """
+    Persists state as JSON, replacing the file atomically so an interrupted write
+    never leaves a truncated file behind.
+
+    Parameters:
+        path (str): Path of the state file.
+        state (Any): JSON-serializable state to persist.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as state_file:
+        json.dump(state, state_file)
+    os.replace(temp_path, path)
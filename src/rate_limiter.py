@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+T = TypeVar("T")
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket that adapts its rate to the quota the server enforces.
+
+    The rate starts at the configured maximum. Every throttling response halves it (down
+    to the minimum) and pauses all callers for the server's 'Retry-After' delay, and every
+    success raises it again by a small step, so the limiter settles just below the point
+    where the server starts pushing back.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: Optional[float] = None,
+        capacity: Optional[float] = None,
+        increase_step: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        """
+        Parameters:
+            max_rate (float): Highest rate, in requests per second.
+            min_rate (Optional[float]): Lowest rate the limiter backs off to. Defaults to a tenth of max_rate.
+            capacity (Optional[float]): Largest burst of requests. Defaults to max_rate, and at least 1.
+            increase_step (Optional[float]): Rate added after each success. Defaults to 1% of max_rate.
+            decrease_factor (float): Factor applied to the rate after each throttling response.
+            max_retries (int): Maximum number of retries of a throttled call.
+            base_delay (float): Backoff delay before the first retry, doubled on each retry.
+            max_delay (float): Upper bound of the backoff delay.
+            clock (Callable[[], float]): Monotonic clock, in seconds.
+            sleep (Callable[[float], None]): Function used to wait.
+        """
+        self.max_rate = max_rate
+        self.min_rate = min_rate if min_rate is not None else max_rate / 10
+        self.capacity = capacity if capacity is not None else max(1.0, max_rate)
+        self.increase_step = increase_step if increase_step is not None else max_rate / 100
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._rate = max_rate
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._paused_until = 0.0
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Waits for the given delay, using the limiter's sleep function.
+
+        Parameters:
+            seconds (float): The delay, in seconds.
+        """
+        self._sleep(seconds)
+
+    @property
+    def rate(self) -> float:
+        """
+        The current rate, in requests per second.
+        """
+        return self._rate
+
+    def _take(self, tokens: float) -> float:
+        """
+        Takes the given number of tokens if they are available.
+
+        A request for more tokens than the capacity waits for a full bucket and is then
+        charged in full, leaving the bucket in debt, so later callers wait until every
+        request it counts for has been paid at the current rate.
+
+        Parameters:
+            tokens (float): Number of tokens.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the delay before trying again, in seconds.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            if now < self._paused_until:
+                return self._paused_until - now
+            needed = min(tokens, self.capacity)
+            if self._tokens >= needed - 1e-9:
+                # The tolerance absorbs rounding errors in the refill arithmetic
+                self._tokens -= tokens
+                return 0.0
+            return (needed - self._tokens) / self._rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Blocks until the given number of requests may be sent.
+
+        Parameters:
+            tokens (float): Number of requests about to be sent, e.g. the size of a batch.
+        """
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            self._sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        """
+        Waits, without blocking the event loop, until the given number of requests may be sent.
+
+        Parameters:
+            tokens (float): Number of requests about to be sent.
+        """
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def record_success(self) -> None:
+        """
+        Raises the rate by one step after a request went through.
+        """
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Lowers the rate after a throttling response and pauses all callers if the server
+        asked to retry later.
+
+        Parameters:
+            retry_after (Optional[float]): The server's 'Retry-After' delay, in seconds.
+        """
+        with self._lock:
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, self._clock() + retry_after)
+        logging.warning(f"Rate limited by the server, slowing down to {self._rate:.2f} requests per second.")
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Computes the delay before retrying a throttled call, using exponential backoff
+        with full jitter and never less than the server's 'Retry-After' delay.
+
+        Parameters:
+            attempt (int): Number of the retry, starting at 0.
+            retry_after (Optional[float]): The server's 'Retry-After' delay, in seconds.
+
+        Returns:
+            float: The delay, in seconds.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def call(
+        self,
+        func: Callable[[], T],
+        get_throttle_delay: Callable[[Exception], Optional[float]],
+        tokens: float = 1.0
+    ) -> T:
+        """
+        Calls a function once the limiter allows it, retrying it while the server throttles it.
+
+        Parameters:
+            func (Callable[[], T]): The function sending the request.
+            get_throttle_delay (Callable[[Exception], Optional[float]]): Returns None if an
+                error is not a throttling response, otherwise the server's 'Retry-After'
+                delay in seconds, or 0 if it gave none.
+            tokens (float): Number of requests the function sends.
+
+        Returns:
+            T: The function's result.
+
+        Raises:
+            Exception: The function's error, if it is not a throttling response or the
+            retries are exhausted.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            try:
+                result = func()
+            except Exception as error:
+                retry_after = get_throttle_delay(error)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                self.record_throttle(retry_after)
+                self._sleep(self.backoff_delay(attempt, retry_after))
+                continue
+            self.record_success()
+            return result
+
+    async def call_async(
+        self,
+        func: Callable[[], Awaitable[T]],
+        get_throttle_delay: Callable[[Exception], Optional[float]],
+        tokens: float = 1.0
+    ) -> T:
+        """
+        Awaits a coroutine function once the limiter allows it, retrying it while the server
+        throttles it. The asyncio counterpart of call.
+
+        Parameters:
+            func (Callable[[], Awaitable[T]]): The coroutine function sending the request.
+            get_throttle_delay (Callable[[Exception], Optional[float]]): Returns None if an
+                error is not a throttling response, otherwise the server's 'Retry-After'
+                delay in seconds, or 0 if it gave none.
+            tokens (float): Number of requests the function sends.
+
+        Returns:
+            T: The function's result.
+
+        Raises:
+            Exception: The function's error, if it is not a throttling response or the
+            retries are exhausted.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(tokens)
+            try:
+                result = await func()
+            except Exception as error:
+                retry_after = get_throttle_delay(error)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                self.record_throttle(retry_after)
+                await asyncio.sleep(self.backoff_delay(attempt, retry_after))
+                continue
+            self.record_success()
+            return result
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """
+    Parses a 'Retry-After' header given in seconds.
+
+    Parameters:
+        value (Optional[str]): The header value.
+
+    Returns:
+        float: The delay in seconds, or 0 if the header is missing or not a number of seconds.
+    """
+    try:
+        return max(0.0, float(value)) if value else 0.0
+    except ValueError:
+        return 0.0
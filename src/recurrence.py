@@ -0,0 +1,325 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from dateutil.parser import parse, ParserError
+from dateutil.rrule import rrulestr
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+# Frequencies Google Calendar accepts in a recurrence rule. Shorter ones are expanded.
+CALENDAR_FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+# Occurrences of a recurrence that cannot be sent as a rule are listed up to this far
+# from the first one, and at most this many
+EXPANSION_HORIZON = timedelta(days=14)
+MAX_EXPANDED_OCCURRENCES = 50
+
+WEEKDAYS = {
+    "mo": "MO", "mon": "MO", "monday": "MO",
+    "tu": "TU", "tue": "TU", "tues": "TU", "tuesday": "TU",
+    "we": "WE", "wed": "WE", "wednesday": "WE",
+    "th": "TH", "thu": "TH", "thur": "TH", "thurs": "TH", "thursday": "TH",
+    "fr": "FR", "fri": "FR", "friday": "FR",
+    "sa": "SA", "sat": "SA", "saturday": "SA",
+    "su": "SU", "sun": "SU", "sunday": "SU",
+}
+WORKDAYS = ["MO", "TU", "WE", "TH", "FR"]
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",),
+        ("jun", "june"), ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"),
+        ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ], start=1)
+    for name in names
+}
+
+UNITS = {
+    "min": "MINUTELY", "mins": "MINUTELY", "minute": "MINUTELY", "minutes": "MINUTELY",
+    "hour": "HOURLY", "hours": "HOURLY", "hr": "HOURLY", "hrs": "HOURLY",
+    "day": "DAILY", "days": "DAILY",
+    "week": "WEEKLY", "weeks": "WEEKLY",
+    "month": "MONTHLY", "months": "MONTHLY",
+    "year": "YEARLY", "years": "YEARLY",
+}
+ADVERBS = {"daily": "DAILY", "weekly": "WEEKLY", "monthly": "MONTHLY", "yearly": "YEARLY", "annually": "YEARLY"}
+
+ORDINAL = r"(\d{1,2})(?:st|nd|rd|th)"
+ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "last": -1}
+
+PREFIX_PATTERN = re.compile(r"^(?:every|each)\s+(?:(other)\s+|(\d+)\s+)?(.*)$")
+# Clauses setting the time of day or the first occurrence, both already carried by the due date
+IGNORED_CLAUSE_PATTERN = re.compile(r"\s+(?:at|@|from|starting|start)\s+.*$")
+UNTIL_PATTERN = re.compile(r"\s+(?:until|ending|end)\s+(.+)$")
+FOR_PATTERN = re.compile(r"\s+for\s+(\d+)\s+(day|days|week|weeks|month|months|year|years)$")
+MONTH_DAY_PATTERN = re.compile(rf"^(?:day\s+)?{ORDINAL}(?:\s+day)?$|^(?:day\s+)?(\d{{1,2}})$")
+NTH_WEEKDAY_PATTERN = re.compile(rf"^(?:{ORDINAL}|(first|second|third|fourth|last))\s+(\w+)$")
+DATE_PATTERN = re.compile(rf"^(\w+)\s+(?:{ORDINAL}|(\d{{1,2}}))$|^(?:{ORDINAL}|(\d{{1,2}}))\s+(\w+)$")
+SEPARATOR_PATTERN = re.compile(r"\s*(?:,|\band\b)\s*")
+
+
+@dataclass
+class Recurrence:
+    """
+    A recurrence parsed from a Todoist due string, in RFC 5545 terms.
+
+    Attributes:
+        freq (str): RRULE frequency, such as 'WEEKLY' or 'HOURLY'.
+        interval (int): Number of periods between occurrences.
+        by_day (List[str]): BYDAY values, such as 'MO' or '-1FR'.
+        by_month_day (List[int]): BYMONTHDAY values.
+        by_month (List[int]): BYMONTH values.
+        by_set_pos (Optional[int]): BYSETPOS value.
+        until (Optional[date]): Last day an occurrence can fall on.
+    """
+    freq: str
+    interval: int = 1
+    by_day: List[str] = field(default_factory=list)
+    by_month_day: List[int] = field(default_factory=list)
+    by_month: List[int] = field(default_factory=list)
+    by_set_pos: Optional[int] = None
+    until: Optional[date] = None
+
+    def to_rrule(self, time_zone: str) -> str:
+        """
+        Renders the recurrence as an RRULE property.
+
+        Parameters:
+            time_zone (str): Time zone of the event, used to express UNTIL in UTC.
+
+        Returns:
+            str: The property, such as 'RRULE:FREQ=WEEKLY;BYDAY=MO,WE'.
+        """
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.by_month:
+            parts.append(f"BYMONTH={','.join(map(str, self.by_month))}")
+        if self.by_month_day:
+            parts.append(f"BYMONTHDAY={','.join(map(str, self.by_month_day))}")
+        if self.by_day:
+            parts.append(f"BYDAY={','.join(self.by_day)}")
+        if self.by_set_pos is not None:
+            parts.append(f"BYSETPOS={self.by_set_pos}")
+        if self.until is not None:
+            # UNTIL must be in UTC for events with a time zone; the last day is included
+            last_moment = datetime.combine(self.until, time.max, ZoneInfo(time_zone))
+            parts.append(f"UNTIL={last_moment.astimezone(ZoneInfo('UTC')).strftime('%Y%m%dT%H%M%SZ')}")
+        return "RRULE:" + ";".join(parts)
+
+
+def _parse_weekdays(text: str) -> Optional[List[str]]:
+    """
+    Parses a list of weekday names, such as 'mon, wed and fri'.
+
+    Parameters:
+        text (str): The list.
+
+    Returns:
+        Optional[List[str]]: The BYDAY values, or None if an item is not a weekday.
+    """
+    days = []
+    for item in SEPARATOR_PATTERN.split(text):
+        if item in ("weekday", "weekdays", "workday", "workdays"):
+            days += WORKDAYS
+        elif item in ("weekend", "weekends"):
+            days += ["SA", "SU"]
+        elif item in WEEKDAYS:
+            days.append(WEEKDAYS[item])
+        else:
+            return None
+    return list(dict.fromkeys(days)) or None
+
+
+def _parse_end(text: str, start: date) -> Optional[date]:
+    """
+    Parses the end of a recurrence, such as 'may 30' or '2024-06-01'.
+
+    Parameters:
+        text (str): The end, after 'until'.
+        start (date): The first occurrence, used to complete partial dates.
+
+    Returns:
+        Optional[date]: The last day, or None if it cannot be parsed.
+    """
+    try:
+        end = parse(text, default=datetime.combine(start, time.min)).date()
+    except (ParserError, ValueError, OverflowError):
+        return None
+    # A date without a year, such as 'jan 15', refers to its next occurrence
+    if end < start and not re.search(r"\d{4}", text):
+        end = end.replace(year=end.year + 1)
+    return end
+
+
+def _add_period(start: date, amount: int, unit: str) -> date:
+    """
+    Adds a number of days, weeks, months or years to a date.
+
+    Parameters:
+        start (date): The date.
+        amount (int): Number of periods.
+        unit (str): The period, such as 'weeks'.
+
+    Returns:
+        date: The resulting date, clamped to the 28th when months are added.
+    """
+    if unit.startswith("day"):
+        return start + timedelta(days=amount)
+    if unit.startswith("week"):
+        return start + timedelta(weeks=amount)
+    months = amount * (12 if unit.startswith("year") else 1)
+    year, month = divmod(start.month - 1 + months, 12)
+    day = min(start.day, 28)
+    return date(start.year + year, month + 1, day)
+
+
+def parse_recurrence(due_string: Optional[str], start: date) -> Optional[Recurrence]:
+    """
+    Parses a recurring Todoist due string, such as 'every other monday' or 'every 15th
+    until june', into a recurrence.
+
+    English due strings are supported: 'every' or 'each', optionally followed by 'other'
+    or a number, then a unit (minute to year), weekdays, 'weekday' or 'weekend', a day of
+    the month ('15th', 'last day'), a weekday of the month ('first monday', 'last workday')
+    or a date ('jan 15'). Adverbs such as 'daily' are accepted too. Trailing clauses
+    setting the time or start are ignored, since the due date carries them, while
+    'until <date>' and 'for <n> <units>' bound the recurrence.
+
+    Parameters:
+        due_string (Optional[str]): The due string of the task.
+        start (date): The current due date, which is the first occurrence.
+
+    Returns:
+        Optional[Recurrence]: The recurrence, or None if the string is not understood or
+        repeats from the completion date ('every!'), which no fixed schedule can express.
+    """
+    if not due_string:
+        return None
+    text = " ".join(due_string.lower().split())
+    if text.startswith("every!") or text.startswith("after"):
+        return None
+
+    until = None
+    for_match = FOR_PATTERN.search(text)
+    if for_match:
+        until = _add_period(start, int(for_match.group(1)), for_match.group(2)) - timedelta(days=1)
+        text = text[:for_match.start()]
+    until_match = UNTIL_PATTERN.search(text)
+    if until_match:
+        until = _parse_end(IGNORED_CLAUSE_PATTERN.sub("", until_match.group(1)), start)
+        if until is None:
+            return None
+        text = text[:until_match.start()]
+    text = IGNORED_CLAUSE_PATTERN.sub("", text).strip()
+
+    if text in ADVERBS:
+        return Recurrence(ADVERBS[text], until=until)
+
+    match = PREFIX_PATTERN.match(text)
+    if not match:
+        return None
+    interval = 2 if match.group(1) else int(match.group(2) or 1)
+    rest = match.group(3).strip()
+    if match.group(2) and rest in MONTHS:
+        # 'every 15 jan' is a date, not an interval
+        interval, rest = 1, f"{match.group(2)} {rest}"
+    if interval < 1:
+        return None
+
+    if rest in UNITS:
+        return Recurrence(UNITS[rest], interval, until=until)
+
+    days = _parse_weekdays(rest)
+    if days is not None:
+        return Recurrence("WEEKLY", interval, by_day=days, until=until)
+
+    rest = re.sub(r"\s+of\s+(?:the|every)\s+month$", "", rest)
+    if rest in ("last day", "last day of month", "end of month"):
+        return Recurrence("MONTHLY", interval, by_month_day=[-1], until=until)
+
+    month_day = MONTH_DAY_PATTERN.match(rest)
+    if month_day:
+        day = int(month_day.group(1) or month_day.group(2))
+        if 1 <= day <= 31:
+            return Recurrence("MONTHLY", interval, by_month_day=[day], until=until)
+        return None
+
+    nth_weekday = NTH_WEEKDAY_PATTERN.match(rest)
+    if nth_weekday and nth_weekday.group(3) in ("workday", "weekday", *WEEKDAYS):
+        position = int(nth_weekday.group(1)) if nth_weekday.group(1) else ORDINALS[nth_weekday.group(2)]
+        if not -1 <= position <= 5 or position == 0:
+            return None
+        weekday = nth_weekday.group(3)
+        if weekday in ("workday", "weekday"):
+            return Recurrence("MONTHLY", interval, by_day=WORKDAYS, by_set_pos=position, until=until)
+        return Recurrence("MONTHLY", interval, by_day=[f"{position}{WEEKDAYS[weekday]}"], until=until)
+
+    yearly = DATE_PATTERN.match(rest)
+    if yearly:
+        month_name = yearly.group(1) or yearly.group(6)
+        day = int(next(group for group in yearly.group(2, 3, 4, 5) if group))
+        if month_name in MONTHS and 1 <= day <= 31:
+            return Recurrence("YEARLY", interval, by_month=[MONTHS[month_name]], by_month_day=[day], until=until)
+    return None
+
+
+def expand_occurrences(recurrence: Recurrence, start: datetime, time_zone: str) -> List[datetime]:
+    """
+    Lists the occurrences of a recurrence within EXPANSION_HORIZON of its first one, at
+    most MAX_EXPANDED_OCCURRENCES of them.
+
+    Parameters:
+        recurrence (Recurrence): The recurrence.
+        start (datetime): The first occurrence, as a naive local datetime.
+        time_zone (str): Time zone of the event.
+
+    Returns:
+        List[datetime]: The naive local datetimes of the occurrences, the first one included.
+    """
+    rule = rrulestr(recurrence.to_rrule(time_zone).split(":", 1)[1], dtstart=start.replace(tzinfo=ZoneInfo(time_zone)))
+    horizon = start.replace(tzinfo=ZoneInfo(time_zone)) + EXPANSION_HORIZON
+    occurrences = []
+    for occurrence in rule:
+        if occurrence > horizon or len(occurrences) >= MAX_EXPANDED_OCCURRENCES:
+            break
+        occurrences.append(occurrence.replace(tzinfo=None))
+    return occurrences
+
+
+def recurrence_lines(due_string: Optional[str], start: datetime, time_zone: str) -> Optional[List[str]]:
+    """
+    Translates a recurring due string into the 'recurrence' field of a single event.
+
+    Recurrences Google Calendar can repeat by itself become an RRULE. Those it cannot,
+    such as hourly ones, are expanded into the explicit dates of their occurrences within
+    EXPANSION_HORIZON, as an RDATE; later syncs extend them as the due date moves forward.
+
+    Parameters:
+        due_string (Optional[str]): The due string of the task.
+        start (datetime): The first occurrence, as a naive local datetime.
+        time_zone (str): Time zone of the event.
+
+    Returns:
+        Optional[List[str]]: The recurrence lines, or None if the due string is not
+        understood or has no further occurrence, in which case only the next occurrence
+        is synced.
+    """
+    recurrence = parse_recurrence(due_string, start.date())
+    if recurrence is None:
+        logging.info(f"Recurrence '{due_string}' is not supported, only its next occurrence is synced.")
+        return None
+    if recurrence.freq in CALENDAR_FREQUENCIES:
+        return [recurrence.to_rrule(time_zone)]
+
+    occurrences = [occurrence for occurrence in expand_occurrences(recurrence, start, time_zone) if occurrence != start]
+    if not occurrences:
+        return None
+    dates = ",".join(occurrence.strftime("%Y%m%dT%H%M%S") for occurrence in occurrences)
+    return [f"RDATE;TZID={time_zone}:{dates}"]
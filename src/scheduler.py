@@ -0,0 +1,268 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+from src.metrics import METRICS, export_metrics
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+
+@dataclass
+class PollResult:
+    """
+    Outcome of a polling cycle.
+
+    Attributes:
+        changes (Optional[int]): Number of changed tasks found, or None if the cycle had no
+            previous state to compare to, such as the first full sync.
+        api_calls (int): Number of API calls the cycle made.
+    """
+    changes: Optional[int]
+    api_calls: int
+
+
+class AdaptiveInterval:
+    """
+    Polling interval that follows the rate at which tasks change.
+
+    The change rate is an exponential moving average of the changes observed per second
+    between polls, and the interval is the time expected for changes_per_poll changes at
+    that rate, kept within the bounds. A burst of changes brings the interval down at once,
+    while it grows by at most max_growth per poll, so an account going idle is backed off
+    gradually, up to the longest interval. Each delay is jittered so that accounts started
+    together do not keep polling in lockstep.
+    """
+
+    def __init__(
+        self,
+        min_seconds: float,
+        max_seconds: float,
+        changes_per_poll: float = 1.0,
+        smoothing: float = 0.5,
+        max_growth: float = 2.0,
+        jitter: float = 0.1
+    ) -> None:
+        """
+        Parameters:
+            min_seconds (float): Shortest interval, used until a change rate is known.
+            max_seconds (float): Longest interval.
+            changes_per_poll (float): Number of changes a poll should find on average.
+            smoothing (float): Weight of the latest observation in the change rate, from 0 to 1.
+            max_growth (float): Largest factor by which a poll lengthens the interval.
+            jitter (float): Largest random deviation of a delay, as a fraction of the interval.
+        """
+        if not 0 < min_seconds <= max_seconds:
+            raise ValueError(f"Invalid polling interval bounds: {min_seconds} to {max_seconds} seconds.")
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.changes_per_poll = changes_per_poll
+        self.smoothing = smoothing
+        self.max_growth = max_growth
+        self.jitter = jitter
+        self.rate: Optional[float] = None
+        self.interval = min_seconds
+
+    def record(self, changes: int, elapsed_seconds: float) -> float:
+        """
+        Updates the change rate with the changes found by a poll.
+
+        Parameters:
+            changes (int): Number of changes found.
+            elapsed_seconds (float): Time since the previous poll.
+
+        Returns:
+            float: The new interval, in seconds.
+        """
+        observed = changes / max(elapsed_seconds, 1e-9)
+        self.rate = observed if self.rate is None else self.smoothing * observed + (1 - self.smoothing) * self.rate
+        interval = self.changes_per_poll / self.rate if self.rate > 0 else self.max_seconds
+        interval = min(interval, self.interval * self.max_growth, self.max_seconds)
+        self.interval = max(self.min_seconds, interval)
+        return self.interval
+
+    def next_delay(self) -> float:
+        """
+        Returns the delay before the next poll: the interval with random jitter, within the bounds.
+
+        Returns:
+            float: The delay, in seconds.
+        """
+        delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(self.max_seconds, max(self.min_seconds, delay))
+
+
+class PollingScheduler:
+    """
+    Runs repeated polling cycles, each checking for changes and syncing the ones found,
+    at an interval adapted to the observed change rate.
+
+    A failed cycle is logged and retried after the current interval, without affecting it.
+    After every cycle, its cost and the time of the next one are recorded in METRICS and
+    exported with the metrics of the run.
+    """
+
+    def __init__(
+        self,
+        poll: Callable[[], PollResult],
+        interval: AdaptiveInterval,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time
+    ) -> None:
+        """
+        Parameters:
+            poll (Callable[[], PollResult]): Checks for changes and syncs them.
+            interval (AdaptiveInterval): The adaptive polling interval.
+            clock (Callable[[], float]): Monotonic clock, in seconds.
+            wall_clock (Callable[[], float]): Clock of the reported next run time, as a Unix timestamp.
+        """
+        self.poll = poll
+        self.interval = interval
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._stopped = threading.Event()
+        self._last_poll_at: Optional[float] = None
+        self.cycles = 0
+
+    def run_cycle(self) -> float:
+        """
+        Runs one polling cycle and schedules the next one.
+
+        Returns:
+            float: The delay before the next cycle, in seconds.
+        """
+        started = self._clock()
+        self.cycles += 1
+        try:
+            result: Optional[PollResult] = self.poll()
+        except Exception as e:
+            logging.error(f"Polling cycle {self.cycles} failed: {e}")
+            result = None
+        finished = self._clock()
+
+        if result is not None and result.changes is not None and self._last_poll_at is not None:
+            self.interval.record(result.changes, started - self._last_poll_at)
+        if result is not None:
+            self._last_poll_at = started
+
+        delay = self.interval.next_delay()
+        next_run_at = self._wall_clock() + delay
+        schedule = dict(
+            cycle=self.cycles,
+            cycle_seconds=round(finished - started, 6),
+            cycle_api_calls=result.api_calls if result is not None else 0,
+            interval_seconds=round(self.interval.interval, 3),
+            next_run_at=round(next_run_at, 3),
+        )
+        if result is not None and result.changes is not None:
+            schedule["changes"] = result.changes
+        METRICS.record_schedule(**schedule)
+        export_metrics()
+
+        next_run = f"next poll at {datetime.fromtimestamp(next_run_at):%H:%M:%S} (in {delay:.0f}s)"
+        if result is not None:
+            changes = "" if result.changes is None else f"{result.changes} changes, "
+            logging.info(
+                f"Polling cycle {self.cycles}: {changes}{result.api_calls} API calls in "
+                f"{finished - started:.2f}s; {next_run}."
+            )
+        else:
+            logging.info(f"Polling cycle {self.cycles} failed; {next_run}.")
+        return delay
+
+    def run(self, max_cycles: Optional[int] = None) -> None:
+        """
+        Runs polling cycles until stopped.
+
+        Parameters:
+            max_cycles (Optional[int]): Stop after this many cycles. None runs until stop is called.
+        """
+        while not self._stopped.is_set() and (max_cycles is None or self.cycles < max_cycles):
+            delay = self.run_cycle()
+            if max_cycles is not None and self.cycles >= max_cycles:
+                break
+            self._stopped.wait(delay)
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler once the current cycle ends.
+        """
+        self._stopped.set()
+
+
+def _count_api_calls() -> int:
+    return sum(call["count"] for call in METRICS.summary()["api_calls"])
+
+
+def poll_todoist_changes(default_event_duration: int = 30, match_strategy: Optional[str] = None) -> PollResult:
+    """
+    Checks Todoist for task changes with the persisted sync token, and syncs them if any.
+
+    Checking costs a single Todoist request, so an idle account is polled without touching
+    Google Calendar. Without a sync token, every task is synced and the token is saved.
+    The token is only saved once the changes are synced, so the changes of a failed
+    cycle are found again by the next one.
+
+    Parameters:
+        default_event_duration (int): The default duration for tasks/events in minutes.
+        match_strategy (Optional[str]): Strategy for finding the event a task was synced to.
+
+    Returns:
+        PollResult: The number of changed tasks and the API calls made.
+    """
+    # The sync pulls in the API clients, so it is only imported once polling actually runs
+    from src.sync import MATCH_BY_SUMMARY, sync_todoist_changes_to_gcal, sync_todoist_to_gcal
+    from src.todoist_client import get_task_deltas, load_todoist_sync_token, save_todoist_sync_token
+
+    match_strategy = match_strategy or MATCH_BY_SUMMARY
+    sync_token = load_todoist_sync_token()
+    if sync_token is None:
+        sync_todoist_to_gcal(default_event_duration, delta=True, match_strategy=match_strategy)
+        return PollResult(None, _count_api_calls())
+
+    METRICS.reset()
+    with METRICS.phase("check"):
+        changed_tasks, next_sync_token, full_sync = get_task_deltas(sync_token)
+    api_calls = _count_api_calls()
+    if full_sync:
+        # Todoist rejected the token, so the tasks removed since are only found by a full sync
+        sync_todoist_to_gcal(default_event_duration, delta=True, match_strategy=match_strategy)
+        return PollResult(None, api_calls + _count_api_calls())
+    if changed_tasks:
+        # The sync restarts the metrics, so the check's calls are added to the sync's
+        sync_todoist_changes_to_gcal(changed_tasks, default_event_duration, match_strategy=match_strategy)
+        api_calls += _count_api_calls()
+    save_todoist_sync_token(next_sync_token)
+    return PollResult(len(changed_tasks), api_calls)
+
+
+def run_scheduler(
+    min_interval_seconds: float,
+    max_interval_seconds: float,
+    jitter: float = 0.1,
+    default_event_duration: int = 30,
+    match_strategy: Optional[str] = None
+) -> None:
+    """
+    Polls Todoist for changes and syncs them until interrupted.
+
+    Parameters:
+        min_interval_seconds (float): Shortest interval between polls.
+        max_interval_seconds (float): Longest interval between polls.
+        jitter (float): Largest random deviation of a delay, as a fraction of the interval.
+        default_event_duration (int): The default duration for tasks/events in minutes.
+        match_strategy (Optional[str]): Strategy for finding the event a task was synced to.
+    """
+    scheduler = PollingScheduler(
+        lambda: poll_todoist_changes(default_event_duration, match_strategy),
+        AdaptiveInterval(min_interval_seconds, max_interval_seconds, jitter=jitter),
+    )
+    logging.info(f"Polling for changes every {min_interval_seconds:.0f} to {max_interval_seconds:.0f}s.")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        logging.info("Polling stopped.")
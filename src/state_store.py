@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from config.settings import Config
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+# Event fields pushed to Google Calendar, and therefore covered by the content hash
+HASHED_EVENT_FIELDS = ("summary", "description", "start", "end", "reminders")
+
+
+def hash_event(event: Dict[str, Any]) -> str:
+    """
+    Computes a hash of the fields pushed to Google Calendar for an event.
+
+    The start and end fields include the time zone, so a time zone change also
+    changes the hash. The recurrence is only covered when the event has one, so the
+    hashes of one-off events are the same as before recurring tasks were synced.
+
+    Parameters:
+        event (Dict[str, Any]): Dictionary containing event details.
+
+    Returns:
+        str: Hex digest identifying the event's content.
+    """
+    content = {field: event.get(field) for field in HASHED_EVENT_FIELDS}
+    if event.get("recurrence"):
+        content["recurrence"] = event["recurrence"]
+    serialized = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+# Version, in SQLite's user_version, of the stores holding current Todoist task IDs.
+# Stores written before every Todoist read went through API v1 have version 0 and may hold
+# legacy numeric IDs.
+CURRENT_TASK_IDS_VERSION = 1
+
+
+def get_state_store_path() -> str:
+    """
+    Returns the path of the SQLite state store.
+
+    Returns:
+        str: Path of the database inside the state directory.
+    """
+    return os.path.join(Config.STATE_DIR, "sync_state.db")
+
+
+class TaskStateStore:
+    """
+    Persistent mapping of Todoist task IDs to the Google Calendar events they were
+    synced to, together with a hash of the event content last pushed.
+
+    The store also holds a write-ahead journal of the event writes in flight. A write is
+    planned, and committed to disk, before it is sent; recording its outcome with put or
+    delete removes it from the journal. If the process dies in between, the next run
+    finds the planned write and replays it against the same event ID instead of matching
+    the task again, so a write that went through is never duplicated.
+
+    Changes are committed by commit, which the sync calls after each batch of writes, and
+    when the store is closed, so work confirmed before a crash is not redone. A store can
+    be shared by the threads syncing different calendars; its operations are serialized.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        path = path or get_state_store_path()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # Commits survive the process being killed without waiting for the disk on each
+        # one, which keeps committing every batch cheap
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        created = self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_events'"
+        ).fetchone() is None
+        if created:
+            # A new store only ever holds current Todoist IDs
+            self._connection.execute(f"PRAGMA user_version = {CURRENT_TASK_IDS_VERSION}")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS task_events (
+                calendar_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (calendar_id, task_id)
+            )
+            """
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS journal (
+                calendar_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                action TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (calendar_id, task_id)
+            )
+            """
+        )
+
+    def __enter__(self) -> "TaskStateStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def get(self, calendar_id: str, task_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Looks up the event a task was synced to.
+
+        Parameters:
+            calendar_id (str): ID of the calendar the task was synced to.
+            task_id (str): ID of the Todoist task.
+
+        Returns:
+            Optional[Tuple[str, str]]: The event ID and content hash, or None if the task
+            has not been synced yet.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT event_id, content_hash FROM task_events WHERE calendar_id = ? AND task_id = ?",
+                (calendar_id, task_id),
+            ).fetchone()
+
+    def put(self, calendar_id: str, task_id: str, event_id: str, content_hash: str) -> None:
+        """
+        Records the event a task was synced to and the hash of its content, completing
+        the write planned for the task.
+
+        Parameters:
+            calendar_id (str): ID of the calendar the task was synced to.
+            task_id (str): ID of the Todoist task.
+            event_id (str): ID of the Google Calendar event.
+            content_hash (str): Hash of the event content, as returned by hash_event.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO task_events (calendar_id, task_id, event_id, content_hash) VALUES (?, ?, ?, ?)",
+                (calendar_id, task_id, event_id, content_hash),
+            )
+            self._connection.execute(
+                "DELETE FROM journal WHERE calendar_id = ? AND task_id = ?", (calendar_id, task_id)
+            )
+
+    def delete(self, calendar_id: str, task_id: str) -> None:
+        """
+        Forgets the event a task was synced to, and any write planned for it.
+
+        Parameters:
+            calendar_id (str): ID of the calendar the task was synced to.
+            task_id (str): ID of the Todoist task.
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM task_events WHERE calendar_id = ? AND task_id = ?",
+                (calendar_id, task_id),
+            )
+            self._connection.execute(
+                "DELETE FROM journal WHERE calendar_id = ? AND task_id = ?", (calendar_id, task_id)
+            )
+
+    @property
+    def has_legacy_task_ids(self) -> bool:
+        """
+        Whether the store was written by a version that could record legacy numeric Todoist task IDs.
+        """
+        with self._lock:
+            return self._connection.execute("PRAGMA user_version").fetchone()[0] < CURRENT_TASK_IDS_VERSION
+
+    def task_ids(self, calendar_id: str) -> List[str]:
+        """
+        Lists the tasks with a synced event or a planned write in a calendar.
+
+        Parameters:
+            calendar_id (str): ID of the calendar.
+
+        Returns:
+            List[str]: The task IDs.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT task_id FROM task_events WHERE calendar_id = ? UNION SELECT task_id FROM journal WHERE calendar_id = ?",
+                (calendar_id, calendar_id),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def event_tasks(self, calendar_id: str) -> Dict[str, str]:
+        """
+        Maps the events synced to a calendar to their tasks.
+
+        Parameters:
+            calendar_id (str): ID of the calendar.
+
+        Returns:
+            Dict[str, str]: The task IDs keyed by event ID.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT event_id, task_id FROM task_events WHERE calendar_id = ?", (calendar_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def rename_tasks(self, calendar_id: str, task_ids: Dict[str, str]) -> None:
+        """
+        Moves the records and planned writes of tasks to new task IDs, such as when
+        Todoist changed the IDs of its tasks.
+
+        Parameters:
+            calendar_id (str): ID of the calendar.
+            task_ids (Dict[str, str]): The new ID of each task ID to rename.
+        """
+        renames = [(new_id, calendar_id, old_id) for old_id, new_id in task_ids.items()]
+        with self._lock:
+            for table in ("task_events", "journal"):
+                self._connection.executemany(
+                    f"UPDATE OR REPLACE {table} SET task_id = ? WHERE calendar_id = ? AND task_id = ?", renames
+                )
+            self._connection.commit()
+
+    def plan(self, calendar_id: str, writes: Iterable[Tuple[str, str, str, str]]) -> None:
+        """
+        Journals writes about to be sent and commits them to disk, together with every
+        change recorded so far.
+
+        Parameters:
+            calendar_id (str): ID of the calendar written to.
+            writes (Iterable[Tuple[str, str, str, str]]): The task ID, action ('insert' or
+                'update'), event ID and content hash of each write.
+        """
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO journal (calendar_id, task_id, action, event_id, content_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(calendar_id, task_id, action, event_id, content_hash) for task_id, action, event_id, content_hash in writes],
+            )
+            self._connection.commit()
+
+    def get_planned(self, calendar_id: str, task_id: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Looks up a write planned for a task whose outcome was never recorded.
+
+        Parameters:
+            calendar_id (str): ID of the calendar written to.
+            task_id (str): ID of the Todoist task.
+
+        Returns:
+            Optional[Tuple[str, str, str]]: The action, event ID and content hash of the
+            write, or None if no write is pending for the task.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT action, event_id, content_hash FROM journal WHERE calendar_id = ? AND task_id = ?",
+                (calendar_id, task_id),
+            ).fetchone()
+
+    def commit(self) -> None:
+        """
+        Commits the recorded changes to disk.
+        """
+        with self._lock:
+            self._connection.commit()
+
+    def close(self) -> None:
+        """
+        Commits the recorded changes and closes the database.
+        """
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
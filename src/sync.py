@@ -1,18 +1,59 @@
+import asyncio
+import copy
 import logging
-import re
-from src.gcal_client import create_gcal_service, add_reminder, create_calendar, sync_event
-from src.todoist_client import get_todoist_api, get_tasks
-from datetime import datetime, timedelta
-from typing import Optional
+import os
+import queue
+import threading
+from collections import deque
+from itertools import chain
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from functools import partial
+from googleapiclient.discovery import Resource
+from src.authentication import get_google_credentials
+from src.gcal_client import (
+    create_gcal_service, get_thread_gcal_service, add_reminder, execute_event_writes, match_event, new_event_id,
+    resolve_calendar_ids, forget_calendar_ids,
+    iter_events, remove_duration_pattern, sync_event_mirror, task_event_id, find_events_by_task_ids, get_private_property, set_private_properties,
+    EventIndex, EventWrite, CONTENT_HASH_PROPERTY, MAX_BATCH_SIZE, TODOIST_ID_PROPERTY
+)
+from src.todoist_client import (
+    get_id_mappings, get_task_deltas, is_legacy_id, iter_task_pages, load_todoist_sync_token, save_todoist_sync_token,
+    SyncTask
+)
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from src.calendar_routes import DEFAULT_CALENDAR_NAME, CalendarRoutes, load_calendar_routes, partition_tasks
+from src.metrics import METRICS, export_metrics
+from src.persistence import load_json_state, save_json_state
+from src.recurrence import recurrence_lines
+from src.state_store import TaskStateStore, hash_event
+from src.titles import parse_title
 from config.settings import Config
+from src.logging_setup import configure_logging
+
+if TYPE_CHECKING:
+    from todoist_api_python.api import Task
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename='sync.log',
-    filemode='a',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
+
+# Strategies for finding the event a task was synced to
+MATCH_BY_SUMMARY = "summary"
+MATCH_BY_TASK_ID = "task_id"
+MATCH_BY_PROPERTY = "extended_property"
+
+# Chunks of tasks the fetch can hand over to a calendar's sync ahead of its writes
+CALENDAR_QUEUE_CHUNKS = 4
+
+# Most calendars synced at once, each on its own thread
+MAX_PARALLEL_CALENDARS = 8
+
+# Fields copied to the event recreated for a task whose ID changed
+RECREATED_EVENT_FIELDS = ("summary", "description", "start", "end", "recurrence", "reminders", "extendedProperties")
+
+# Serializes the updates of the list of calendars moved to the current Todoist task IDs
+_task_id_migration_lock = threading.Lock()
+
 
 def extract_duration(task_summary: str) -> Optional[int]:
     """
@@ -30,96 +71,1313 @@ def extract_duration(task_summary: str) -> Optional[int]:
     Returns:
         Optional[int]: Duration in minutes as an integer if found, otherwise None.
     """
-    # Define the regex pattern for different time formats
-    pattern = re.compile(
-        r'\[(\d+)\s*(hours?|hrs?|h|horas?|hora|mins?|minutes?|min|m|minutos?)?\s*(\d+)?\s*(mins?|minutes?|min|m|minutos?)?\]',
-        re.IGNORECASE
+    return parse_title(task_summary).duration
+
+
+def get_event_window(tasks: Iterable["Task"], padding_days: int) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Computes the time window in which calendar events can match the given tasks.
+
+    The window spans the range of the tasks' due dates, widened by the padding on both
+    sides to cover time zones, long durations and recently rescheduled tasks.
+
+    Parameters:
+        tasks (Iterable[Task]): The Todoist tasks being synced.
+        padding_days (int): Number of days added before the earliest and after the latest due date.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: RFC 3339 'timeMin' and 'timeMax' values,
+        or (None, None) if no task has a due date.
+    """
+    due_dates = [date.fromisoformat(task.due.date[:10]) for task in tasks if task.due and task.due.date]
+    if not due_dates:
+        return None, None
+
+    padding = timedelta(days=padding_days)
+    time_min = datetime.combine(min(due_dates) - padding, time.min, dt_timezone.utc)
+    time_max = datetime.combine(max(due_dates) + padding + timedelta(days=1), time.min, dt_timezone.utc)
+    return time_min.isoformat(), time_max.isoformat()
+
+
+def event_index_loader(
+    service: Resource,
+    calendar_id: str,
+    window_padding_days: Optional[int] = 30,
+    incremental: bool = False
+) -> Callable[[List["Task"]], EventIndex]:
+    """
+    Creates the loader of a calendar's event index, for sync_tasks_to_calendar.
+
+    The loader is called with each batch of tasks to match. The first call lists the
+    calendar's events within the window around the batch's due dates. Later calls only list
+    the part of their window that is not covered yet, if any, and add it to the same index,
+    so streamed tasks can be matched without knowing the due dates of all of them upfront.
+
+    Parameters:
+        service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to index.
+        window_padding_days (Optional[int]): Padding of the window around the due dates,
+            see get_event_window. None lists the whole calendar on the first call.
+        incremental (bool): If True, index the calendar's persisted local mirror instead,
+            refreshed once on the first call.
+
+    Returns:
+        Callable[[List[Task]], EventIndex]: The loader.
+    """
+    index: Optional[EventIndex] = None
+    covered: Optional[Tuple[str, str]] = None
+
+    def load(tasks: List["Task"]) -> EventIndex:
+        nonlocal index, covered
+        if incremental or window_padding_days is None:
+            if index is None:
+                if incremental:
+                    index = EventIndex.from_events(sync_event_mirror(service, calendar_id).values())
+                else:
+                    index = EventIndex.build(service, calendar_id)
+            return index
+
+        time_min, time_max = get_event_window(tasks, window_padding_days)
+        if index is None:
+            index = EventIndex()
+        if time_min is None:
+            return index
+        windows, covered = uncovered_windows(covered, time_min, time_max)
+        for window_min, window_max in windows:
+            index.extend(iter_events(service, calendar_id, window_min, window_max))
+            logging.info(f"Indexed events of calendar {calendar_id} from {window_min} to {window_max}.")
+        return index
+
+    return load
+
+
+def uncovered_windows(
+    covered: Optional[Tuple[str, str]],
+    time_min: str,
+    time_max: str
+) -> Tuple[List[Tuple[str, str]], Tuple[str, str]]:
+    """
+    Finds the parts of a time window that an event index does not cover yet.
+
+    Parameters:
+        covered (Optional[Tuple[str, str]]): The window already indexed, or None.
+        time_min (str): RFC 3339 start of the window needed, in UTC.
+        time_max (str): RFC 3339 end of the window needed, in UTC.
+
+    Returns:
+        Tuple[List[Tuple[str, str]], Tuple[str, str]]: The windows to list, and the window
+        covered once they are indexed.
+    """
+    if covered is None:
+        return [(time_min, time_max)], (time_min, time_max)
+    # RFC 3339 strings in UTC with the same format compare like the instants they hold
+    windows = [(time_min, covered[0]), (covered[1], time_max)]
+    return (
+        [(window_min, window_max) for window_min, window_max in windows if window_min < window_max],
+        (min(time_min, covered[0]), max(time_max, covered[1]))
     )
+
+
+def is_syncable_delta(task: SyncTask) -> bool:
+    """
+    Checks whether a task returned by the Todoist API should be synced, whether it comes
+    from the Sync API or a page of tasks: completed, deleted and subtasks are skipped.
+
+    Parameters:
+        task (SyncTask): The changed task.
+
+    Returns:
+        bool: True if the task should be synced.
+    """
+    return not (task.is_completed or task.is_deleted or task.parent_id)
+
+
+def iter_syncable_tasks(pages: Iterable[List[SyncTask]]) -> Iterator[SyncTask]:
+    """
+    Flattens pages of tasks into the stream of the tasks to sync, fetching each page only
+    once the tasks of the previous one have been consumed.
+
+    Parameters:
+        pages (Iterable[List[SyncTask]]): Pages of tasks, such as from iter_task_pages.
+
+    Yields:
+        SyncTask: The tasks that pass is_syncable_delta.
+    """
+    pages = iter(pages)
+    while True:
+        with METRICS.phase("fetch_tasks"):
+            page = next(pages, None)
+        if page is None:
+            return
+        yield from (task for task in page if is_syncable_delta(task))
+
+
+class TaskKeys:
+    """
+    IDs and normalized summaries of the synced tasks of a calendar, which is all that
+    reconciliation needs to know of them, so the tasks themselves need not be kept.
+
+    Attributes:
+        task_ids (Set[str]): IDs of the tasks with a due date.
+        summaries (Set[str]): Their summaries, without the duration pattern.
+    """
+
+    def __init__(self) -> None:
+        self.task_ids: Set[str] = set()
+        self.summaries: Set[str] = set()
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable["Task"]) -> "TaskKeys":
+        """
+        Collects the keys of tasks.
+
+        Parameters:
+            tasks (Iterable[Task]): The tasks.
+
+        Returns:
+            TaskKeys: Their keys.
+        """
+        keys = cls()
+        for task in tasks:
+            keys.add(task)
+        return keys
+
+    def add(self, task: "Task") -> None:
+        """
+        Collects the keys of a task, if it has a due date.
+
+        Parameters:
+            task (Task): The task.
+        """
+        if task.due and task.due.date:
+            self.task_ids.add(str(task.id))
+            self.summaries.add(remove_duration_pattern(task.content))
+
+    def record(self, tasks: Iterable["Task"]) -> Iterator["Task"]:
+        """
+        Collects the keys of tasks as they stream through.
+
+        Parameters:
+            tasks (Iterable[Task]): The tasks.
+
+        Yields:
+            Task: The same tasks.
+        """
+        for task in tasks:
+            self.add(task)
+            yield task
+
+
+def _iter_queue(tasks_queue: "queue.Queue[Any]") -> Iterator["Task"]:
+    """
+    Yields the tasks handed over through a queue by fan_out_tasks.
+
+    Parameters:
+        tasks_queue (queue.Queue): Queue of lists of tasks, closed by None, or by an
+            exception if the fetch failed.
+
+    Yields:
+        Task: The tasks.
+
+    Raises:
+        RuntimeError: If the fetch of the tasks failed, so the stream is incomplete.
+    """
+    while True:
+        chunk = tasks_queue.get()
+        if chunk is None:
+            return
+        if isinstance(chunk, Exception):
+            raise RuntimeError(f"Fetching tasks from Todoist failed: {chunk}")
+        yield from chunk
+
+
+def fan_out_tasks(
+    tasks: Iterable["Task"],
+    routes: CalendarRoutes,
+    start_calendar: Callable[[str, Iterator["Task"]], Future],
+    calendar_names: Iterable[str] = ()
+) -> Dict[str, Future]:
+    """
+    Streams tasks to the syncs of the calendars they are routed to, each running on its
+    own thread.
+
+    A calendar's sync is started when its first task arrives, or right away for the given
+    calendar names. Its tasks are handed over in chunks of up to MAX_BATCH_SIZE through a
+    queue. Once the sync is running, the fetch waits while the queue holds
+    CALENDAR_QUEUE_CHUNKS chunks, so it never runs further ahead of the calendar's writes.
+    A sync still waiting for a free thread of a bounded pool is handed its tasks without
+    waiting, as it cannot drain them before another calendar finishes, which may itself
+    need the fetch to go on; the tasks of such calendars are buffered meanwhile. If the
+    fetch fails, every sync is told so, rather than left to believe it saw every task.
+
+    Parameters:
+        tasks (Iterable[Task]): The tasks to sync, consumed on the calling thread.
+        routes (CalendarRoutes): The routing of tasks to calendars.
+        start_calendar (Callable[[str, Iterator[Task]], Future]): Starts the sync of a
+            calendar, given its name and the stream of its tasks.
+        calendar_names (Iterable[str]): Calendars synced even if no task is routed to them.
+
+    Returns:
+        Dict[str, Future]: The sync of each calendar, keyed by calendar name.
+    """
+    queues: Dict[str, "queue.Queue[Any]"] = {}
+    futures: Dict[str, Future] = {}
+    chunks: Dict[str, List["Task"]] = {}
+
+    def start(calendar_name: str) -> None:
+        queues[calendar_name] = queue.Queue()
+        futures[calendar_name] = start_calendar(calendar_name, _iter_queue(queues[calendar_name]))
+
+    def put(calendar_name: str, chunk: Any) -> None:
+        tasks_queue, future = queues[calendar_name], futures[calendar_name]
+        while tasks_queue.qsize() >= CALENDAR_QUEUE_CHUNKS and future.running():
+            wait_futures([future], timeout=0.1)
+        if future.done():
+            return  # The calendar's sync failed, so its remaining tasks are dropped
+        tasks_queue.put(chunk)
+
+    for calendar_name in calendar_names:
+        start(calendar_name)
+    try:
+        for task in tasks:
+            calendar_name = routes.calendar_for(task)
+            if calendar_name is None:
+                continue
+            if calendar_name not in queues:
+                start(calendar_name)
+            chunk = chunks.setdefault(calendar_name, [])
+            chunk.append(task)
+            if len(chunk) >= MAX_BATCH_SIZE:
+                put(calendar_name, chunks.pop(calendar_name))
+    except Exception as e:
+        for calendar_name in queues:
+            put(calendar_name, e)
+        raise
+    for calendar_name in queues:
+        if calendar_name in chunks:
+            put(calendar_name, chunks.pop(calendar_name))
+        put(calendar_name, None)
+    return futures
+
+
+def build_event(task: "Task", default_event_duration: int = 30) -> Optional[Dict[str, Any]]:
+    """
+    Builds the Google Calendar event for a Todoist task.
+
+    A recurring task becomes a single event starting at its next occurrence and repeating
+    by the rule translated from its due string. If the due string cannot be translated,
+    the event only covers the next occurrence and moves with it as the task is completed.
+
+    Parameters:
+        task (Task): The Todoist task.
+        default_event_duration (int): The default duration for tasks/events in minutes.
+
+    Returns:
+        Optional[Dict[str, Any]]: The event with its reminder, or None if the task has no due date.
+    """
+    if not task.due or not task.due.date:
+        return None  # Skip tasks without a due date
     
-    matches = pattern.findall(task_summary)
-    
-    if not matches:
-        return None  # Return None if no matches are found
+    due_date = task.due.date
+    start_time = '09:00:00'
+    if task.due.datetime:
+        start_time = datetime.fromisoformat(task.due.datetime).time().isoformat()
     
-    total_minutes = 0
+    start_datetime = datetime.fromisoformat(due_date + 'T' + start_time)
+
+    # Extract duration from task properties, task content, or set as default
+    duration = extract_duration(task.content)
+    if task.duration and task.duration.unit == 'minute':
+        duration = task.duration.amount
+    if duration is None:
+        duration = default_event_duration
     
-    for match in matches:
-        hours, hour_unit, minutes, minute_unit = match
-        
-        # Convert hours to minutes if hour unit is present
-        if hours:
-            hours = int(hours)
-            if hour_unit and ('hour' in hour_unit.lower() or 'hora' in hour_unit.lower() or 'h' in hour_unit.lower()):
-                total_minutes += hours * 60
+    end_datetime = start_datetime + timedelta(minutes=duration)
+
+    timezone = task.due.timezone or Config.TIME_ZONE
+
+    event = {
+        'summary': task.content,
+        'description': task.description,
+        'start': {
+            'dateTime': start_datetime.isoformat(),
+            'timeZone': timezone,
+        },
+        'end': {
+            'dateTime': end_datetime.isoformat(),
+            'timeZone': timezone,
+        },
+    }
+    if getattr(task.due, 'is_recurring', False):
+        recurrence = recurrence_lines(getattr(task.due, 'string', None), start_datetime, timezone)
+        if recurrence:
+            event['recurrence'] = recurrence
+    event = add_reminder(event, 'popup', 15)
+
+    # Link the event to its task and fingerprint the pushed content, so both matching and
+    # change detection can be done from the event alone
+    return set_private_properties(event, **{
+        TODOIST_ID_PROPERTY: str(task.id),
+        CONTENT_HASH_PROPERTY: hash_event(event),
+    })
+
+
+def sync_tasks_to_calendar(
+    gcal_service: Resource,
+    calendar_id: str,
+    tasks: Iterable["Task"],
+    load_event_index: Callable[[List["Task"]], EventIndex],
+    state_store: Optional[TaskStateStore] = None,
+    default_event_duration: int = 30,
+    workers: int = 1,
+    get_worker_service: Optional[Callable[[], Resource]] = None,
+    match_strategy: str = MATCH_BY_SUMMARY
+) -> List[EventWrite]:
+    """
+    Syncs tasks to a calendar, queueing the resulting inserts and updates and writing
+    them in batches.
+
+    The tasks are consumed as a stream: each task is built into its event, matched and
+    queued in turn, and a batch is written as soon as it is full, so the first events are
+    written while later tasks are still being fetched, and only the tasks of the current
+    batches are held in memory.
+
+    The event index is only loaded once a task actually needs to be matched. With a state
+    store, tasks whose event content is unchanged are skipped without any API call, and
+    changed tasks update their event directly by ID, even if the task was renamed.
+
+    With more than one worker, batches are written concurrently by a bounded thread pool,
+    each worker using its own service. Outcomes are still handled in the order the batches
+    were queued, on the calling thread, so logging and the state store stay deterministic.
+
+    With the MATCH_BY_TASK_ID strategy, no event index is loaded: each task's event is
+    inserted under the ID derived from the task ID, and an insert rejected because the
+    event already exists becomes an update of that event.
+
+    With the MATCH_BY_PROPERTY strategy, the events are looked up in batches by their
+    'todoist_id' extended property, filtered by the server, and only rewritten if their
+    content hash differs. The event index is only loaded for the tasks not found this way,
+    to match untagged events by summary; these are then patched with their tags.
+
+    Updates of an event found by matching only patch the fields that changed. Updates by
+    state store or derived ID patch every synced field, since the event is not fetched.
+
+    With a state store, each batch is journaled before it is sent, new events getting their
+    ID upfront, and the outcomes are committed once it has been handled. A task whose
+    journaled write was interrupted before its outcome was recorded is not matched again:
+    the write is replayed against the journaled event ID, and an insert that had gone
+    through turns into an update of the event it created.
+
+    Parameters:
+        gcal_service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to sync to.
+        tasks (Iterable[Task]): The tasks to sync.
+        load_event_index (Callable[[List[Task]], EventIndex]): Returns the index of the
+            calendar's events covering the given tasks, called with each batch of tasks to
+            match by summary. See event_index_loader.
+        state_store (Optional[TaskStateStore]): Store of the events previously synced from tasks.
+        default_event_duration (int): The default duration for tasks/events in minutes.
+        workers (int): Number of batches written concurrently.
+        get_worker_service (Optional[Callable[[], Resource]]): Returns the service of the
+            calling worker thread. Required when workers is greater than one.
+        match_strategy (str): MATCH_BY_SUMMARY, MATCH_BY_TASK_ID or MATCH_BY_PROPERTY.
+
+    Returns:
+        List[EventWrite]: The writes that failed.
+    """
+    event_index: Optional[EventIndex] = None
+    pending: List[EventWrite] = []
+    failed: List[EventWrite] = []
+    # Tasks waiting to be matched, with their event and its content hash, resolved in batches
+    lookups: List[Tuple["Task", Dict[str, Any], str]] = []
+
+    def resolve_lookups() -> None:
+        nonlocal event_index
+        if match_strategy == MATCH_BY_PROPERTY:
+            found = find_events_by_task_ids(gcal_service, calendar_id, [task.id for task, _, _ in lookups])
+            # Events written before they were tagged can only be found by summary. Matching
+            # them writes the tags, so later runs find them by property.
+            untagged = [task for task, _, _ in lookups if task.id not in found]
+            if untagged:
+                event_index = load_event_index(untagged)
+        else:
+            event_index = load_event_index([task for task, _, _ in lookups])
+        for task, event, content_hash in lookups:
+            if match_strategy == MATCH_BY_PROPERTY:
+                existing_event = found.get(task.id)
+                if existing_event is None and event_index is not None:
+                    existing_event, _ = match_event(event, event_index)
+                    if existing_event is not None and get_private_property(existing_event, TODOIST_ID_PROPERTY):
+                        # The event belongs to another task
+                        existing_event = None
+                identical = (
+                    existing_event is not None and
+                    get_private_property(existing_event, CONTENT_HASH_PROPERTY) == content_hash
+                )
             else:
-                total_minutes += hours  # If no unit or minute unit, assume the number is in minutes
-        
-        # Add minutes if minute unit is present
-        if minutes:
-            total_minutes += int(minutes)
-    
-    return total_minutes
+                existing_event, identical = match_event(event, event_index)
+            if existing_event is not None and identical:
+                if state_store is not None:
+                    state_store.put(calendar_id, task.id, existing_event['id'], content_hash)
+                continue
+            event_id = existing_event['id'] if existing_event is not None else None
+            pending.append(EventWrite(event, event_id, tag=(task, content_hash, False), existing_event=existing_event))
+        lookups.clear()
+
+    def queue_matched(task: "Task", event: Dict[str, Any], content_hash: str) -> None:
+        if match_strategy == MATCH_BY_TASK_ID:
+            pending.append(EventWrite(dict(event, id=task_event_id(task.id)), tag=(task, content_hash, False)))
+            return
+        lookups.append((task, event, content_hash))
+        if len(lookups) >= MAX_BATCH_SIZE:
+            resolve_lookups()
+
+    def handle_outcomes(writes: List[EventWrite]) -> None:
+        for write in writes:
+            task, content_hash, by_state = write.tag
+            if write.error is None:
+                if event_index is not None:
+                    event_index.add(write.result)
+                if state_store is not None:
+                    state_store.put(calendar_id, task.id, write.result['id'], content_hash)
+            elif by_state and write.error.resp.status in (404, 410):
+                # The event synced previously no longer exists, so match the task again
+                logging.info(f"Synced event {write.event_id} no longer exists.")
+                queue_matched(task, write.event, content_hash)
+            elif write.action == 'insert' and 'id' in write.event and write.error.resp.status == 409:
+                # The task's event already exists, possibly deleted, so update and restore it
+                event = dict(write.event, status='confirmed')
+                pending.append(EventWrite(event, event.pop('id'), tag=(task, content_hash, False)))
+            else:
+                failed.append(write)
+        if state_store is not None:
+            state_store.commit()
+
+    def journal(writes: List[EventWrite]) -> None:
+        planned = []
+        for write in writes:
+            if write.action == 'insert' and 'id' not in write.event:
+                write.event = dict(write.event, id=new_event_id())
+            task, content_hash, _ = write.tag
+            event_id = write.event['id'] if write.action == 'insert' else write.event_id
+            planned.append((task.id, write.action, event_id, content_hash))
+        state_store.plan(calendar_id, planned)
+
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    in_flight: Deque[Future] = deque()
+
+    def write_in_worker(writes: List[EventWrite]) -> List[EventWrite]:
+        return execute_event_writes(get_worker_service(), calendar_id, writes)
+
+    def flush() -> None:
+        writes = pending[:]
+        pending.clear()
+        if state_store is not None:
+            journal(writes)
+        if executor is None:
+            handle_outcomes(execute_event_writes(gcal_service, calendar_id, writes))
+            return
+        in_flight.append(executor.submit(write_in_worker, writes))
+        while len(in_flight) >= workers:
+            handle_outcomes(in_flight.popleft().result())
+
+    try:
+        for task in tasks:
+            with METRICS.phase("build"):
+                event = build_event(task, default_event_duration)
+            if event is None:
+                continue
+
+            with METRICS.phase("match"):
+                content_hash = get_private_property(event, CONTENT_HASH_PROPERTY)
+                record = state_store.get(calendar_id, task.id) if state_store is not None else None
+                planned = None
+                if record is None and state_store is not None:
+                    planned = state_store.get_planned(calendar_id, task.id)
+                if planned is not None:
+                    # A previous run was interrupted before the outcome of this write was recorded
+                    action, event_id, _ = planned
+                    if action == 'insert':
+                        pending.append(EventWrite(dict(event, id=event_id), tag=(task, content_hash, False)))
+                    else:
+                        pending.append(EventWrite(event, event_id, tag=(task, content_hash, True)))
+                elif record is None:
+                    queue_matched(task, event, content_hash)
+                elif record[1] != content_hash:
+                    pending.append(EventWrite(event, record[0], tag=(task, content_hash, True)))
+                # Otherwise the task is unchanged since the last sync
+
+            if len(pending) >= MAX_BATCH_SIZE:
+                with METRICS.phase("write"):
+                    flush()
+
+        while pending or in_flight or lookups:
+            if lookups:
+                with METRICS.phase("match"):
+                    resolve_lookups()
+            else:
+                with METRICS.phase("write"):
+                    if pending:
+                        flush()
+                    else:
+                        handle_outcomes(in_flight.popleft().result())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    return failed
+
+
+def migrate_to_task_id_events(
+    gcal_service: Resource,
+    calendar_id: str,
+    tasks: Iterable["Task"],
+    state_store: Optional[TaskStateStore] = None,
+    default_event_duration: int = 30
+) -> List[EventWrite]:
+    """
+    Moves the events matched to tasks by summary to the event IDs derived from the task IDs.
+
+    Event IDs cannot be changed, so each matched event is recreated under its derived ID and
+    the original event is deleted once the new one exists. Both steps are batched.
+
+    Parameters:
+        gcal_service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to migrate.
+        tasks (Iterable[Task]): All the tasks synced to the calendar.
+        state_store (Optional[TaskStateStore]): Store updated with the new event IDs.
+        default_event_duration (int): The default duration for tasks/events in minutes.
+
+    Returns:
+        List[EventWrite]: The writes that failed.
+    """
+    event_index = EventIndex.build(gcal_service, calendar_id)
+    inserts: List[EventWrite] = []
+    for task in tasks:
+        event = build_event(task, default_event_duration)
+        if event is None:
+            continue
+        existing_event, _ = match_event(event, event_index)
+        event_id = task_event_id(task.id)
+        if existing_event is None or existing_event['id'] == event_id:
+            continue
+        inserts.append(EventWrite(dict(event, id=event_id), tag=(task.id, hash_event(event), existing_event['id'])))
+
+    deletes: List[EventWrite] = []
+    failed: List[EventWrite] = []
+    for write in execute_event_writes(gcal_service, calendar_id, inserts):
+        task_id, content_hash, old_event_id = write.tag
+        if write.error is None:
+            if state_store is not None:
+                state_store.put(calendar_id, task_id, write.result['id'], content_hash)
+        elif write.error.resp.status != 409:
+            failed.append(write)
+            continue
+        # The event now exists under its derived ID, so the original can go
+        deletes.append(EventWrite(None, old_event_id, action='delete'))
+
+    for write in execute_event_writes(gcal_service, calendar_id, deletes):
+        if write.error is not None and write.error.resp.status not in (404, 410):
+            failed.append(write)
+
+    logging.info(f"Migrated {len(inserts) - len(failed)} events to task-derived IDs.")
+    return failed
+
+
+def migrate_legacy_task_ids(
+    gcal_service: Resource,
+    calendar_id: str,
+    state_store: Optional[TaskStateStore] = None
+) -> List[EventWrite]:
+    """
+    Moves the state and the event tags of a calendar from legacy numeric Todoist task IDs,
+    written by runs reading the Sync API v9, to the current IDs every Todoist read returns.
+
+    The state store records of the tasks are renamed and the 'todoist_id' property of
+    their events is patched. Events whose ID was derived from a legacy task ID cannot be
+    renamed, so they are recreated under the ID derived from the current one and the
+    originals are deleted once the new ones exist, as in migrate_to_task_id_events.
+
+    Parameters:
+        gcal_service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to migrate.
+        state_store (Optional[TaskStateStore]): Store whose records are renamed.
+
+    Returns:
+        List[EventWrite]: The writes that failed.
+    """
+    events = list(iter_events(gcal_service, calendar_id))
+    legacy_ids = {task_id for task_id in (state_store.task_ids(calendar_id) if state_store else []) if is_legacy_id(task_id)}
+    legacy_ids.update(
+        task_id for task_id in (get_private_property(event, TODOIST_ID_PROPERTY) for event in events)
+        if is_legacy_id(task_id)
+    )
+    if not legacy_ids:
+        return []
+    task_ids = get_id_mappings("tasks", legacy_ids)
+    if state_store is not None:
+        state_store.rename_tasks(calendar_id, task_ids)
+
+    retags: List[EventWrite] = []
+    inserts: List[EventWrite] = []
+    for event in events:
+        legacy_id = get_private_property(event, TODOIST_ID_PROPERTY)
+        task_id = task_ids.get(legacy_id)
+        if task_id is None:
+            continue
+        if event['id'] == task_event_id(legacy_id):
+            new_event = {field: event[field] for field in RECREATED_EVENT_FIELDS if field in event}
+            new_event = set_private_properties(new_event, **{TODOIST_ID_PROPERTY: task_id})
+            inserts.append(EventWrite(dict(new_event, id=task_event_id(task_id)), tag=(task_id, event['id'])))
+        else:
+            new_event = set_private_properties(copy.deepcopy(event), **{TODOIST_ID_PROPERTY: task_id})
+            retags.append(EventWrite(new_event, event['id'], existing_event=event))
+
+    failed = [write for write in execute_event_writes(gcal_service, calendar_id, retags) if write.error is not None]
+    deletes: List[EventWrite] = []
+    for write in execute_event_writes(gcal_service, calendar_id, inserts):
+        task_id, old_event_id = write.tag
+        if write.error is not None and write.error.resp.status != 409:
+            failed.append(write)
+            continue
+        if state_store is not None:
+            record = state_store.get(calendar_id, task_id)
+            if record is not None:
+                state_store.put(calendar_id, task_id, write.event['id'], record[1])
+        deletes.append(EventWrite(None, old_event_id, action='delete'))
+
+    for write in execute_event_writes(gcal_service, calendar_id, deletes):
+        if write.error is not None and write.error.resp.status not in (404, 410):
+            failed.append(write)
+
+    logging.info(f"Moved {len(task_ids)} tasks of calendar {calendar_id} to their current Todoist IDs.")
+    return failed
+
+
+def ensure_task_ids_migrated(
+    gcal_service: Resource,
+    calendar_id: str,
+    state_store: Optional[TaskStateStore] = None
+) -> None:
+    """
+    Runs migrate_legacy_task_ids once per calendar, recording the migrated calendars in
+    the state directory. Only state stores written before every Todoist read went through
+    API v1 can hold legacy IDs, so nothing is done for newer ones or without a store.
+
+    Parameters:
+        gcal_service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to migrate.
+        state_store (Optional[TaskStateStore]): Store whose records are renamed.
+
+    Raises:
+        RuntimeError: If some events could not be migrated; the migration is retried on the next run.
+    """
+    if state_store is None or not state_store.has_legacy_task_ids:
+        return
+    path = os.path.join(Config.STATE_DIR, "todoist_id_migration.json")
+    with _task_id_migration_lock:
+        if calendar_id in load_json_state(path, []):
+            return
+    with METRICS.phase("migrate"):
+        failed = migrate_legacy_task_ids(gcal_service, calendar_id, state_store)
+    if failed:
+        raise RuntimeError(f"{len(failed)} events could not be moved to the current Todoist task IDs.")
+    with _task_id_migration_lock:
+        save_json_state(path, load_json_state(path, []) + [calendar_id])
+
+
+def find_orphan_events(
+    events: Iterable[Dict[str, Any]],
+    task_ids: Set[str],
+    summaries: Set[str],
+    event_tasks: Optional[Dict[str, str]] = None,
+    match_summaries: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Finds the events whose task is no longer synced, in a single pass over the events.
+
+    Events tagged with a 'todoist_id' property are matched by task ID, as are untagged
+    events recorded in the state store as synced from a task. Any other event may have been
+    created by hand, so it is kept, unless match_summaries is set: older events synced
+    before tagging are then matched by their summary, ignoring the duration pattern.
+
+    Parameters:
+        events (Iterable[Dict[str, Any]]): The events of the calendar.
+        task_ids (Set[str]): IDs of the tasks that are synced.
+        summaries (Set[str]): Normalized summaries of the tasks that are synced.
+        event_tasks (Optional[Dict[str, str]]): IDs of the tasks recorded as synced to
+            events, keyed by event ID.
+        match_summaries (bool): If True, untagged and unrecorded events whose summary
+            matches no synced task are orphans too.
+
+    Returns:
+        List[Dict[str, Any]]: The orphaned events.
+    """
+    event_tasks = event_tasks or {}
+    orphans = []
+    for event in events:
+        task_id = get_private_property(event, TODOIST_ID_PROPERTY) or event_tasks.get(event['id'])
+        if task_id is not None:
+            if task_id not in task_ids:
+                orphans.append(event)
+        elif match_summaries and remove_duration_pattern(event.get('summary', '')) not in summaries:
+            orphans.append(event)
+    return orphans
+
+
+def reconcile_orphan_events(
+    gcal_service: Resource,
+    calendar_id: str,
+    task_keys: TaskKeys,
+    state_store: Optional[TaskStateStore] = None,
+    dry_run: bool = False,
+    match_summaries: bool = False
+) -> List[EventWrite]:
+    """
+    Deletes the events of tasks that were completed, deleted or lost their due date.
+
+    The calendar is listed once and compared against the complete set of synced tasks, so
+    any event synced from a task that is no longer synced is removed, in batches. Events
+    not known to come from a task are kept, see find_orphan_events.
+
+    Parameters:
+        gcal_service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to reconcile.
+        task_keys (TaskKeys): The keys of all the tasks synced to the calendar.
+        state_store (Optional[TaskStateStore]): Store of the events synced from tasks, from
+            which the orphans' tasks are removed.
+        dry_run (bool): If True, only print the events that would be deleted.
+        match_summaries (bool): If True, also delete the untagged events whose summary
+            matches no synced task. Only meant for calendars holding nothing but synced tasks.
+
+    Returns:
+        List[EventWrite]: The deletes that failed.
+    """
+    event_tasks = state_store.event_tasks(calendar_id) if state_store is not None else {}
+    orphans = find_orphan_events(
+        iter_events(gcal_service, calendar_id), task_keys.task_ids, task_keys.summaries, event_tasks, match_summaries
+    )
+
+    if dry_run:
+        for event in orphans:
+            print(f"Would delete orphaned event: {event.get('summary')} ({event.get('htmlLink')})")
+        return []
+
+    deletes = [
+        EventWrite(
+            None, event['id'], action='delete',
+            tag=get_private_property(event, TODOIST_ID_PROPERTY) or event_tasks.get(event['id'])
+        )
+        for event in orphans
+    ]
+    failed = []
+    for write in execute_event_writes(gcal_service, calendar_id, deletes):
+        if write.error is not None and write.error.resp.status not in (404, 410):
+            failed.append(write)
+        elif state_store is not None and write.tag is not None:
+            state_store.delete(calendar_id, write.tag)
+
+    logging.info(f"Deleted {len(deletes) - len(failed)} orphaned events.")
+    return failed
+
+
+def sync_task_changes(
+    gcal_service: Resource,
+    calendar_id: str,
+    changed_tasks: Iterable[SyncTask],
+    state_store: Optional[TaskStateStore] = None,
+    default_event_duration: int = 30,
+    match_strategy: str = MATCH_BY_SUMMARY,
+    window_padding_days: Optional[int] = 30
+) -> List[EventWrite]:
+    """
+    Syncs individual tasks reported as changed, such as by Todoist webhooks.
+
+    Syncable tasks are written as in a regular sync. The events of tasks that were completed,
+    deleted or otherwise stopped being synced are deleted, without listing the calendar:
+    their events are found through the state store, or by their 'todoist_id' property.
+
+    Parameters:
+        gcal_service (Resource): Authenticated Google Calendar API service instance.
+        calendar_id (str): ID of the calendar to sync to.
+        changed_tasks (Iterable[SyncTask]): The latest state of each changed task.
+        state_store (Optional[TaskStateStore]): Store of the events previously synced from tasks.
+        default_event_duration (int): The default duration for tasks/events in minutes.
+        match_strategy (str): MATCH_BY_SUMMARY, MATCH_BY_TASK_ID or MATCH_BY_PROPERTY.
+        window_padding_days (Optional[int]): Only calendar events within this many days of
+            the tasks' due dates are fetched for summary matching.
+
+    Returns:
+        List[EventWrite]: The writes that failed.
+    """
+    upserts: List[SyncTask] = []
+    removals: List[SyncTask] = []
+    for task in changed_tasks:
+        if is_syncable_delta(task) and task.due and task.due.date:
+            upserts.append(task)
+        else:
+            removals.append(task)
+
+    failed = sync_tasks_to_calendar(
+        gcal_service, calendar_id, upserts, event_index_loader(gcal_service, calendar_id, window_padding_days),
+        state_store, default_event_duration,
+        match_strategy=match_strategy
+    ) if upserts else []
 
+    event_ids: Dict[str, str] = {}
+    for task in removals:
+        record = state_store.get(calendar_id, task.id) if state_store is not None else None
+        if record is not None:
+            event_ids[task.id] = record[0]
+    unknown = [task.id for task in removals if task.id not in event_ids]
+    if unknown:
+        found = find_events_by_task_ids(gcal_service, calendar_id, unknown)
+        event_ids.update((task_id, event['id']) for task_id, event in found.items())
 
-def sync_todoist_to_gcal(default_event_duration: int = 30) -> None:
+    deletes = [EventWrite(None, event_id, tag=task_id, action='delete') for task_id, event_id in event_ids.items()]
+    for write in execute_event_writes(gcal_service, calendar_id, deletes):
+        if write.error is not None and write.error.resp.status not in (404, 410):
+            failed.append(write)
+        elif state_store is not None:
+            state_store.delete(calendar_id, write.tag)
+
+    logging.info(f"Synced {len(upserts)} changed tasks and removed the events of {len(deletes)} tasks.")
+    return failed
+
+
+def sync_todoist_to_gcal(
+    default_event_duration: int = 30,
+    window_padding_days: Optional[int] = 30,
+    incremental: bool = False,
+    delta: bool = False,
+    use_state_store: bool = True,
+    workers: int = 1,
+    match_strategy: str = MATCH_BY_SUMMARY,
+    reconcile: bool = False,
+    dry_run: bool = False,
+    reconcile_untagged: bool = False
+) -> None:
     """
     Syncs Todoist tasks to Google Calendar.
 
+    The sync is a pipeline of streaming stages: tasks are fetched from Todoist page by page,
+    routed to their calendar, built into events, matched and written in batches. Each stage
+    pulls from the previous one, so writes start as soon as the first page is fetched and
+    memory stays bounded by the page and batch sizes rather than the number of tasks.
+
+    Tasks are routed to calendars by project or label, as configured by CALENDAR_ROUTES_FILE,
+    and each calendar is synced with its own event index. When several calendars are routed,
+    up to MAX_PARALLEL_CALENDARS are synced concurrently, each in its own thread with its own
+    service, fed by fan_out_tasks.
+
+    The time spent in each phase and every API call are recorded in METRICS, and a summary
+    is written to the metrics files when the run ends, whether it succeeded or not.
+
     Parameters:
         default_event_duration (int): The default duration for tasks/events in minutes.
+        window_padding_days (Optional[int]): Only calendar events within this many days of
+            the tasks' due dates are fetched for matching. None fetches the whole calendar.
+        incremental (bool): If True, match against a persisted local mirror of the calendar
+            that is refreshed with only the events changed since the previous run.
+            The time window is not used in this mode.
+        delta (bool): If True, only sync the tasks changed since the previous run, using the
+            Todoist Sync API and a persisted sync token, and remove the events of the tasks
+            completed or deleted since. The first run, or a run whose token Todoist rejects,
+            syncs every task and removes the events of the tasks it no longer returns.
+        use_state_store (bool): If True, remember which event each task was synced to.
+            Tasks whose event content is unchanged are skipped without any API call, and
+            changed tasks update their event directly, even if the task was renamed.
+        workers (int): Number of event batches written concurrently for each calendar, each
+            worker thread using its own Google Calendar service built from the shared credentials.
+        match_strategy (str): MATCH_BY_SUMMARY matches tasks to existing events by summary.
+            MATCH_BY_TASK_ID writes each task to the event ID derived from its task ID,
+            without listing the calendar; the first such run migrates the events created
+            by summary matching to their derived IDs. MATCH_BY_PROPERTY looks events up
+            by the task ID stored in their private extended properties.
+        reconcile (bool): If True, delete the events of tasks that are no longer synced after
+            syncing. Every event of a routed calendar that was synced from a task, as shown
+            by its 'todoist_id' tag or the state store, and that no task routed to the
+            calendar accounts for is removed, including the events of tasks moved to another
+            calendar. Other events are kept. In delta mode, the full task list is streamed
+            for the comparison.
+        dry_run (bool): If True, print the orphaned events instead of deleting them.
+        reconcile_untagged (bool): If True, reconciling DEFAULT_CALENDAR_NAME also deletes
+            the untagged events whose summary matches no synced task, such as events synced
+            before tasks were tagged. Other calendars may hold events created by hand, so
+            they are never reconciled by summary.
     """
+    METRICS.reset()
     try:
+        # Get tasks from Todoist, excluding subtasks. The full fetch is streamed page by page
+        # as the calendars consume it.
+        if delta:
+            with METRICS.phase("fetch_tasks"):
+                changed_tasks, next_sync_token, full_sync = get_task_deltas(load_todoist_sync_token())
+            tasks: Iterable["Task"] = [task for task in changed_tasks if is_syncable_delta(task)]
+            # Completed, deleted and undated tasks have their events removed
+            removed_tasks = [
+                task for task in changed_tasks if not (is_syncable_delta(task) and task.due and task.due.date)
+            ]
+            if not tasks and not removed_tasks and not reconcile and not full_sync:
+                save_todoist_sync_token(next_sync_token)
+                logging.info("No task changes to sync.")
+                return
+            # A full sync, such as after Todoist rejected the token, only returns the active
+            # tasks. The tasks recorded in the state store but missing from it are removed,
+            # and without a state store, the calendars are reconciled instead.
+            reconcile = reconcile or (full_sync and not use_state_store)
+        else:
+            tasks = iter_syncable_tasks(iter_task_pages())
+            removed_tasks = []
+            full_sync = False
+
+        routes = load_calendar_routes()
+        removals = partition_tasks(removed_tasks, routes)
+
         # Initialize services
-        todoist_api = get_todoist_api()
-        gcal_service = create_gcal_service()
-        
-        # Ensure the calendar exists
-        calendar_name = "Todoist Tasks"
-        calendar = create_calendar(gcal_service, calendar_name)
-        
-        # Get tasks from Todoist, excluding subtasks and recurring tasks
-        tasks = get_tasks(todoist_api, exclude_recurring=True, exclude_subtasks=True)
-        
-        # Sync tasks to Google Calendar
-        for task in tasks:
-            if not task.due or not task.due.date:
-                continue  # Skip tasks without a due date
-            
-            due_date = task.due.date
-            start_time = '09:00:00'
-            if task.due.datetime:
-                start_time = datetime.fromisoformat(task.due.datetime).time().isoformat()
-            
-            start_datetime = datetime.fromisoformat(due_date + 'T' + start_time)
-
-            # Extract duration from task properties, task content, or set as default
-            duration = extract_duration(task.content)
-            if task.duration and task.duration.unit == 'minute':
-                duration = task.duration.amount
-            if duration is None:
-                duration = default_event_duration
-            
-            end_datetime = start_datetime + timedelta(minutes=duration)
-
-            timezone = task.due.timezone or Config.TIME_ZONE
-
-            event = {
-                'summary': task.content,
-                'description': task.description,
-                'start': {
-                    'dateTime': start_datetime.isoformat(),
-                    'timeZone': timezone,
-                },
-                'end': {
-                    'dateTime': end_datetime.isoformat(),
-                    'timeZone': timezone,
-                },
-            }
-            event_with_reminder = add_reminder(event, 'popup', 15)
-            created_event = sync_event(gcal_service, calendar['id'], event_with_reminder)
-            print(f"Created or existing event: {created_event['htmlLink']}")
+        with METRICS.phase("auth"):
+            credentials = get_google_credentials()
+            gcal_service = create_gcal_service(credentials)
+
+        def iter_calendar_tasks(calendar_name: str) -> Iterator["Task"]:
+            # A fresh stream of every task routed to the calendar
+            return (
+                task for task in iter_syncable_tasks(iter_task_pages())
+                if routes.calendar_for(task) == calendar_name
+            )
+
+        # Reconciling in delta mode needs the keys of every task, which are streamed once
+        # for all calendars
+        all_task_keys: List[Dict[Optional[str], TaskKeys]] = []
+        all_task_keys_lock = threading.Lock()
+
+        def get_all_task_keys(calendar_name: str) -> TaskKeys:
+            with all_task_keys_lock:
+                if not all_task_keys:
+                    keys: Dict[Optional[str], TaskKeys] = {}
+                    for task in iter_syncable_tasks(iter_task_pages()):
+                        keys.setdefault(routes.calendar_for(task), TaskKeys()).add(task)
+                    all_task_keys.append(keys)
+            return all_task_keys[0].get(calendar_name, TaskKeys())
+
+        migration_path = os.path.join(Config.STATE_DIR, "task_id_migration.json")
+        migration_lock = threading.Lock()
+
+        def sync_calendar(service: Resource, calendar_name: str, calendar_tasks: Iterable["Task"]) -> List[EventWrite]:
+            # Ensure the calendar exists
+            with METRICS.phase("calendar"):
+                calendar_id = resolve_calendar_ids(service, [calendar_name])[calendar_name]
+            ensure_task_ids_migrated(service, calendar_id, state_store)
+
+            if match_strategy == MATCH_BY_TASK_ID:
+                with migration_lock:
+                    migrated = calendar_id in load_json_state(migration_path, [])
+                if not migrated:
+                    # The migration needs every task before the sync starts, so it streams
+                    # them separately; it only runs once per calendar
+                    with METRICS.phase("migrate"):
+                        failed = migrate_to_task_id_events(
+                            service, calendar_id, iter_calendar_tasks(calendar_name), state_store,
+                            default_event_duration
+                        )
+                    if failed:
+                        raise RuntimeError(f"{len(failed)} events could not be migrated to task-derived IDs.")
+                    with migration_lock:
+                        save_json_state(migration_path, load_json_state(migration_path, []) + [calendar_id])
+
+            # Sync tasks to Google Calendar, recording the keys of the synced tasks for reconciliation
+            synced_keys = TaskKeys()
+            failed = sync_tasks_to_calendar(
+                service, calendar_id, synced_keys.record(calendar_tasks) if reconcile or full_sync else calendar_tasks,
+                event_index_loader(service, calendar_id, window_padding_days, incremental), state_store,
+                default_event_duration, workers, lambda: get_thread_gcal_service(credentials), match_strategy
+            )
+            calendar_removals = removals.get(calendar_name, [])
+            if full_sync and state_store is not None:
+                calendar_removals = calendar_removals + [
+                    SyncTask(id=task_id, content="", is_deleted=True)
+                    for task_id in state_store.task_ids(calendar_id) if task_id not in synced_keys.task_ids
+                ]
+            if calendar_removals:
+                failed += sync_task_changes(
+                    service, calendar_id, calendar_removals, state_store, default_event_duration,
+                    match_strategy, window_padding_days
+                )
+
+            if reconcile:
+                with METRICS.phase("reconcile"):
+                    # A full delta sync already streamed every task of the calendar
+                    task_keys = get_all_task_keys(calendar_name) if delta and not full_sync else synced_keys
+                    failed += reconcile_orphan_events(
+                        service, calendar_id, task_keys, state_store, dry_run,
+                        match_summaries=reconcile_untagged and calendar_name == DEFAULT_CALENDAR_NAME
+                    )
+            return failed
+
+        def sync_calendar_in_thread(calendar_name: str, calendar_tasks: Iterable["Task"]) -> List[EventWrite]:
+            return sync_calendar(get_thread_gcal_service(credentials), calendar_name, calendar_tasks)
+
+        # Each calendar's outcome is either its failed writes or the error it raised.
+        # Reconciliation also covers the calendars no task is routed to.
+        outcomes: Dict[str, Any] = {}
+        calendar_names = routes.calendar_names()
+        state_store = TaskStateStore() if use_state_store else None
+        try:
+            if len(calendar_names) == 1:
+                # A single calendar is synced on the calling thread, once a task is routed to it
+                routed = (task for task in tasks if routes.calendar_for(task) == calendar_names[0])
+                first_task = next(routed, None)
+                if first_task is not None or reconcile or removals or full_sync:
+                    calendar_tasks = chain([first_task] if first_task is not None else [], routed)
+                    try:
+                        outcomes[calendar_names[0]] = sync_calendar(gcal_service, calendar_names[0], calendar_tasks)
+                    except Exception as e:
+                        outcomes[calendar_names[0]] = e
+            elif calendar_names:
+                # Calendars are synced on a bounded pool of threads, fed as the fetch streams tasks
+                with ThreadPoolExecutor(max_workers=min(len(calendar_names), MAX_PARALLEL_CALENDARS)) as executor:
+                    futures = fan_out_tasks(
+                        tasks, routes, partial(executor.submit, sync_calendar_in_thread),
+                        calendar_names if reconcile or full_sync else list(removals)
+                    )
+                for calendar_name, future in futures.items():
+                    outcomes[calendar_name] = future.exception() or future.result()
+        finally:
+            if state_store is not None:
+                state_store.close()
+
+        errors = [outcome for outcome in outcomes.values() if isinstance(outcome, Exception)]
+        failed = [write for outcome in outcomes.values() if isinstance(outcome, list) for write in outcome]
+        failed_calendars = [name for name, outcome in outcomes.items() if isinstance(outcome, Exception) or outcome]
+        if failed_calendars:
+            # A calendar deleted since its ID was cached is looked up, and recreated, on the next run
+            forget_calendar_ids(failed_calendars)
+        if errors:
+            raise errors[0]
+        if failed:
+            raise RuntimeError(f"{len(failed)} events could not be written to Google Calendar.")
+
+        if delta:
+            save_todoist_sync_token(next_sync_token)
         
         logging.info("Sync completed successfully.")
     except Exception as e:
         logging.error(f"An error occurred during sync: {e}")
         raise
+    finally:
+        export_metrics()
+
+
+async def sync_todoist_to_gcal_async(
+    default_event_duration: int = 30,
+    window_padding_days: int = 30,
+    use_state_store: bool = True,
+    max_concurrency: Optional[int] = None
+) -> None:
+    """
+    Syncs Todoist tasks to Google Calendar on asyncio, matching tasks to events by summary.
+
+    Todoist and Google Calendar requests share the pooled connections of one
+    AsyncApiClient. The next page of tasks is fetched while the events of the current one
+    are written. The writes of a page are sent in batches of up to MAX_BATCH_SIZE, like in
+    sync_tasks_to_calendar, all batches concurrently, up to max_concurrency requests in
+    flight. Tasks are routed to calendars as by sync_todoist_to_gcal, and the
+    index of each calendar is extended to the window of every page, as by event_index_loader.
+
+    Delta and incremental syncs, reconciliation and the other match strategies are only
+    available through sync_todoist_to_gcal. Since events are matched by summary, a run
+    interrupted after a write finds the written event again on the next run, so writes are
+    not journaled.
+
+    Parameters:
+        default_event_duration (int): The default duration for tasks/events in minutes.
+        window_padding_days (int): Only calendar events within this many days of the
+            tasks' due dates are fetched for matching.
+        use_state_store (bool): If True, remember which event each task was synced to,
+            skipping unchanged tasks and updating changed ones directly.
+        max_concurrency (Optional[int]): Highest number of requests in flight at once.
+            Defaults to MAX_CONCURRENT_REQUESTS.
+    """
+    # httpx is slow to import and unused by the other syncs, so the client is imported on demand
+    from src.async_client import (
+        MAX_CONCURRENT_REQUESTS, AsyncApiClient, execute_event_writes_async, iter_events_async, iter_task_pages_async,
+        resolve_calendar_id_async
+    )
+
+    METRICS.reset()
+    try:
+        with METRICS.phase("auth"):
+            credentials = await asyncio.to_thread(get_google_credentials)
+        routes = load_calendar_routes()
+
+        # The ID, event index and indexed window of each calendar written to
+        calendars: Dict[str, Tuple[str, EventIndex, Optional[Tuple[str, str]]]] = {}
+        failed: Dict[str, int] = {}
+        state_store = TaskStateStore() if use_state_store else None
+
+        async def load_index(client: AsyncApiClient, calendar_name: str, tasks: List["Task"]) -> EventIndex:
+            # Extends the calendar's index to the window of the tasks to match
+            calendar_id, index, covered = calendars[calendar_name]
+            time_min, time_max = get_event_window(tasks, window_padding_days)
+            if time_min is None:
+                return index
+            windows, covered = uncovered_windows(covered, time_min, time_max)
+            for window_min, window_max in windows:
+                index.extend([event async for event in iter_events_async(client, calendar_id, window_min, window_max)])
+                logging.info(f"Indexed events of calendar {calendar_id} from {window_min} to {window_max}.")
+            calendars[calendar_name] = (calendar_id, index, covered)
+            return index
+
+        async def queue_writes(
+            client: AsyncApiClient,
+            calendar_name: str,
+            tasks: List["Task"],
+            by_state: bool = True
+        ) -> List[EventWrite]:
+            if calendar_name not in calendars:
+                with METRICS.phase("calendar"):
+                    calendar_id = await resolve_calendar_id_async(client, calendar_name)
+                # The one-time migration of legacy task IDs uses the blocking client
+                await asyncio.to_thread(
+                    lambda: ensure_task_ids_migrated(get_thread_gcal_service(credentials), calendar_id, state_store)
+                )
+                calendars[calendar_name] = (calendar_id, EventIndex(), None)
+            calendar_id = calendars[calendar_name][0]
+
+            writes = []
+            # Tasks without a synced event, with their event and its content hash
+            lookups: List[Tuple["Task", Dict[str, Any], str]] = []
+            for task in tasks:
+                event = build_event(task, default_event_duration)
+                if event is None:
+                    continue
+                content_hash = hash_event(event)
+                record = state_store.get(calendar_id, task.id) if state_store is not None and by_state else None
+                if record is None:
+                    lookups.append((task, event, content_hash))
+                elif record[1] != content_hash:
+                    writes.append(EventWrite(event, record[0], tag=(task, content_hash, True)))
+            if not lookups:
+                return writes
+
+            # The calendar is only listed once a task actually needs to be matched
+            index = await load_index(client, calendar_name, [task for task, _, _ in lookups])
+            for task, event, content_hash in lookups:
+                existing_event, identical = match_event(event, index)
+                if existing_event is not None and identical:
+                    if state_store is not None:
+                        state_store.put(calendar_id, task.id, existing_event['id'], content_hash)
+                    continue
+                event_id = existing_event['id'] if existing_event is not None else None
+                writes.append(EventWrite(event, event_id, tag=(task, content_hash, False), existing_event=existing_event))
+            return writes
+
+        async def write_calendar(client: AsyncApiClient, calendar_name: str, tasks: List["Task"]) -> None:
+            writes = await queue_writes(client, calendar_name, tasks)
+            calendar_id, index, _ = calendars[calendar_name]
+            while writes:
+                await execute_event_writes_async(client, calendar_id, writes)
+                rematched: List["Task"] = []
+                for write in writes:
+                    task, content_hash, by_state = write.tag
+                    if write.error is None:
+                        index.add(write.result)
+                        if state_store is not None:
+                            state_store.put(calendar_id, task.id, write.result['id'], content_hash)
+                    elif by_state and write.error.response.status_code in (404, 410):
+                        # The event synced previously no longer exists, so match the task again
+                        logging.info(f"Synced event {write.event_id} no longer exists.")
+                        rematched.append(task)
+                    else:
+                        failed[calendar_name] = failed.get(calendar_name, 0) + 1
+                writes = await queue_writes(client, calendar_name, rematched, by_state=False)
+
+        try:
+            async with AsyncApiClient(credentials, max_concurrency or MAX_CONCURRENT_REQUESTS) as client:
+                pages = iter_task_pages_async(client)
+                next_page = asyncio.ensure_future(anext(pages, None))
+                try:
+                    while True:
+                        with METRICS.phase("fetch_tasks"):
+                            page = await next_page
+                        if page is None:
+                            break
+                        # The next page is fetched while the events of this one are written
+                        next_page = asyncio.ensure_future(anext(pages, None))
+
+                        partitions = partition_tasks(filter(is_syncable_delta, page), routes)
+                        with METRICS.phase("write"):
+                            await asyncio.gather(*(
+                                write_calendar(client, calendar_name, calendar_tasks)
+                                for calendar_name, calendar_tasks in partitions.items()
+                            ))
+                        if state_store is not None:
+                            state_store.commit()
+                finally:
+                    next_page.cancel()
+                    await asyncio.gather(next_page, return_exceptions=True)
+        finally:
+            if state_store is not None:
+                state_store.close()
+
+        if failed:
+            # A calendar deleted since its ID was cached is looked up, and recreated, on the next run
+            forget_calendar_ids(failed)
+            raise RuntimeError(f"{sum(failed.values())} events could not be written to Google Calendar.")
+
+        logging.info("Sync completed successfully.")
+    except Exception as e:
+        logging.error(f"An error occurred during sync: {e}")
+        raise
+    finally:
+        export_metrics()
+
+
+def sync_todoist_changes_to_gcal(
+    changed_tasks: Iterable[SyncTask],
+    default_event_duration: int = 30,
+    use_state_store: bool = True,
+    match_strategy: str = MATCH_BY_SUMMARY
+) -> None:
+    """
+    Syncs individual Todoist tasks reported as changed to Google Calendar, each to the
+    calendar it is routed to.
+
+    Parameters:
+        changed_tasks (Iterable[SyncTask]): The latest state of each changed task.
+        default_event_duration (int): The default duration for tasks/events in minutes.
+        use_state_store (bool): If True, remember which event each task was synced to.
+        match_strategy (str): MATCH_BY_SUMMARY, MATCH_BY_TASK_ID or MATCH_BY_PROPERTY.
+    """
+    METRICS.reset()
+    try:
+        with METRICS.phase("auth"):
+            credentials = get_google_credentials()
+            gcal_service = create_gcal_service(credentials)
+
+        partitions = partition_tasks(changed_tasks, load_calendar_routes())
+        with METRICS.phase("calendar"):
+            calendar_ids = resolve_calendar_ids(gcal_service, partitions)
+
+        state_store = TaskStateStore() if use_state_store else None
+        try:
+            failed: List[EventWrite] = []
+            for calendar_name, calendar_tasks in partitions.items():
+                ensure_task_ids_migrated(gcal_service, calendar_ids[calendar_name], state_store)
+                failed += sync_task_changes(
+                    gcal_service, calendar_ids[calendar_name], calendar_tasks, state_store, default_event_duration,
+                    match_strategy
+                )
+        finally:
+            if state_store is not None:
+                state_store.close()
+
+        if failed:
+            raise RuntimeError(f"{len(failed)} events could not be written to Google Calendar.")
+
+        logging.info("Task changes synced successfully.")
+    except Exception as e:
+        logging.error(f"An error occurred while syncing task changes: {e}")
+        raise
+    finally:
+        export_metrics()
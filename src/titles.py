@@ -0,0 +1,92 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional
+from src.logging_setup import configure_logging
+
+# Configure logging
+configure_logging()
+
+# Duration written in brackets in a task title, such as [30m], [2h] or [1 hora 15 minutos]
+DURATION_PATTERN = re.compile(
+    r'\[(\d+)\s*(hours?|hrs?|h|horas?|hora|mins?|minutes?|min|m|minutos?)?\s*(\d+)?\s*(mins?|minutes?|min|m|minutos?)?\]',
+    re.IGNORECASE
+)
+
+# Number of distinct titles whose parsing is remembered
+TITLE_CACHE_SIZE = 8192
+
+
+class ParsedTitle(NamedTuple):
+    """
+    A task or event title split into its summary and the duration written in it.
+
+    Attributes:
+        summary (str): The title without its durations, with runs of spaces collapsed and
+            surrounding whitespace removed.
+        duration (Optional[int]): Total of the durations in minutes, or None if the title
+            has none.
+    """
+    summary: str
+    duration: Optional[int]
+
+
+def _collapse_spaces(text: str) -> str:
+    return " ".join(part for part in text.split(" ") if part).strip()
+
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def parse_title(title: str) -> ParsedTitle:
+    """
+    Parses a title in a single pass over its durations, extracting the summary and the
+    total duration together.
+
+    Durations are written in brackets, in minutes or hours: "Task [30]" means 30 minutes
+    and "Task [2h]" 120 minutes. Valid units are minutes, minutos, mins, min, m, hours,
+    hour, hora, horas, hs and h; a number without a unit is in minutes, and several
+    durations add up. Results are cached, since the same titles are parsed for the task,
+    its event and every comparison between them.
+
+    Parameters:
+        title (str): The title.
+
+    Returns:
+        ParsedTitle: The summary and duration.
+    """
+    if "[" not in title:
+        return ParsedTitle(_collapse_spaces(title), None)
+
+    parts = []
+    position = 0
+    total_minutes = None
+    for match in DURATION_PATTERN.finditer(title):
+        parts.append(title[position:match.start()])
+        parts.append(" ")
+        position = match.end()
+
+        hours, hour_unit, minutes, _ = match.groups()
+        total_minutes = total_minutes or 0
+        # The first number is in hours if its unit is one, otherwise in minutes
+        if hour_unit and ('hour' in hour_unit.lower() or 'hora' in hour_unit.lower() or 'h' in hour_unit.lower()):
+            total_minutes += int(hours) * 60
+        else:
+            total_minutes += int(hours)
+        if minutes:
+            total_minutes += int(minutes)
+    parts.append(title[position:])
+    return ParsedTitle(_collapse_spaces("".join(parts)), total_minutes)
+
+
+def parse_titles(titles: Iterable[str]) -> List[ParsedTitle]:
+    """
+    Parses a batch of titles, such as those of a page of tasks or events, parsing each
+    distinct title once.
+
+    Parameters:
+        titles (Iterable[str]): The titles.
+
+    Returns:
+        List[ParsedTitle]: The parsed titles, in the same order.
+    """
+    titles = list(titles)
+    parsed = {title: parse_title(title) for title in dict.fromkeys(titles)}
+    return [parsed[title] for title in titles]
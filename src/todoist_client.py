@@ -1,17 +1,212 @@
 import logging
-from typing import List, Optional
-from todoist_api_python.api import TodoistAPI, Task
+import os
+import threading
+import weakref
+import requests
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from config.settings import Config
+from src.authentication import get_todoist_headers
+from src.metrics import METRICS
+from src.persistence import load_json_state, save_json_state
+from src.rate_limiter import RateLimiter, parse_retry_after
+from src.logging_setup import configure_logging
+
+if TYPE_CHECKING:
+    # The REST client is slow to import and unused by delta syncs, so it is imported on demand
+    from todoist_api_python.api import TodoistAPI, Task
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename='sync.log',
-    filemode='a',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
+
+# Every Todoist read goes through API v1, so a task has the same ID whichever endpoint returned it
+TODOIST_SYNC_URL = "https://api.todoist.com/api/v1/sync"
+TODOIST_TASKS_URL = "https://api.todoist.com/api/v1/tasks"
+TODOIST_ID_MAPPINGS_URL = "https://api.todoist.com/api/v1/id_mappings"
+
+# Most IDs translated by a single id_mappings request
+ID_MAPPINGS_PAGE_SIZE = 100
+
+# Number of tasks requested per page, the most the Todoist API returns at once
+TASK_PAGE_SIZE = 200
+
+# Sync token that requests a full sync from the Todoist Sync API
+FULL_SYNC_TOKEN = "*"
+
+# Rate limiter of each configuration, shared by every request sent with it to Todoist,
+# since they all count against the quota of one account
+_todoist_rate_limiters: "weakref.WeakKeyDictionary[Config, RateLimiter]" = weakref.WeakKeyDictionary()
+_todoist_rate_limiters_lock = threading.Lock()
+
+
+def todoist_rate_limiter() -> RateLimiter:
+    """
+    Returns the rate limiter shared by the Todoist API requests of the active configuration,
+    creating it on first use.
+
+    Returns:
+        RateLimiter: The rate limiter of the active configuration.
+    """
+    config = Config.current()
+    with _todoist_rate_limiters_lock:
+        limiter = _todoist_rate_limiters.get(config)
+        if limiter is None:
+            limiter = _todoist_rate_limiters[config] = RateLimiter(config.TODOIST_REQUESTS_PER_SECOND, capacity=10)
+    return limiter
+
+
+@dataclass
+class SyncDue:
+    """
+    Due date of a task returned by the Todoist Sync API, shaped like the REST API's Due.
+    """
+    date: str
+    datetime: Optional[str] = None
+    timezone: Optional[str] = None
+    string: Optional[str] = None
+    is_recurring: bool = False
+
+
+@dataclass
+class SyncDuration:
+    """
+    Duration of a task returned by the Todoist Sync API.
+    """
+    amount: int
+    unit: str
+
+
+@dataclass
+class SyncTask:
+    """
+    Task returned by the Todoist Sync API, exposing the same fields as the REST API's
+    Task that the sync relies on, plus its completion and deletion state.
+    """
+    id: str
+    content: str
+    description: str = ""
+    project_id: Optional[str] = None
+    parent_id: Optional[str] = None
+    labels: List[str] = field(default_factory=list)
+    due: Optional[SyncDue] = None
+    duration: Optional[SyncDuration] = None
+    is_completed: bool = False
+    is_deleted: bool = False
+
+    @classmethod
+    def from_sync_item(cls, item: Dict[str, Any]) -> "SyncTask":
+        """
+        Builds a task from a Sync API item, or an item of a page of the tasks endpoint,
+        which has the same shape.
+
+        The Sync API returns the due date and time in a single 'date' field, which is
+        split into 'date' and 'datetime' as in the REST API. Items shaped by the older
+        Sync API v9, as sent by webhooks registered against it, carry the current IDs in
+        'v2_' fields, which are preferred over their legacy numeric IDs.
+
+        Parameters:
+            item (Dict[str, Any]): An item from the Sync API response.
+
+        Returns:
+            SyncTask: The task.
+        """
+        due = None
+        if item.get("due"):
+            due_date = item["due"]["date"]
+            due = SyncDue(
+                date=due_date[:10],
+                datetime=due_date if "T" in due_date else None,
+                timezone=item["due"].get("timezone"),
+                string=item["due"].get("string"),
+                is_recurring=item["due"].get("is_recurring", False),
+            )
+        duration = None
+        if item.get("duration"):
+            duration = SyncDuration(amount=item["duration"]["amount"], unit=item["duration"]["unit"])
+        return cls(
+            id=item.get("v2_id") or item["id"],
+            content=item.get("content", ""),
+            description=item.get("description", ""),
+            project_id=item.get("v2_project_id") or item.get("project_id"),
+            parent_id=item.get("v2_parent_id") or item.get("parent_id"),
+            labels=item.get("labels", []),
+            due=due,
+            duration=duration,
+            is_completed=bool(item.get("checked")),
+            is_deleted=bool(item.get("is_deleted")),
+        )
+
 
-def get_todoist_api() -> TodoistAPI:
+def _throttle_delay(error: Exception) -> Optional[float]:
+    """
+    Returns the delay requested by a Todoist 429 response, for use with RateLimiter.call.
+
+    Parameters:
+        error (Exception): The error raised by a request.
+
+    Returns:
+        Optional[float]: None if the error is not a 429 response, otherwise the
+        'Retry-After' delay in seconds, or 0 if there is none.
+    """
+    response = getattr(error, "response", None)
+    if not isinstance(error, requests.HTTPError) or response is None or response.status_code != 429:
+        return None
+    return parse_retry_after(response.headers.get("Retry-After"))
+
+
+def is_legacy_id(object_id: Optional[str]) -> bool:
+    """
+    Tells whether an ID is a legacy numeric Todoist ID, as returned by the Sync API v9
+    and REST API v2, rather than a current one.
+
+    Parameters:
+        object_id (Optional[str]): The ID of a Todoist task or project.
+
+    Returns:
+        bool: True if the ID is made of digits only.
+    """
+    return bool(object_id) and str(object_id).isdigit()
+
+
+def get_id_mappings(object_type: str, legacy_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    Translates legacy numeric Todoist IDs to the current ones.
+
+    Parameters:
+        object_type (str): 'tasks' or 'projects'.
+        legacy_ids (Iterable[str]): The legacy IDs.
+
+    Returns:
+        Dict[str, str]: The current ID of each legacy ID Todoist knows. IDs of deleted
+        objects may be missing.
+
+    Raises:
+        requests.HTTPError: If an error occurs while translating the IDs.
+    """
+    legacy_ids = sorted(set(legacy_ids))
+    mappings: Dict[str, str] = {}
+    for start in range(0, len(legacy_ids), ID_MAPPINGS_PAGE_SIZE):
+        chunk = legacy_ids[start:start + ID_MAPPINGS_PAGE_SIZE]
+
+        def fetch() -> requests.Response:
+            with METRICS.track_api_call("todoist", "id_mappings"):
+                response = requests.get(
+                    f"{TODOIST_ID_MAPPINGS_URL}/{object_type}/{','.join(chunk)}",
+                    headers=get_todoist_headers(), timeout=30
+                )
+                response.raise_for_status()
+                return response
+
+        try:
+            response = todoist_rate_limiter().call(fetch, _throttle_delay).json()
+        except requests.HTTPError as e:
+            logging.error(f"An error occurred while translating legacy Todoist IDs: {e}")
+            raise
+        mappings.update((str(mapping["old_id"]), str(mapping["new_id"])) for mapping in response)
+    return mappings
+
+
+def get_todoist_api() -> "TodoistAPI":
     """
     Initializes and returns the Todoist API client.
 
@@ -21,6 +216,8 @@ def get_todoist_api() -> TodoistAPI:
     Raises:
         Exception: If an error occurs while initializing the Todoist API client.
     """
+    from todoist_api_python.api import TodoistAPI
+
     try:
         api = TodoistAPI(Config.TODOIST_API_KEY)
         logging.info("Todoist API client initialized successfully.")
@@ -30,12 +227,12 @@ def get_todoist_api() -> TodoistAPI:
         raise
 
 def get_tasks(
-    api: TodoistAPI, 
+    api: "TodoistAPI", 
     project_id: Optional[str] = None, 
     label_ids: Optional[List[str]] = None, 
     exclude_recurring: bool = False, 
     exclude_subtasks: bool = False
-) -> List[Task]:
+) -> List["Task"]:
     """
     Retrieves tasks from Todoist, optionally filtered by project or labels.
     
@@ -59,9 +256,162 @@ def get_tasks(
         filters = f"{filters} & !subtask" if filters else filters
     
     try:
-        tasks = api.get_tasks(project_id=project_id, label_ids=label_ids, filter=filters)
+        def fetch() -> List["Task"]:
+            with METRICS.track_api_call("todoist", "rest.tasks"):
+                return api.get_tasks(project_id=project_id, label_ids=label_ids, filter=filters)
+
+        tasks = todoist_rate_limiter().call(fetch, _throttle_delay)
         logging.info(f"Retrieved {len(tasks)} tasks from Todoist.")
         return tasks
     except Exception as e:
         logging.error(f"An error occurred while retrieving tasks from Todoist: {e}")
         raise
+
+
+def iter_task_pages(
+    project_id: Optional[str] = None,
+    label: Optional[str] = None,
+    page_size: int = TASK_PAGE_SIZE
+) -> Iterator[List[SyncTask]]:
+    """
+    Yields the active tasks of the account page by page, following the cursor returned
+    with each page of the Todoist API.
+
+    Pages are requested lazily, only once the previous one has been consumed, so only one
+    page is held in memory at a time and the caller can start working on the first tasks
+    while the others are still being fetched.
+
+    Parameters:
+        project_id (Optional[str]): ID of the project to filter tasks.
+        label (Optional[str]): Name of the label to filter tasks.
+        page_size (int): Number of tasks per page, at most TASK_PAGE_SIZE.
+
+    Yields:
+        List[SyncTask]: The tasks of each page.
+
+    Raises:
+        requests.HTTPError: If an error occurs while retrieving tasks from Todoist.
+    """
+    params: Dict[str, Any] = {"limit": page_size}
+    if project_id:
+        params["project_id"] = project_id
+    if label:
+        params["label"] = label
+
+    def fetch() -> requests.Response:
+        with METRICS.track_api_call("todoist", "tasks"):
+            response = requests.get(TODOIST_TASKS_URL, headers=get_todoist_headers(), params=params, timeout=30)
+            response.raise_for_status()
+            return response
+
+    pages, count = 0, 0
+    while True:
+        try:
+            response = todoist_rate_limiter().call(fetch, _throttle_delay).json()
+        except requests.HTTPError as e:
+            logging.error(f"An error occurred while retrieving tasks from Todoist: {e}")
+            raise
+        page = [SyncTask.from_sync_item(item) for item in response.get("results", [])]
+        pages, count = pages + 1, count + len(page)
+        yield page
+
+        params["cursor"] = response.get("next_cursor")
+        if not params["cursor"]:
+            break
+    logging.info(f"Retrieved {count} tasks from Todoist in {pages} pages.")
+
+
+def get_todoist_sync_token_path() -> str:
+    """
+    Returns the path of the file holding the persisted Todoist sync token.
+
+    Returns:
+        str: Path of the sync token file inside the state directory.
+    """
+    return os.path.join(Config.STATE_DIR, "todoist_sync.json")
+
+
+def load_todoist_sync_token(path: Optional[str] = None) -> Optional[str]:
+    """
+    Loads the Todoist sync token persisted by a previous run.
+
+    Parameters:
+        path (Optional[str]): Path of the sync token file. Defaults to get_todoist_sync_token_path.
+
+    Returns:
+        Optional[str]: The sync token, or None if no run has completed yet.
+    """
+    return load_json_state(path or get_todoist_sync_token_path(), {}).get("sync_token")
+
+
+def save_todoist_sync_token(sync_token: str, path: Optional[str] = None) -> None:
+    """
+    Persists the Todoist sync token for the next run.
+
+    The token should only be saved once the returned changes have been synced,
+    so an interrupted run fetches the same changes again.
+
+    Parameters:
+        sync_token (str): The sync token returned by get_task_deltas.
+        path (Optional[str]): Path of the sync token file. Defaults to get_todoist_sync_token_path.
+    """
+    save_json_state(path or get_todoist_sync_token_path(), {"sync_token": sync_token})
+
+
+def get_task_deltas(sync_token: Optional[str] = None) -> Tuple[List[SyncTask], str, bool]:
+    """
+    Retrieves the tasks added, changed, completed or deleted since the given sync token
+    through the Todoist Sync API.
+
+    Without a sync token, or if Todoist rejects the token, a full sync is performed and
+    every active task is returned. The tasks completed or deleted since the token are then
+    missing rather than reported, so the caller has to find them by comparison.
+
+    Parameters:
+        sync_token (Optional[str]): Sync token from a previous call.
+
+    Returns:
+        Tuple[List[SyncTask], str, bool]: The changed tasks, the sync token for the next
+        call and whether a full sync was performed.
+
+    Raises:
+        requests.HTTPError: If an error occurs while retrieving tasks from Todoist.
+    """
+    sync_token = sync_token or FULL_SYNC_TOKEN
+    try:
+        response = _post_sync(sync_token)
+    except requests.HTTPError as e:
+        if sync_token == FULL_SYNC_TOKEN or e.response is None or e.response.status_code != 400:
+            logging.error(f"An error occurred while retrieving task changes from Todoist: {e}")
+            raise
+        logging.info("Todoist sync token was rejected, running a full sync.")
+        response = _post_sync(FULL_SYNC_TOKEN)
+
+    tasks = [SyncTask.from_sync_item(item) for item in response.get("items", [])]
+    full_sync = bool(response.get("full_sync"))
+    logging.info(f"Retrieved {len(tasks)} changed tasks from Todoist ({'full' if full_sync else 'incremental'} sync).")
+    return tasks, response["sync_token"], full_sync
+
+
+def _post_sync(sync_token: str) -> Dict[str, Any]:
+    """
+    Posts a read request for items to the Todoist Sync API.
+
+    Parameters:
+        sync_token (str): Sync token, or FULL_SYNC_TOKEN for a full sync.
+
+    Returns:
+        Dict[str, Any]: The decoded response.
+    """
+    def post() -> requests.Response:
+        with METRICS.track_api_call("todoist", "sync"):
+            response = requests.post(
+                TODOIST_SYNC_URL,
+                headers=get_todoist_headers(),
+                data={"sync_token": sync_token, "resource_types": '["items"]'},
+                timeout=30,
+            )
+            response.raise_for_status()
+            return response
+
+    return todoist_rate_limiter().call(post, _throttle_delay).json()
@@ -0,0 +1,203 @@
+from src.async_client import (
+    AsyncApiClient, create_calendar_async, get_tasks_async, sync_event_async, GCAL_API_URL
+)
+from src.gcal_client import EventIndex
+from src.rate_limiter import RateLimiter
+from src.state_store import TaskStateStore
+from src.sync import sync_todoist_to_gcal_async
+from functools import partial
+from unittest.mock import patch
+import asyncio
+import email
+import httpx
+import json
+import os
+import tempfile
+import unittest
+
+
+def make_event(summary, event_id="event-1"):
+    return {
+        "id": event_id,
+        "summary": summary,
+        "htmlLink": "link",
+        "start": {"dateTime": "2024-05-01T09:00:00", "timeZone": "UTC"},
+        "end": {"dateTime": "2024-05-01T09:30:00", "timeZone": "UTC"},
+    }
+
+
+class FakeApis:
+    """
+    Handler of an httpx.MockTransport serving Todoist task pages and Google Calendar events.
+    """
+
+    def __init__(self, task_pages=(), events=()):
+        self.task_pages = list(task_pages)
+        self.events = list(events)
+        self.requests = []
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.throttled:
+                self.throttled -= 1
+                return httpx.Response(429, headers={"Retry-After": "0"})
+            return self.respond(request)
+        finally:
+            self.in_flight -= 1
+
+    def respond(self, request):
+        path = request.url.path
+        if path.startswith("/batch/"):
+            return self.respond_batch(request)
+        if path.endswith("/tasks"):
+            index = int(request.url.params.get("cursor") or 0)
+            next_cursor = str(index + 1) if index + 1 < len(self.task_pages) else None
+            return httpx.Response(200, json={"results": self.task_pages[index], "next_cursor": next_cursor})
+        if path.endswith("/calendarList"):
+            return httpx.Response(200, json={"items": [{"id": "cal", "summary": "Todoist Tasks"}]})
+        if request.method == "GET":
+            return httpx.Response(200, json={"items": self.events})
+        body = json.loads(request.content)
+        if request.method == "POST":
+            event = dict(body, id=f"event-{len(self.events) + 1}", htmlLink="link")
+            self.events.append(event)
+            return httpx.Response(200, json=event)
+        return httpx.Response(200, json=dict(body, id=path.rsplit("/", 1)[1], htmlLink="link"))
+
+    def respond_batch(self, request):
+        # Every part is answered as if it had been sent on its own
+        header = f"Content-Type: {request.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+        parts = []
+        for part in email.message_from_bytes(header + request.content).get_payload():
+            request_line, _, rest = part.get_payload().replace("\r\n", "\n").partition("\n")
+            method, target, _ = request_line.split(" ")
+            content = rest.partition("\n\n")[2].strip().encode("utf-8")
+            sub_request = httpx.Request(method, f"https://www.googleapis.com{target}", content=content)
+            self.requests.append(sub_request)
+            response = self.respond(sub_request)
+            parts.append(
+                f"--batch\r\nContent-Type: application/http\r\nContent-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {response.status_code} OK\r\nContent-Type: application/json\r\n\r\n{response.text}\r\n"
+            )
+        body = "".join(parts) + "--batch--\r\n"
+        return httpx.Response(200, headers={"Content-Type": "multipart/mixed; boundary=batch"}, content=body.encode("utf-8"))
+
+    def count(self, method, suffix="/events"):
+        return sum(request.method == method and request.url.path.endswith(suffix) for request in self.requests)
+
+
+class AsyncClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        limiter = RateLimiter(1000, capacity=1000, base_delay=0.01)
+        patchers = [
+            patch("config.settings.Config.STATE_DIR", self.temp_dir.name),
+            patch("src.async_client.gcal_rate_limiter", return_value=limiter),
+            patch("src.async_client.todoist_rate_limiter", return_value=limiter),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_with_client(self, apis, coroutine_function, max_concurrency=10):
+        async def run():
+            async with AsyncApiClient(max_concurrency=max_concurrency, transport=httpx.MockTransport(apis)) as client:
+                return await coroutine_function(client)
+        return asyncio.run(run())
+
+
+class TestAsyncApiClient(AsyncClientTestCase):
+    """
+    Unit tests for the asyncio clients of the Todoist and Google Calendar APIs.
+    """
+
+    def test_get_tasks_follows_cursor(self):
+        """Test that every page of tasks is fetched."""
+        apis = FakeApis([[{"id": "1", "content": "A"}], [{"id": "2", "content": "B"}]])
+        tasks = self.run_with_client(apis, get_tasks_async)
+        self.assertEqual([task.id for task in tasks], ["1", "2"])
+
+    def test_throttled_request_retried(self):
+        """Test that a 429 response is retried."""
+        apis = FakeApis([[{"id": "1", "content": "A"}]])
+        apis.throttled = 1
+        tasks = self.run_with_client(apis, get_tasks_async)
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(len(apis.requests), 2)
+
+    def test_concurrency_capped(self):
+        """Test that no more requests are in flight than the semaphore allows."""
+        apis = FakeApis()
+        index = EventIndex()
+
+        async def create_events(client):
+            await asyncio.gather(*(
+                sync_event_async(client, "cal", make_event(f"Task {number}"), index) for number in range(12)
+            ))
+
+        self.run_with_client(apis, create_events, max_concurrency=3)
+        self.assertEqual(apis.count("POST"), 12)
+        self.assertEqual(apis.max_in_flight, 3)
+
+    def test_sync_event_matches_index(self):
+        """Test that an identical event is not written and a changed one is patched."""
+        existing_event = make_event("Task")
+        apis = FakeApis()
+        index = EventIndex.from_events([existing_event])
+        moved_event = dict(make_event("Task [30m]"), start={"dateTime": "2024-05-01T10:00:00", "timeZone": "UTC"})
+
+        self.run_with_client(apis, lambda client: sync_event_async(client, "cal", make_event("Task"), index))
+        self.assertEqual(apis.requests, [])
+        self.run_with_client(apis, lambda client: sync_event_async(client, "cal", moved_event, index))
+        self.assertEqual(apis.count("PATCH", "/event-1"), 1)
+
+    def test_create_calendar_finds_existing(self):
+        """Test that an existing calendar is returned instead of creating a new one."""
+        apis = FakeApis()
+        calendar = self.run_with_client(apis, lambda client: create_calendar_async(client, "Todoist Tasks"))
+        self.assertEqual(calendar["id"], "cal")
+        self.assertTrue(str(apis.requests[0].url).startswith(GCAL_API_URL))
+
+
+class TestSyncTodoistToGcalAsync(AsyncClientTestCase):
+    """
+    Tests for sync_todoist_to_gcal_async against fake Todoist and Google Calendar APIs.
+    """
+
+    def sync(self, apis):
+        transport = httpx.MockTransport(apis)
+        with patch("src.sync.get_google_credentials", return_value=None), \
+                patch("src.async_client.AsyncApiClient", partial(AsyncApiClient, transport=transport)):
+            asyncio.run(sync_todoist_to_gcal_async())
+
+    def test_pages_synced_and_recorded(self):
+        """Test that the tasks of every page are written once and skipped when unchanged."""
+        pages = [
+            [{"id": str(number), "content": f"Task {number}", "due": {"date": "2024-05-01"}} for number in range(3)],
+            [{"id": "3", "content": "Task 3", "due": {"date": "2024-05-02"}}, {"id": "4", "content": "Sub", "parent_id": "3"}],
+        ]
+        apis = FakeApis(pages)
+        self.sync(apis)
+        self.assertEqual(apis.count("POST"), 4)
+        with TaskStateStore(os.path.join(self.temp_dir.name, "sync_state.db")) as store:
+            self.assertIsNotNone(store.get("cal", "3"))
+
+        self.assertEqual(apis.count("POST", "/batch/calendar/v3"), 2)
+
+        apis.requests.clear()
+        self.sync(apis)
+        self.assertEqual(apis.count("POST") + apis.count("PATCH", ""), 0)
+        self.assertEqual(apis.count("GET"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, mock_open, patch
+import src.authentication as authentication
+import unittest
+
+
+def make_credentials(expires_in):
+    credentials = MagicMock(valid=True, refresh_token="refresh")
+    credentials.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + expires_in
+    credentials.to_json.return_value = "{}"
+    return credentials
+
+
+class TestGetGoogleCredentials(unittest.TestCase):
+    """
+    Unit tests for the in-memory cache of get_google_credentials.
+    """
+
+    def setUp(self):
+        patcher = patch.dict(authentication._cached_credentials, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_file_read_once(self):
+        """Test that credentials far from expiring are loaded once and then served from memory."""
+        credentials = make_credentials(timedelta(hours=1))
+        with patch("src.authentication.os.path.exists", return_value=True), \
+                patch("src.authentication.Credentials.from_authorized_user_file", return_value=credentials) as load:
+            self.assertIs(authentication.get_google_credentials(), credentials)
+            self.assertIs(authentication.get_google_credentials(), credentials)
+        load.assert_called_once()
+        credentials.refresh.assert_not_called()
+
+    def test_refreshed_before_expiry(self):
+        """Test that credentials about to expire are refreshed and saved."""
+        credentials = make_credentials(timedelta(minutes=1))
+        with patch("src.authentication.os.path.exists", return_value=True), \
+                patch("src.authentication.Credentials.from_authorized_user_file", return_value=credentials), \
+                patch("builtins.open", mock_open()) as token_file:
+            self.assertIs(authentication.get_google_credentials(), credentials)
+        credentials.refresh.assert_called_once()
+        token_file.assert_called_once_with("token.json", "w")
+
+    def test_cached_per_token_file(self):
+        """Test that each token file has its own cached credentials."""
+        first, second = make_credentials(timedelta(hours=1)), make_credentials(timedelta(hours=1))
+        with patch("src.authentication.os.path.exists", return_value=True), \
+                patch("src.authentication.Credentials.from_authorized_user_file", side_effect=[first, second]):
+            self.assertIs(authentication.get_google_credentials("a/token.json"), first)
+            self.assertIs(authentication.get_google_credentials("b/token.json"), second)
+            self.assertIs(authentication.get_google_credentials("a/token.json"), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+from src.calendar_routes import CalendarRoutes, load_calendar_routes, partition_tasks
+from src.gcal_client import resolve_calendar_ids
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import json
+import os
+import tempfile
+import unittest
+
+
+def make_task(task_id, project_id="1", labels=()):
+    return SimpleNamespace(id=task_id, project_id=project_id, labels=list(labels))
+
+
+class TestCalendarRoutes(unittest.TestCase):
+    """
+    Unit tests for the routing of tasks to calendars.
+    """
+
+    def test_labels_before_projects(self):
+        """Test that a routed label wins over the project, which wins over the default."""
+        routes = CalendarRoutes(projects={"2": "Work"}, labels={"errand": "Errands"})
+        partitions = partition_tasks([
+            make_task("a"), make_task("b", "2"), make_task("c", "2", ["other", "errand"])
+        ], routes)
+        self.assertEqual({name: [task.id for task in tasks] for name, tasks in partitions.items()},
+                         {"Todoist Tasks": ["a"], "Work": ["b"], "Errands": ["c"]})
+
+    def test_unrouted_tasks_skipped(self):
+        """Test that without a default calendar, unrouted tasks are not synced."""
+        routes = CalendarRoutes(default=None, projects={"2": "Work"})
+        self.assertEqual(list(partition_tasks([make_task("a"), make_task("b", "2")], routes)), ["Work"])
+        self.assertEqual(routes.calendar_names(), ["Work"])
+
+    def test_load_routes_file(self):
+        """Test that routes are read from a JSON file, with project IDs as strings."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "routes.json")
+            with open(path, "w") as routes_file:
+                json.dump({"default": "Inbox", "projects": {"6Jf8VQXxpwv56VQ7": "Work"}, "labels": {"home": "Home"}}, routes_file)
+            routes = load_calendar_routes(path)
+        self.assertEqual(routes.calendar_names(), ["Inbox", "Work", "Home"])
+
+    @patch("src.todoist_client.get_id_mappings", return_value={"2203306141": "6Jf8VQXxpwv56VQ7"})
+    def test_legacy_project_ids_translated(self, get_id_mappings):
+        """Test that routes keyed by legacy numeric project IDs match the current IDs of tasks."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "routes.json")
+            with open(path, "w") as routes_file:
+                json.dump({"projects": {"2203306141": "Work"}}, routes_file)
+            with self.assertLogs(level="WARNING"):
+                routes = load_calendar_routes(path)
+        get_id_mappings.assert_called_once_with("projects", ["2203306141"])
+        self.assertEqual(routes.calendar_for(make_task("a", "6Jf8VQXxpwv56VQ7")), "Work")
+
+
+class TestResolveCalendarIds(unittest.TestCase):
+    """
+    Unit tests for the resolve_calendar_ids function.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        patcher = patch("config.settings.Config.STATE_DIR", self.temp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+
+        self.service = MagicMock()
+        self.service.calendarList().list().execute.side_effect = [
+            {"items": [{"id": "id-1", "summary": "Todoist Tasks"}], "nextPageToken": "page-2"},
+            {"items": [{"id": "id-2", "summary": "Work"}]},
+        ]
+        self.service.calendars().insert().execute.return_value = {"id": "id-3", "summary": "Home"}
+        self.service.reset_mock()
+
+    def test_paginated_lookup_and_cache(self):
+        """Test that every page is searched, missing calendars are created, and IDs are cached."""
+        ids = resolve_calendar_ids(self.service, ["Work", "Home", "Todoist Tasks"])
+        self.assertEqual(ids, {"Work": "id-2", "Home": "id-3", "Todoist Tasks": "id-1"})
+        self.assertEqual(self.service.calendarList().list().execute.call_count, 2)
+        self.assertEqual(self.service.calendars().insert.call_args.kwargs["body"]["summary"], "Home")
+
+        self.service.reset_mock()
+        self.assertEqual(resolve_calendar_ids(self.service, ["Home", "Work"]), {"Home": "id-3", "Work": "id-2"})
+        self.service.calendarList.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
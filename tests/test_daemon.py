@@ -0,0 +1,167 @@
+from src.daemon import SyncDaemon, verify_todoist_signature
+from src.todoist_client import SyncTask
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import unittest
+
+
+async def send(port, method, path, body=b"", headers=None):
+    """Sends a request to the daemon's server and returns the status and JSON payload."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), json.loads(content)
+
+
+def webhook(event_name, task_id, content="Task", checked=False):
+    item = {"id": task_id, "content": content, "due": {"date": "2024-05-01"}, "checked": checked}
+    return json.dumps({"event_name": event_name, "event_data": item}).encode("utf-8")
+
+
+class TestSyncDaemon(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the SyncDaemon class, against its local HTTP server.
+    """
+
+    async def asyncSetUp(self):
+        self.synced = []
+        self.full_syncs = 0
+        self.synced_event = threading.Event()
+
+        def sync_changes(tasks):
+            self.synced.append(tasks)
+            self.synced_event.set()
+
+        def full_sync():
+            self.full_syncs += 1
+            self.synced_event.set()
+
+        self.daemon = SyncDaemon(
+            sync_changes, full_sync, debounce_seconds=0.1, max_delay_seconds=1.0,
+            reconcile_interval_seconds=None, echo_window_seconds=0, todoist_client_secret="secret",
+            channel_token="token"
+        )
+        self.port = await self.daemon.start(port=0, initial_sync=False)
+
+    async def asyncTearDown(self):
+        await self.daemon.stop()
+
+    def sign(self, body):
+        return base64.b64encode(hmac.new(b"secret", body, hashlib.sha256).digest()).decode("ascii")
+
+    async def wait_for_sync(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.synced_event.wait, 5)
+        await asyncio.sleep(0.05)
+
+    async def test_webhooks_debounced(self):
+        """Test that a burst of webhooks is synced once, keeping the latest state of each task."""
+        for body in (webhook("item:added", "1", "First"), webhook("item:updated", "1", "Renamed"),
+                     webhook("item:completed", "2", checked=True)):
+            status, _ = await send(self.port, "POST", "/todoist/webhook", body, {"X-Todoist-Hmac-SHA256": self.sign(body)})
+            self.assertEqual(status, 200)
+
+        await self.wait_for_sync()
+        self.assertEqual(len(self.synced), 1)
+        tasks = {task.id: task for task in self.synced[0]}
+        self.assertEqual(tasks["1"].content, "Renamed")
+        self.assertTrue(tasks["2"].is_completed)
+
+    async def test_invalid_signature_rejected(self):
+        """Test that webhooks without a valid signature are rejected."""
+        body = webhook("item:added", "1")
+        status, _ = await send(self.port, "POST", "/todoist/webhook", body, {"X-Todoist-Hmac-SHA256": "forged"})
+        self.assertEqual(status, 401)
+        self.assertFalse(self.daemon._pending)
+
+    async def test_calendar_notification_requests_full_sync(self):
+        """Test that calendar notifications trigger a full sync, except for the channel handshake."""
+        status, _ = await send(self.port, "POST", "/gcal/notifications", headers={
+            "X-Goog-Channel-Token": "token", "X-Goog-Resource-State": "sync"
+        })
+        self.assertEqual(status, 200)
+        self.assertFalse(self.daemon._full_sync_requested)
+
+        await send(self.port, "POST", "/gcal/notifications", headers={
+            "X-Goog-Channel-Token": "token", "X-Goog-Resource-State": "exists"
+        })
+        await self.wait_for_sync()
+        self.assertEqual(self.full_syncs, 1)
+        self.assertEqual(self.synced, [])
+
+    async def test_failed_sync_requests_full_sync(self):
+        """Test that a failed targeted sync is followed by a full sync."""
+        def failing_sync(tasks):
+            raise RuntimeError("API unavailable")
+
+        self.daemon.sync_changes = failing_sync
+        self.daemon.retry_delay_seconds = 0.1
+        self.daemon.add_changes([SyncTask(id="1", content="Task")])
+        await self.wait_for_sync()
+        self.assertEqual(self.full_syncs, 1)
+
+    async def test_failed_full_sync_retried(self):
+        """Test that a failed full sync, holding the pending changes, is retried."""
+        def flaky_full_sync():
+            self.full_syncs += 1
+            if self.full_syncs == 1:
+                raise RuntimeError("API unavailable")
+            self.synced_event.set()
+
+        self.daemon.full_sync = flaky_full_sync
+        self.daemon.retry_delay_seconds = 0.1
+        self.daemon.add_changes([SyncTask(id="1", content="Task")])
+        self.daemon.request_full_sync()
+        await self.wait_for_sync()
+        self.assertEqual(self.full_syncs, 2)
+        self.assertEqual(self.synced, [])
+
+    async def test_retry_waits_for_retry_delay(self):
+        """Test that the retry of a failed sync is neither capped by max_delay_seconds nor pulled in by new changes."""
+        def failing_sync(tasks):
+            self.failed_at = time.monotonic()
+            raise RuntimeError("API unavailable")
+
+        def full_sync():
+            self.full_synced_at = time.monotonic()
+            self.synced_event.set()
+
+        self.daemon.sync_changes = failing_sync
+        self.daemon.full_sync = full_sync
+        self.daemon.retry_delay_seconds = 1.5
+        self.daemon.add_changes([SyncTask(id="1", content="Task")])
+        await asyncio.sleep(0.3)
+        self.daemon.add_changes([SyncTask(id="2", content="Task")])
+        await self.wait_for_sync()
+        self.assertGreaterEqual(self.full_synced_at - self.failed_at, 1.4)
+
+    async def test_unknown_path(self):
+        """Test that unknown paths are answered with 404."""
+        status, _ = await send(self.port, "GET", "/unknown")
+        self.assertEqual(status, 404)
+
+
+class TestVerifyTodoistSignature(unittest.TestCase):
+    """
+    Unit tests for the verify_todoist_signature function.
+    """
+
+    def test_signature(self):
+        """Test that only the base64 HMAC-SHA256 of the body is accepted."""
+        signature = base64.b64encode(hmac.new(b"secret", b"body", hashlib.sha256).digest()).decode("ascii")
+        self.assertTrue(verify_todoist_signature(b"body", signature, "secret"))
+        self.assertFalse(verify_todoist_signature(b"other", signature, "secret"))
+        self.assertFalse(verify_todoist_signature(b"body", None, "secret"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+from src.gcal_client import EventIndex, diff_event, iter_events, sync_event
+from src.sync import get_event_window
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import unittest
+
+
+def make_event(summary, start, end, time_zone="UTC", event_id="1"):
+    return {
+        "id": event_id,
+        "summary": summary,
+        "start": {"dateTime": start, "timeZone": time_zone},
+        "end": {"dateTime": end, "timeZone": time_zone},
+    }
+
+
+class TestEventIndex(unittest.TestCase):
+    """
+    Unit tests for the EventIndex class.
+    """
+
+    def test_lookup_ignores_duration_pattern(self):
+        """Test that events are matched by their normalized summary."""
+        index = EventIndex.from_events([make_event("Buy groceries [30m]", "2024-05-01T09:00:00Z", "2024-05-01T09:30:00Z")])
+        self.assertIsNotNone(index.lookup("Buy groceries"))
+        self.assertIsNotNone(index.lookup("Buy groceries [1h]"))
+        self.assertIsNone(index.lookup("Buy meat"))
+
+    def test_first_event_wins(self):
+        """Test that the first listed event is kept when summaries collide."""
+        index = EventIndex.from_events([
+            make_event("Task", "2024-05-01T09:00:00Z", "2024-05-01T09:30:00Z", event_id="first"),
+            make_event("Task [1h]", "2024-05-02T09:00:00Z", "2024-05-02T10:00:00Z", event_id="second"),
+        ])
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.lookup("Task")["event"]["id"], "first")
+
+    def test_add_replaces_entry(self):
+        """Test that added events replace existing entries."""
+        index = EventIndex.from_events([make_event("Task", "2024-05-01T09:00:00Z", "2024-05-01T09:30:00Z", event_id="old")])
+        index.add(make_event("Task", "2024-05-03T09:00:00Z", "2024-05-03T09:30:00Z", event_id="new"))
+        self.assertEqual(index.lookup("Task")["event"]["id"], "new")
+
+    def test_events_without_summary_or_datetime(self):
+        """Test that events without a summary are skipped and all-day events have no start."""
+        index = EventIndex.from_events([
+            {"id": "1", "start": {"date": "2024-05-01"}, "end": {"date": "2024-05-02"}},
+            {"id": "2", "summary": "All day", "start": {"date": "2024-05-01"}, "end": {"date": "2024-05-02"}},
+        ])
+        self.assertEqual(len(index), 1)
+        self.assertIsNone(index.lookup("All day")["start"])
+
+
+class TestSyncEventWithIndex(unittest.TestCase):
+    """
+    Unit tests for sync_event when an EventIndex is provided.
+    """
+
+    def setUp(self):
+        self.service = MagicMock()
+        self.existing = make_event("Task", "2024-05-01T06:00:00-03:00", "2024-05-01T06:30:00-03:00", "America/Sao_Paulo", "abc")
+        self.index = EventIndex.from_events([self.existing])
+
+    def test_unchanged_event_makes_no_calls(self):
+        """Test that a matching event with the same times is returned without API calls."""
+        event = make_event("Task [30m]", "2024-05-01T06:00:00", "2024-05-01T06:30:00", "America/Sao_Paulo")
+        self.assertIs(sync_event(self.service, "cal", event, self.index), self.existing)
+        self.service.events.assert_not_called()
+
+    def test_changed_event_is_updated_and_indexed(self):
+        """Test that a matching event with different times is updated and re-indexed."""
+        updated = make_event("Task", "2024-05-01T07:00:00-03:00", "2024-05-01T07:30:00-03:00", "America/Sao_Paulo", "abc")
+        self.service.events().patch().execute.return_value = updated
+        event = make_event("Task", "2024-05-01T07:00:00", "2024-05-01T07:30:00", "America/Sao_Paulo")
+        self.assertIs(sync_event(self.service, "cal", event, self.index), updated)
+        self.assertIs(self.index.lookup("Task")["event"], updated)
+        self.service.events().list.assert_not_called()
+        self.assertEqual(self.service.events().patch.call_args.kwargs["body"], {"start": event["start"], "end": event["end"]})
+
+    def test_new_event_is_created_and_indexed(self):
+        """Test that an unmatched event is created and added to the index."""
+        created = make_event("New task", "2024-05-01T07:00:00Z", "2024-05-01T07:30:00Z", event_id="new")
+        self.service.events().insert().execute.return_value = created
+        event = make_event("New task", "2024-05-01T07:00:00", "2024-05-01T07:30:00")
+        self.assertIs(sync_event(self.service, "cal", event, self.index), created)
+        self.assertIs(self.index.lookup("New task")["event"], created)
+
+
+class TestDiffEvent(unittest.TestCase):
+    """
+    Unit tests for the diff_event function.
+    """
+
+    def test_only_changed_fields(self):
+        """Test that only the moved end time and the changed content hash are patched."""
+        existing = make_event("Task", "2024-05-01T06:00:00-03:00", "2024-05-01T06:30:00-03:00", "America/Sao_Paulo")
+        existing["extendedProperties"] = {"private": {"todoist_id": "1", "content_hash": "old"}}
+        event = make_event("Task", "2024-05-01T06:00:00", "2024-05-01T07:00:00", "America/Sao_Paulo")
+        event["description"] = ""
+        event["extendedProperties"] = {"private": {"todoist_id": "1", "content_hash": "new"}}
+
+        self.assertEqual(diff_event(event, existing), {
+            "end": event["end"],
+            "extendedProperties": {"private": {"content_hash": "new"}},
+        })
+
+    def test_time_zone_change(self):
+        """Test that a time zone change is patched even if the instant is the same."""
+        existing = make_event("Task", "2024-05-01T09:00:00Z", "2024-05-01T09:30:00Z", "UTC")
+        event = make_event("Task", "2024-05-01T11:00:00+02:00", "2024-05-01T11:30:00+02:00", "Europe/Madrid")
+        self.assertEqual(set(diff_event(event, existing)), {"start", "end"})
+
+
+class TestIterEvents(unittest.TestCase):
+    """
+    Unit tests for the paginated iter_events generator.
+    """
+
+    def test_follows_every_page(self):
+        """Test that every page is requested and yielded in order."""
+        service = MagicMock()
+        service.events().list().execute.side_effect = [
+            {"items": [{"id": "1"}, {"id": "2"}], "nextPageToken": "next"},
+            {"items": [{"id": "3"}]},
+        ]
+        events = iter_events(service, "cal", "2024-05-01T00:00:00+00:00", "2024-06-01T00:00:00+00:00")
+        self.assertEqual([event["id"] for event in events], ["1", "2", "3"])
+        last_call = service.events().list.call_args
+        self.assertEqual(last_call.kwargs["pageToken"], "next")
+        self.assertEqual(last_call.kwargs["timeMin"], "2024-05-01T00:00:00+00:00")
+        self.assertEqual(last_call.kwargs["maxResults"], 2500)
+
+
+class TestGetEventWindow(unittest.TestCase):
+    """
+    Unit tests for the get_event_window function.
+    """
+
+    def test_window_spans_due_dates_with_padding(self):
+        """Test that the window covers all due dates widened by the padding."""
+        tasks = [
+            SimpleNamespace(due=SimpleNamespace(date="2024-05-10")),
+            SimpleNamespace(due=SimpleNamespace(date="2024-05-03")),
+            SimpleNamespace(due=None),
+        ]
+        self.assertEqual(
+            get_event_window(tasks, 2),
+            ("2024-05-01T00:00:00+00:00", "2024-05-13T00:00:00+00:00")
+        )
+
+    def test_no_due_dates(self):
+        """Test that no window is returned when no task has a due date."""
+        self.assertEqual(get_event_window([SimpleNamespace(due=None)], 2), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
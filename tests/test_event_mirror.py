@@ -0,0 +1,65 @@
+from src.gcal_client import sync_event_mirror
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+from unittest.mock import MagicMock
+import json
+import os
+import tempfile
+import unittest
+
+
+class TestSyncEventMirror(unittest.TestCase):
+    """
+    Unit tests for the incremental sync_event_mirror function.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "mirror.json")
+        self.service = MagicMock()
+        self.list_call = self.service.events().list
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_full_listing_then_deltas(self):
+        """Test that the first run stores the sync token and later runs apply only deltas."""
+        self.list_call().execute.side_effect = [
+            {"items": [{"id": "a", "summary": "A"}], "nextPageToken": "page2"},
+            {"items": [{"id": "b", "summary": "B"}], "nextSyncToken": "token1"},
+            {"items": [{"id": "a", "status": "cancelled"}, {"id": "c", "summary": "C"}], "nextSyncToken": "token2"},
+        ]
+
+        events = sync_event_mirror(self.service, "cal", self.path)
+        self.assertEqual(sorted(events), ["a", "b"])
+        self.assertIsNone(self.list_call.call_args_list[1].kwargs["syncToken"])
+
+        events = sync_event_mirror(self.service, "cal", self.path)
+        self.assertEqual(sorted(events), ["b", "c"])
+        self.assertEqual(self.list_call.call_args.kwargs["syncToken"], "token1")
+
+        with open(self.path) as mirror_file:
+            self.assertEqual(json.load(mirror_file)["sync_token"], "token2")
+
+    def test_gone_triggers_full_resync(self):
+        """Test that a 410 Gone response discards the mirror and lists everything again."""
+        with open(self.path, "w") as mirror_file:
+            json.dump({"sync_token": "stale", "events": {"old": {"id": "old"}}}, mirror_file)
+        self.list_call().execute.side_effect = [
+            HttpError(Response({"status": 410}), b"Gone"),
+            {"items": [{"id": "new", "summary": "New"}], "nextSyncToken": "fresh"},
+        ]
+
+        events = sync_event_mirror(self.service, "cal", self.path)
+        self.assertEqual(list(events), ["new"])
+        self.assertIsNone(self.list_call.call_args.kwargs["syncToken"])
+
+    def test_other_errors_are_raised(self):
+        """Test that errors other than 410 Gone are propagated."""
+        self.list_call().execute.side_effect = HttpError(Response({"status": 500}), b"Error")
+        with self.assertRaises(HttpError):
+            sync_event_mirror(self.service, "cal", self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
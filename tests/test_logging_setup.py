@@ -0,0 +1,85 @@
+from src.logging_setup import (
+    forward_logging, write_forwarded_records, JsonFormatter, SamplingFilter, LOG_SAMPLE_EVERY, LOG_SAMPLE_FIRST
+)
+from logging.handlers import BufferingHandler
+from unittest.mock import patch
+import json
+import logging
+import multiprocessing
+import sys
+import unittest
+
+
+def make_record(message, exc_info=None, **extra):
+    record = logging.LogRecord("root", logging.INFO, __file__, 1, message, None, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+def log_in_worker(records):
+    forward_logging(records)
+    logging.info("Account synced.", extra={"account": "alice"})
+
+
+class TestJsonFormatter(unittest.TestCase):
+    """
+    Unit tests for the JSON log formatter.
+    """
+
+    def test_fields(self):
+        """Test that a record becomes one JSON line holding its extra fields."""
+        entry = json.loads(JsonFormatter().format(make_record("Event created", sample="event_created")))
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["message"], "Event created")
+        self.assertEqual(entry["sample"], "event_created")
+
+    def test_exception(self):
+        """Test that the traceback of an exception is kept in the line."""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            line = JsonFormatter().format(make_record("Failed", exc_info=sys.exc_info()))
+        self.assertNotIn("\n", line)
+        self.assertIn("ValueError: boom", json.loads(line)["exception"])
+
+
+class TestSamplingFilter(unittest.TestCase):
+    """
+    Unit tests for the sampling of per-event log records.
+    """
+
+    def test_sampling(self):
+        """Test that the first records of a kind pass, then one in every LOG_SAMPLE_EVERY."""
+        sampling = SamplingFilter()
+        count = 3 * LOG_SAMPLE_EVERY
+        passed = [sampling.filter(make_record("Event created", sample="created")) for _ in range(count)]
+        self.assertTrue(all(passed[:LOG_SAMPLE_FIRST]))
+        self.assertEqual(sum(passed), LOG_SAMPLE_FIRST + 3)
+        self.assertTrue(sampling.filter(make_record("Sync completed")))
+        self.assertEqual(sampling.pop_counts(), {"created": count})
+        self.assertEqual(sampling.pop_counts(), {})
+
+
+class TestForwardedLogging(unittest.TestCase):
+    """
+    Tests for the forwarding of the log records of worker processes to the parent.
+    """
+
+    def test_worker_records_written_by_parent(self):
+        """Test that the records of a spawned worker reach the log file handler of the parent."""
+        context = multiprocessing.get_context("spawn")
+        records = context.Queue()
+        written = BufferingHandler(capacity=100)
+        with patch("src.logging_setup._file_handler", written):
+            listener = write_forwarded_records(records)
+            worker = context.Process(target=log_in_worker, args=(records,))
+            worker.start()
+            worker.join(timeout=30)
+            listener.stop()
+
+        self.assertEqual(worker.exitcode, 0)
+        self.assertEqual([(record.getMessage(), record.account) for record in written.buffer], [("Account synced.", "alice")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+from src.metrics import SyncMetrics, error_status, export_metrics
+from unittest.mock import MagicMock, patch
+import json
+import os
+import tempfile
+import unittest
+
+
+class TestSyncMetrics(unittest.TestCase):
+    """
+    Unit tests for the SyncMetrics class.
+    """
+
+    def setUp(self):
+        self.metrics = SyncMetrics()
+
+    def test_phase_accumulates(self):
+        """Test that a phase entered several times accumulates its entries."""
+        for _ in range(3):
+            with self.metrics.phase("build"):
+                pass
+        phase = self.metrics.summary()["phases"]["build"]
+        self.assertEqual(phase["count"], 3)
+        self.assertGreaterEqual(phase["seconds"], 0)
+
+    def test_api_calls_counted_by_status(self):
+        """Test that API calls are counted by endpoint and status, and only timed calls fill the histogram."""
+        self.metrics.record_api_call("gcal", "calendar.events.list", 200, 0.07)
+        self.metrics.record_api_call("gcal", "calendar.events.list", 200, 3.0)
+        self.metrics.record_api_call("gcal", "calendar.events.insert", 409)
+
+        summary = self.metrics.summary()
+        self.assertEqual(summary["api_calls"], [
+            {"service": "gcal", "endpoint": "calendar.events.insert", "status": "409", "count": 1},
+            {"service": "gcal", "endpoint": "calendar.events.list", "status": "200", "count": 2},
+        ])
+        histogram = summary["latency"]["gcal calendar.events.list"]
+        self.assertEqual(histogram["count"], 2)
+        self.assertEqual(histogram["max_seconds"], 3.0)
+        self.assertEqual(histogram["buckets"]["0.05"], 0)
+        self.assertEqual(histogram["buckets"]["0.1"], 1)
+        self.assertEqual(histogram["buckets"]["5.0"], 2)
+        self.assertEqual(histogram["buckets"]["+Inf"], 2)
+        self.assertNotIn("gcal calendar.events.insert", summary["latency"])
+
+    def test_track_api_call_records_error_status(self):
+        """Test that a failed call is recorded with the status of its error and the error is raised."""
+        error = Exception("Too Many Requests")
+        error.response = MagicMock(status_code=429)
+        with self.assertRaises(Exception):
+            with self.metrics.track_api_call("todoist", "sync"):
+                raise error
+        self.assertEqual(self.metrics.summary()["api_calls"][0]["status"], "429")
+        self.assertEqual(error_status(ValueError()), "ValueError")
+
+    def test_prometheus_format(self):
+        """Test the Prometheus text exposition of phases, calls and latencies."""
+        with self.metrics.phase("write"):
+            pass
+        self.metrics.record_api_call("gcal", "batch", 200, 0.2)
+        lines = self.metrics.to_prometheus().splitlines()
+        self.assertIn('todoist_gcal_sync_api_calls{service="gcal",endpoint="batch",status="200"} 1', lines)
+        self.assertIn('todoist_gcal_sync_api_latency_seconds_bucket{service="gcal",endpoint="batch",le="0.1"} 0', lines)
+        self.assertIn('todoist_gcal_sync_api_latency_seconds_bucket{service="gcal",endpoint="batch",le="+Inf"} 1', lines)
+        self.assertIn('todoist_gcal_sync_api_latency_seconds_count{service="gcal",endpoint="batch"} 1', lines)
+        self.assertTrue(any(line.startswith('todoist_gcal_sync_phase_seconds{phase="write"}') for line in lines))
+
+    def test_export_writes_files(self):
+        """Test that the JSON summary and the Prometheus metrics are written."""
+        self.metrics.record_api_call("todoist", "rest.tasks", 200, 0.1)
+        with tempfile.TemporaryDirectory() as directory:
+            prometheus_path = os.path.join(directory, "sync.prom")
+            with patch("config.settings.Config.STATE_DIR", directory), \
+                    patch("config.settings.Config.METRICS_FILE", None), \
+                    patch("config.settings.Config.PROMETHEUS_METRICS_FILE", prometheus_path):
+                export_metrics(self.metrics)
+
+            with open(os.path.join(directory, "metrics.json")) as metrics_file:
+                self.assertEqual(json.load(metrics_file)["api_calls"][0]["endpoint"], "rest.tasks")
+            with open(prometheus_path) as metrics_file:
+                self.assertIn("todoist_gcal_sync_api_calls", metrics_file.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+from config.settings import Config
+from src.multi_account import Account, AccountResult, load_roster, run_accounts, schedule_accounts, sync_account
+from src.persistence import save_json_state
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+import json
+import os
+import tempfile
+import unittest
+
+
+class WorkerDied(BaseException):
+    """Raised by a fake sync to stand for its worker process dying."""
+
+
+class FakeProcessPool:
+    """
+    In-process stand-in for ProcessPoolExecutor, syncing accounts max_workers at a time.
+    A sync raising WorkerDied breaks the pool, failing every account not finished before.
+    """
+    pools = []
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        self.max_workers = max_workers or 2
+        self.submitted = []
+        initializer(*initargs)
+        self.pools.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, account):
+        future = Future()
+        self.submitted.append((future, fn, account))
+        return future
+
+    def run(self):
+        for start in range(0, len(self.submitted), self.max_workers):
+            outcomes, died = [], False
+            for future, fn, account in self.submitted[start:start + self.max_workers]:
+                try:
+                    outcomes.append((future, fn(account)))
+                except WorkerDied:
+                    died = True
+            if died:
+                for future, _, _ in self.submitted[start:]:
+                    future.set_exception(BrokenProcessPool("A worker process died"))
+                return
+            for future, result in outcomes:
+                future.set_result(result)
+
+
+def fake_as_completed(futures):
+    FakeProcessPool.pools[-1].run()
+    return list(futures)
+
+
+class TestMultiAccount(unittest.TestCase):
+    """
+    Unit tests for the multi-account runner.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_roster(self, roster):
+        path = os.path.join(self.root, "roster.json")
+        with open(path, "w") as roster_file:
+            json.dump(roster, roster_file)
+        return path
+
+    def make_account(self, name, **environ):
+        return Account(name, dict({"TODOIST_API_KEY": name, "TIME_ZONE": "UTC",
+                                   "STATE_DIR": os.path.join(self.root, name)}, **environ))
+
+    def test_load_roster(self):
+        """Test that each account gets its own paths and the settings of its .env file."""
+        os.makedirs(os.path.join(self.root, "alice"))
+        with open(os.path.join(self.root, "alice", ".env"), "w") as env_file:
+            env_file.write("TODOIST_API_KEY=alice-key\nTIME_ZONE=Europe/Madrid\n")
+        path = self.write_roster({
+            "defaults": {"env": {"TIME_ZONE": "UTC"}, "options": {"delta": True}},
+            "accounts": [
+                {"name": "alice"},
+                {"name": "bob", "directory": "users/bob", "env": {"TODOIST_API_KEY": "bob-key"}, "options": {"workers": 4}},
+            ]
+        })
+
+        alice, bob = load_roster(path)
+        self.assertEqual(alice.environ["TODOIST_API_KEY"], "alice-key")
+        self.assertEqual(alice.environ["TIME_ZONE"], "Europe/Madrid")
+        self.assertEqual(alice.environ["TOKEN_FILE"], os.path.join(self.root, "alice", "token.json"))
+        self.assertEqual(bob.environ["TIME_ZONE"], "UTC")
+        self.assertEqual(bob.environ["STATE_DIR"], os.path.join(self.root, "users", "bob", ".sync_state"))
+        self.assertEqual(bob.options, {"delta": True, "workers": 4})
+
+    def test_duplicate_names_rejected(self):
+        """Test that a roster naming two accounts alike is rejected."""
+        path = self.write_roster({"accounts": [{"name": "alice"}, {"name": "alice"}]})
+        with self.assertRaises(ValueError):
+            load_roster(path)
+
+    def test_accounts_synced_with_own_config(self):
+        """Test that each account is synced with its own Config and failures are contained."""
+        seen = []
+
+        def sync(**options):
+            seen.append((Config.TODOIST_API_KEY, Config.STATE_DIR))
+            if Config.TODOIST_API_KEY == "bob":
+                raise RuntimeError("Calendar unavailable")
+
+        with patch("src.sync.sync_todoist_to_gcal", side_effect=sync):
+            alice = sync_account(self.make_account("alice"))
+            bob = sync_account(self.make_account("bob"))
+            carol = sync_account(Account("carol", {"TODOIST_API_KEY": "carol"}))
+
+        self.assertTrue(alice.ok)
+        self.assertFalse(bob.ok)
+        self.assertIn("Calendar unavailable", bob.error)
+        self.assertFalse(carol.ok)
+        self.assertIn("TIME_ZONE", carol.error)
+        self.assertEqual(seen, [("alice", os.path.join(self.root, "alice")), ("bob", os.path.join(self.root, "bob"))])
+
+    def test_schedule_shortest_first(self):
+        """Test that new accounts go first, then the accounts with the shortest previous sync."""
+        slow, fast, new = self.make_account("slow"), self.make_account("fast"), self.make_account("new")
+        save_json_state(os.path.join(self.root, "slow", "metrics.json"), {"duration_seconds": 120.0})
+        save_json_state(os.path.join(self.root, "fast", "metrics.json"), {"duration_seconds": 2.0})
+
+        order = [account.name for account in schedule_accounts([slow, fast, new])]
+        self.assertEqual(order, ["new", "fast", "slow"])
+
+    @patch("src.multi_account._started_accounts", None)
+    @patch("src.multi_account.forward_logging")
+    @patch("src.multi_account.as_completed", side_effect=fake_as_completed)
+    @patch("src.multi_account.ProcessPoolExecutor", FakeProcessPool)
+    def test_crash_counted_against_crashed_account(self, as_completed, forward_logging):
+        """Test that a worker dying only fails its own account, with the others synced again."""
+        synced = []
+
+        def sync(account):
+            synced.append(account.name)
+            if account.name == "crashing":
+                raise WorkerDied()
+            return AccountResult(account.name, True, 0.1)
+
+        accounts = [self.make_account(name) for name in ("alice", "crashing", "bob", "carol")]
+        with patch("src.multi_account.sync_account", side_effect=sync):
+            results = run_accounts(accounts, processes=2)
+
+        self.assertEqual([result.ok for result in results], [True, False, True, True])
+        self.assertEqual(results[1].error, "Worker process died")
+        self.assertEqual(synced.count("crashing"), 3)
+        self.assertEqual(synced.count("bob"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+from src.rate_limiter import RateLimiter, parse_retry_after
+import unittest
+
+
+class FakeClock:
+    """
+    Clock that only advances when sleeping.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Throttled(Exception):
+    pass
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Unit tests for the RateLimiter class.
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(10, capacity=2, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_acquire_respects_rate(self):
+        """Test that requests beyond the burst capacity wait for tokens."""
+        for _ in range(12):
+            self.limiter.acquire()
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+    def test_batch_larger_than_capacity_charged_in_full(self):
+        """Test that a batch larger than the burst capacity is charged for every request it sends."""
+        limiter = RateLimiter(10, clock=self.clock, sleep=self.clock.sleep)
+        limiter.acquire(50)
+        self.assertEqual(self.clock.now, 0)
+        # The 40 requests beyond the full bucket are paid before the next batch of 50 starts
+        limiter.acquire(50)
+        self.assertAlmostEqual(self.clock.now, 5.0)
+        limiter.acquire(1)
+        self.assertAlmostEqual(self.clock.now, 9.1)
+
+    def test_throttle_halves_rate_and_success_recovers(self):
+        """Test that throttling lowers the rate and successes raise it back up."""
+        self.limiter.record_throttle()
+        self.assertEqual(self.limiter.rate, 5)
+        for _ in range(100):
+            self.limiter.record_success()
+        self.assertEqual(self.limiter.rate, 10)
+
+    def test_call_retries_throttled_requests_honoring_retry_after(self):
+        """Test that throttled calls are retried no sooner than the Retry-After delay."""
+        outcomes = iter([Throttled(), Throttled(), "done"])
+
+        def func():
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        result = self.limiter.call(func, lambda error: 3.0 if isinstance(error, Throttled) else None)
+        self.assertEqual(result, "done")
+        self.assertGreaterEqual(self.clock.now, 6.0)
+        self.assertLess(self.limiter.rate, 10)
+
+    def test_call_raises_other_errors(self):
+        """Test that errors other than throttling are raised immediately."""
+        def func():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            self.limiter.call(func, lambda error: None)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_parse_retry_after(self):
+        """Test parsing of Retry-After headers."""
+        self.assertEqual(parse_retry_after("5"), 5.0)
+        self.assertEqual(parse_retry_after(None), 0.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
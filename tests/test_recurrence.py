@@ -0,0 +1,94 @@
+from src.gcal_client import diff_event, patch_body
+from src.recurrence import parse_recurrence, recurrence_lines, MAX_EXPANDED_OCCURRENCES
+from src.state_store import hash_event
+from src.sync import build_event
+from datetime import date, datetime
+from types import SimpleNamespace
+import unittest
+
+
+def make_recurring_task(due_string, due_date="2024-05-06", due_datetime=None):
+    return SimpleNamespace(
+        id="1",
+        content="Water plants",
+        description="",
+        duration=None,
+        due=SimpleNamespace(date=due_date, datetime=due_datetime, timezone="Europe/Madrid",
+                            string=due_string, is_recurring=True),
+    )
+
+
+class TestRecurrence(unittest.TestCase):
+    """
+    Unit tests for the translation of Todoist due strings into recurrence rules.
+    """
+
+    def rule(self, due_string, time_zone="UTC"):
+        lines = recurrence_lines(due_string, datetime(2024, 5, 6, 9), time_zone)
+        return lines and lines[0]
+
+    def test_rules(self):
+        """Test that common due strings become the matching RRULE."""
+        self.assertEqual(self.rule("every day"), "RRULE:FREQ=DAILY")
+        self.assertEqual(self.rule("Daily at 9am"), "RRULE:FREQ=DAILY")
+        self.assertEqual(self.rule("every other week"), "RRULE:FREQ=WEEKLY;INTERVAL=2")
+        self.assertEqual(self.rule("every 3 months"), "RRULE:FREQ=MONTHLY;INTERVAL=3")
+        self.assertEqual(self.rule("every mon, wed and fri"), "RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR")
+        self.assertEqual(self.rule("every workday"), "RRULE:FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR")
+        self.assertEqual(self.rule("every 15th"), "RRULE:FREQ=MONTHLY;BYMONTHDAY=15")
+        self.assertEqual(self.rule("every last day"), "RRULE:FREQ=MONTHLY;BYMONTHDAY=-1")
+        self.assertEqual(self.rule("every first monday"), "RRULE:FREQ=MONTHLY;BYDAY=1MO")
+        self.assertEqual(self.rule("every last workday"), "RRULE:FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1")
+        self.assertEqual(self.rule("every jan 15"), "RRULE:FREQ=YEARLY;BYMONTH=1;BYMONTHDAY=15")
+        self.assertEqual(self.rule("every 15 jan"), "RRULE:FREQ=YEARLY;BYMONTH=1;BYMONTHDAY=15")
+
+    def test_bounded_rules(self):
+        """Test that 'until' and 'for' bound the rule in UTC, including the last day."""
+        self.assertEqual(self.rule("every monday until jun 30", "Europe/Madrid"),
+                         "RRULE:FREQ=WEEKLY;BYDAY=MO;UNTIL=20240630T215959Z")
+        self.assertEqual(self.rule("every day for 2 weeks"), "RRULE:FREQ=DAILY;UNTIL=20240519T235959Z")
+        self.assertEqual(parse_recurrence("every day until jan 10", date(2024, 5, 6)).until, date(2025, 1, 10))
+
+    def test_unsupported(self):
+        """Test that completion-based and unknown due strings have no recurrence."""
+        self.assertIsNone(self.rule("every! 3 days"))
+        self.assertIsNone(self.rule("after 2 weeks"))
+        self.assertIsNone(self.rule("every full moon"))
+        self.assertIsNone(self.rule(None))
+
+    def test_sub_daily_expanded(self):
+        """Test that recurrences Google Calendar cannot repeat are expanded into dates."""
+        line = self.rule("every 2 hours", "Europe/Madrid")
+        self.assertTrue(line.startswith("RDATE;TZID=Europe/Madrid:20240506T110000,20240506T130000,"))
+        self.assertEqual(len(line.split(":", 1)[1].split(",")), MAX_EXPANDED_OCCURRENCES - 1)
+        self.assertEqual(self.rule("every 12 hours until may 7"),
+                         "RDATE;TZID=UTC:20240506T210000,20240507T090000,20240507T210000")
+
+
+class TestRecurringEvents(unittest.TestCase):
+    """
+    Tests for the events built from recurring tasks.
+    """
+
+    def test_build_event(self):
+        """Test that a recurring task becomes a single event carrying its rule."""
+        event = build_event(make_recurring_task("every tuesday at 18:00", "2024-05-07", "2024-05-07T18:00:00"))
+        self.assertEqual(event["start"]["dateTime"], "2024-05-07T18:00:00")
+        self.assertEqual(event["recurrence"], ["RRULE:FREQ=WEEKLY;BYDAY=TU"])
+
+        unsupported = build_event(make_recurring_task("every! week"))
+        self.assertNotIn("recurrence", unsupported)
+        self.assertNotEqual(hash_event(event), hash_event(dict(event, recurrence=["RRULE:FREQ=DAILY"])))
+
+    def test_recurrence_cleared(self):
+        """Test that a task that stops recurring clears the rule of its event."""
+        event = build_event(make_recurring_task("every! week"))
+        existing_event = dict(event, recurrence=["RRULE:FREQ=WEEKLY"])
+        self.assertEqual(diff_event(event, existing_event), {"recurrence": []})
+        self.assertEqual(diff_event(existing_event, existing_event), {})
+        self.assertEqual(patch_body(event)["recurrence"], [])
+        self.assertEqual(patch_body(existing_event)["recurrence"], ["RRULE:FREQ=WEEKLY"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+from src.metrics import METRICS
+from src.scheduler import AdaptiveInterval, PollingScheduler, PollResult, poll_todoist_changes
+from src.todoist_client import SyncTask
+from unittest.mock import patch
+import tempfile
+import unittest
+
+
+class TestAdaptiveInterval(unittest.TestCase):
+    """
+    Unit tests for the AdaptiveInterval class.
+    """
+
+    def test_interval_follows_change_rate(self):
+        """Test that changes shorten the interval and idle polls lengthen it within the bounds."""
+        interval = AdaptiveInterval(60, 1800, jitter=0)
+        self.assertEqual(interval.next_delay(), 60)
+
+        self.assertEqual(interval.record(10, 60), 60)
+        idle = [interval.record(0, 60) for _ in range(6)]
+        self.assertEqual(idle, [60, 60, 60, 96, 192, 384])
+        self.assertEqual(interval.record(60, 1800), 60)
+
+    def test_jitter_within_bounds(self):
+        """Test that jittered delays deviate from the interval without leaving the bounds."""
+        interval = AdaptiveInterval(60, 100, jitter=0.5)
+        interval.interval = 90
+        delays = [interval.next_delay() for _ in range(200)]
+        self.assertTrue(all(45 <= delay <= 100 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_invalid_bounds(self):
+        """Test that a minimum above the maximum is rejected."""
+        with self.assertRaises(ValueError):
+            AdaptiveInterval(120, 60)
+
+
+class TestPollingScheduler(unittest.TestCase):
+    """
+    Unit tests for the PollingScheduler class, with a fake poll and clock.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch("config.settings.Config.STATE_DIR", self.temp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.now = 0.0
+        self.results = []
+        self.scheduler = PollingScheduler(
+            self.poll, AdaptiveInterval(60, 600, jitter=0), clock=lambda: self.now, wall_clock=lambda: 1000 + self.now
+        )
+
+    def poll(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        self.now += 2
+        return result
+
+    def test_cycles_adapt_and_report_schedule(self):
+        """Test that idle cycles lengthen the delay and the cost and next run are recorded."""
+        self.results = [PollResult(None, 40), PollResult(0, 1), PollResult(0, 1)]
+        delays = []
+        for _ in range(3):
+            delays.append(self.scheduler.run_cycle())
+            self.now += delays[-1]
+
+        self.assertEqual(delays, [60, 120, 240])
+        schedule = METRICS.summary()["schedule"]
+        self.assertEqual(schedule["cycle"], 3)
+        self.assertEqual(schedule["changes"], 0)
+        self.assertEqual(schedule["cycle_api_calls"], 1)
+        self.assertEqual(schedule["next_run_at"], 1000 + self.now)
+
+    def test_failed_cycle_keeps_interval(self):
+        """Test that a failing poll is logged and retried after the current interval."""
+        self.results = [RuntimeError("quota"), PollResult(0, 1)]
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(self.scheduler.run_cycle(), 60)
+        self.scheduler.run(max_cycles=2)
+        self.assertEqual(self.scheduler.cycles, 2)
+
+
+class TestPollTodoistChanges(unittest.TestCase):
+    """
+    Tests for poll_todoist_changes, with the Todoist and sync functions mocked.
+    """
+
+    def setUp(self):
+        self.saved_tokens = []
+        patchers = [
+            patch("src.todoist_client.load_todoist_sync_token", return_value="token-1"),
+            patch("src.todoist_client.save_todoist_sync_token", side_effect=self.saved_tokens.append),
+            patch("src.sync.sync_todoist_changes_to_gcal"),
+            patch("src.sync.sync_todoist_to_gcal"),
+        ]
+        self.mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def test_idle_poll_only_checks(self):
+        """Test that no sync runs when Todoist reports no change."""
+        with patch("src.todoist_client.get_task_deltas", return_value=([], "token-2", False)):
+            result = poll_todoist_changes()
+        self.assertEqual(result.changes, 0)
+        self.mocks[2].assert_not_called()
+        self.assertEqual(self.saved_tokens, ["token-2"])
+
+    def test_changes_synced_before_token_saved(self):
+        """Test that changed tasks are synced and the token is not saved when the sync fails."""
+        changed = [SyncTask(id="1", content="Task")]
+        self.mocks[2].side_effect = RuntimeError("sync failed")
+        with patch("src.todoist_client.get_task_deltas", return_value=(changed, "token-2", False)):
+            with self.assertRaises(RuntimeError):
+                poll_todoist_changes()
+        self.assertEqual(self.mocks[2].call_args[0][0], changed)
+        self.assertEqual(self.saved_tokens, [])
+
+    def test_rejected_token_runs_full_sync(self):
+        """Test that a full sync runs when Todoist rejected the sync token, leaving the token to it."""
+        with patch("src.todoist_client.get_task_deltas", return_value=([SyncTask(id="1", content="Task")], "token-2", True)):
+            result = poll_todoist_changes()
+        self.assertIsNone(result.changes)
+        self.mocks[2].assert_not_called()
+        self.assertTrue(self.mocks[3].call_args.kwargs["delta"])
+        self.assertEqual(self.saved_tokens, [])
+
+    def test_first_poll_runs_full_sync(self):
+        """Test that a full delta sync runs when no sync token was saved yet."""
+        self.mocks[0].return_value = None
+        result = poll_todoist_changes()
+        self.assertIsNone(result.changes)
+        self.assertTrue(self.mocks[3].call_args.kwargs["delta"])
+
+
+if __name__ == "__main__":
+    unittest.main()
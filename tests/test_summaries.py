@@ -1,4 +1,4 @@
-from src.sync import summaries_are_identical
+from src.gcal_client import summaries_are_identical
 import unittest
 
 class TestSummariesAreIdentical(unittest.TestCase):
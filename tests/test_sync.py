@@ -0,0 +1,526 @@
+from src.calendar_routes import CalendarRoutes
+from src.sync import (
+    fan_out_tasks, migrate_legacy_task_ids, sync_todoist_to_gcal, sync_todoist_changes_to_gcal, CALENDAR_QUEUE_CHUNKS,
+    MATCH_BY_PROPERTY, MATCH_BY_TASK_ID, MAX_BATCH_SIZE
+)
+from src.gcal_client import execute_event_writes, get_private_property, task_event_id, EventWrite
+from src.rate_limiter import RateLimiter
+from src.state_store import TaskStateStore, hash_event
+from src.todoist_client import SyncDue, SyncTask
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+
+class FakeBatch:
+    """
+    Stand-in for BatchHttpRequest that executes the added requests one by one.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as error:
+                self.callback(request_id, None, error)
+
+
+def make_task(task_id, content, due_date="2024-05-01", due_datetime=None):
+    return SimpleNamespace(
+        id=task_id,
+        content=content,
+        description="",
+        duration=None,
+        due=SimpleNamespace(date=due_date, datetime=due_datetime, timezone="UTC", is_recurring=False),
+        parent_id=None,
+        is_completed=False,
+        is_deleted=False,
+    )
+
+
+class TestSyncTodoistToGcal(unittest.TestCase):
+    """
+    Tests for sync_todoist_to_gcal against mocked Todoist and Google Calendar clients.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.service = MagicMock()
+        self.service.events().list().execute.return_value = {"items": []}
+        self.service.events().insert().execute.side_effect = lambda: {"id": "event-1", "summary": "Task", "htmlLink": "link"}
+        self.service.events().patch().execute.side_effect = lambda: {"id": "event-1", "summary": "Task", "htmlLink": "link"}
+        self.service.new_batch_http_request.side_effect = FakeBatch
+        self.service.reset_mock()
+        self.tasks = [make_task("1", "Task [30m]")]
+
+        patchers = [
+            patch("config.settings.Config.STATE_DIR", self.temp_dir.name),
+            patch("src.gcal_client.gcal_rate_limiter", return_value=RateLimiter(1000, capacity=1000)),
+            patch("src.sync.iter_task_pages", side_effect=lambda *args, **kwargs: iter([self.tasks])),
+            patch("src.sync.get_google_credentials"),
+            patch("src.sync.create_gcal_service", return_value=self.service),
+            patch("src.sync.get_thread_gcal_service", return_value=self.service),
+            patch("src.sync.resolve_calendar_ids", side_effect=lambda service, names: {name: "cal" for name in names}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_unchanged_task_makes_no_event_calls(self):
+        """Test that a second run over unchanged tasks skips every event API call."""
+        sync_todoist_to_gcal()
+        self.assertEqual(self.service.events().insert.call_count, 1)
+        self.service.reset_mock()
+
+        sync_todoist_to_gcal()
+        self.service.events.assert_not_called()
+
+    def test_changed_task_is_updated_by_id(self):
+        """Test that a renamed task updates its event directly without listing the calendar."""
+        sync_todoist_to_gcal()
+        self.service.reset_mock()
+
+        self.tasks = [make_task("1", "Renamed task", due_date="2024-05-02")]
+        sync_todoist_to_gcal()
+        self.assertEqual(self.service.events().patch.call_args.kwargs["eventId"], "event-1")
+        self.service.events().list.assert_not_called()
+        self.service.events().insert.assert_not_called()
+
+    def test_deleted_event_is_matched_again(self):
+        """Test that a task whose synced event was deleted is recreated."""
+        sync_todoist_to_gcal()
+        self.service.events().patch().execute.side_effect = HttpError(Response({"status": 404}), b"Not Found")
+        self.service.reset_mock()
+
+        self.tasks = [make_task("1", "Task", due_date="2024-05-02")]
+        sync_todoist_to_gcal()
+        self.assertEqual(self.service.events().insert.call_count, 1)
+        self.service.events().list.assert_called()
+
+    def test_interrupted_insert_replayed(self):
+        """Test that an insert journaled by an interrupted run is repeated under its ID instead of duplicated."""
+        with TaskStateStore() as store:
+            store.plan("cal", [("1", "insert", "plannedid", "old-hash")])
+        self.service.events().insert().execute.side_effect = HttpError(Response({"status": 409}), b"Conflict")
+        self.service.reset_mock()
+
+        sync_todoist_to_gcal()
+        self.service.events().list.assert_not_called()
+        self.assertEqual(self.service.events().insert.call_args.kwargs["body"]["id"], "plannedid")
+        self.assertEqual(self.service.events().patch.call_args.kwargs["eventId"], "plannedid")
+        with TaskStateStore() as store:
+            self.assertIsNone(store.get_planned("cal", "1"))
+            self.assertEqual(store.get("cal", "1")[0], "event-1")
+
+    def test_batches_committed_before_close(self):
+        """Test that written batches are on disk before the sync ends, as if the process died."""
+        self.tasks = [make_task(str(number), f"Task {number}") for number in range(60)]
+        self.service.events().insert().execute.side_effect = [
+            {"id": f"event-{number}", "htmlLink": "link"} for number in range(60)
+        ]
+        self.service.reset_mock()
+
+        with patch("src.sync.TaskStateStore.close"):
+            sync_todoist_to_gcal()
+        with TaskStateStore() as store:
+            self.assertEqual(store.get("cal", "59")[0], "event-59")
+            self.assertIsNone(store.get_planned("cal", "59"))
+        inserted_ids = {call.kwargs["body"]["id"] for call in self.service.events().insert.call_args_list if call.kwargs}
+        self.assertEqual(len(inserted_ids), 60)
+
+    def test_tasks_routed_to_calendars(self):
+        """Test that each calendar is synced with the tasks routed to it."""
+        work_task = make_task("2", "Work task")
+        work_task.project_id = "work"
+        self.tasks = [make_task("1", "Task"), work_task]
+        calendar_ids = {"Todoist Tasks": "cal", "Work": "cal-work"}
+        with patch("src.sync.load_calendar_routes", return_value=CalendarRoutes(projects={"work": "Work"})), \
+                patch("src.sync.resolve_calendar_ids", side_effect=lambda service, names: {name: calendar_ids[name] for name in names}):
+            sync_todoist_to_gcal(use_state_store=False)
+
+        inserts = {
+            call.kwargs["body"]["summary"]: call.kwargs["calendarId"]
+            for call in self.service.events().insert.call_args_list if call.kwargs
+        }
+        self.assertEqual(inserts, {"Task": "cal", "Work task": "cal-work"})
+        self.assertEqual(self.service.events().list.call_count, 2)
+
+    def test_writes_start_before_fetch_ends(self):
+        """Test that tasks are written while later pages are still to be fetched."""
+        batches_before_page = []
+
+        def pages(*args, **kwargs):
+            for start in range(0, 150, 50):
+                batches_before_page.append(self.service.new_batch_http_request.call_count)
+                yield [make_task(str(number), f"Task {number}") for number in range(start, start + 50)]
+
+        with patch("src.sync.iter_task_pages", side_effect=pages):
+            sync_todoist_to_gcal(use_state_store=False)
+        self.assertEqual(batches_before_page, [0, 1, 2])
+        self.assertEqual(self.service.events().insert.call_count, 150)
+
+    def test_failed_fetch_skips_reconcile(self):
+        """Test that no event is deleted when the fetch fails partway, for one or several calendars."""
+        def pages(*args, **kwargs):
+            yield [make_task("1", "Task")]
+            raise RuntimeError("Todoist unavailable")
+
+        self.service.events().list().execute.return_value = {"items": [{"id": "other", "summary": "Other"}]}
+        for routes in (CalendarRoutes(), CalendarRoutes(projects={"work": "Work"})):
+            with patch("src.sync.iter_task_pages", side_effect=pages), \
+                    patch("src.sync.load_calendar_routes", return_value=routes):
+                with self.assertRaises(RuntimeError):
+                    sync_todoist_to_gcal(use_state_store=False, reconcile=True)
+        self.service.events().delete.assert_not_called()
+
+    def test_writes_are_batched(self):
+        """Test that many new tasks are written in batches of the API limit."""
+        self.tasks = [make_task(str(number), f"Task {number}") for number in range(120)]
+        sync_todoist_to_gcal(use_state_store=False)
+        self.assertEqual(self.service.new_batch_http_request.call_count, 3)
+        self.assertEqual(self.service.events().insert.call_count, 120)
+
+    def test_concurrent_writes_keep_task_order(self):
+        """Test that concurrent batches are handled in the order they were queued."""
+        self.tasks = [make_task(str(number), f"Task {number}") for number in range(120)]
+        counter = iter(range(1000))
+        self.service.events().insert().execute.side_effect = lambda: {"id": f"event-{next(counter)}", "htmlLink": "link"}
+        sync_todoist_to_gcal(workers=3)
+        with TaskStateStore(os.path.join(self.temp_dir.name, "sync_state.db")) as store:
+            self.assertEqual(len({store.get("cal", str(number))[0] for number in range(120)}), 120)
+
+    def test_task_id_strategy_upserts_without_listing(self):
+        """Test that the task ID strategy inserts under derived IDs and updates on conflict."""
+        with open(os.path.join(self.temp_dir.name, "task_id_migration.json"), "w") as migration_file:
+            migration_file.write('["cal"]')
+        self.service.events().insert().execute.side_effect = HttpError(Response({"status": 409}), b"Conflict")
+        self.service.reset_mock()
+
+        sync_todoist_to_gcal(match_strategy=MATCH_BY_TASK_ID, use_state_store=False)
+        self.service.events().list.assert_not_called()
+        self.assertEqual(self.service.events().insert.call_args.kwargs["body"]["id"], task_event_id("1"))
+        update_kwargs = self.service.events().patch.call_args.kwargs
+        self.assertEqual(update_kwargs["eventId"], task_event_id("1"))
+        self.assertEqual(update_kwargs["body"]["status"], "confirmed")
+
+    def test_migration_moves_summary_matched_events(self):
+        """Test that the first task ID run recreates matched events under derived IDs."""
+        self.service.events().list().execute.return_value = {"items": [{
+            "id": "random", "summary": "Task",
+            "start": {"dateTime": "2024-05-01T09:00:00Z", "timeZone": "UTC"},
+            "end": {"dateTime": "2024-05-01T09:30:00Z", "timeZone": "UTC"},
+        }]}
+        self.service.events().insert().execute.side_effect = lambda: {"id": task_event_id("1"), "htmlLink": "link"}
+        self.service.reset_mock()
+
+        sync_todoist_to_gcal(match_strategy=MATCH_BY_TASK_ID)
+        self.assertEqual(self.service.events().insert.call_args.kwargs["body"]["id"], task_event_id("1"))
+        self.assertEqual(self.service.events().delete.call_args.kwargs["eventId"], "random")
+
+        self.service.reset_mock()
+        sync_todoist_to_gcal(match_strategy=MATCH_BY_TASK_ID)
+        self.service.events.assert_not_called()
+
+    def test_property_strategy_compares_hashes(self):
+        """Test that events found by task ID property are only rewritten when their hash differs."""
+        sync_todoist_to_gcal(match_strategy=MATCH_BY_PROPERTY, use_state_store=False)
+        inserted = self.service.events().insert.call_args.kwargs["body"]
+        self.assertEqual(get_private_property(inserted, "todoist_id"), "1")
+        lookups = [call.kwargs.get("privateExtendedProperty") for call in self.service.events().list.call_args_list]
+        self.assertIn("todoist_id=1", lookups)
+
+        self.service.events().list().execute.return_value = {"items": [dict(inserted, id="event-1")]}
+        self.service.reset_mock()
+        sync_todoist_to_gcal(match_strategy=MATCH_BY_PROPERTY, use_state_store=False)
+        self.service.events().insert.assert_not_called()
+        self.service.events().patch.assert_not_called()
+
+        self.tasks = [make_task("1", "Task [30m]", due_date="2024-05-02")]
+        sync_todoist_to_gcal(match_strategy=MATCH_BY_PROPERTY, use_state_store=False)
+        self.assertEqual(self.service.events().patch.call_args.kwargs["eventId"], "event-1")
+
+    def test_untagged_events_get_tagged(self):
+        """Test that an untagged event with the task's summary and times is patched with its tags, not duplicated."""
+        untagged = {
+            "id": "legacy", "summary": "Task",
+            "start": {"dateTime": "2024-05-01T09:00:00Z", "timeZone": "UTC"},
+            "end": {"dateTime": "2024-05-01T09:30:00Z", "timeZone": "UTC"},
+        }
+        self.tasks = [make_task("1", "Task [30m]", due_datetime="2024-05-01T09:00:00Z")]
+
+        def list_events(**kwargs):
+            # The property lookup finds nothing, while the listing of the window finds the event
+            request = MagicMock()
+            request.execute.return_value = {"items": [] if "privateExtendedProperty" in kwargs else [untagged]}
+            return request
+
+        self.service.events().list.side_effect = list_events
+        for strategy in (MATCH_BY_PROPERTY, "summary"):
+            self.service.events().insert.reset_mock()
+            self.service.events().patch.reset_mock()
+            sync_todoist_to_gcal(match_strategy=strategy, use_state_store=False)
+            self.service.events().insert.assert_not_called()
+            patched = self.service.events().patch.call_args.kwargs
+            self.assertEqual(patched["eventId"], "legacy")
+            self.assertEqual(get_private_property(patched["body"], "todoist_id"), "1")
+
+    def test_reconcile_deletes_orphans(self):
+        """Test that events without a synced task are deleted, or only printed in a dry run."""
+        times = {"start": {"date": "2024-05-01"}, "end": {"date": "2024-05-02"}}
+        self.service.events().list().execute.return_value = {"items": [
+            dict(times, id="kept", summary="Task", extendedProperties={"private": {"todoist_id": "1"}}),
+            dict(times, id="completed", summary="Task", extendedProperties={"private": {"todoist_id": "2"}}),
+            dict(times, id="legacy-kept", summary="Task [1h]"),
+            dict(times, id="legacy-orphan", summary="Old task"),
+        ]}
+        self.service.reset_mock()
+
+        with patch("src.sync.print") as print_mock:
+            sync_todoist_to_gcal(use_state_store=False, reconcile=True, dry_run=True)
+        self.service.events().delete.assert_not_called()
+        self.assertEqual(
+            sum("Would delete" in call.args[0] for call in print_mock.call_args_list), 1
+        )
+
+        sync_todoist_to_gcal(use_state_store=False, reconcile=True)
+        deleted = [call.kwargs["eventId"] for call in self.service.events().delete.call_args_list]
+        self.assertEqual(deleted, ["completed"])
+
+        self.service.reset_mock()
+        sync_todoist_to_gcal(use_state_store=False, reconcile=True, reconcile_untagged=True)
+        deleted = [call.kwargs["eventId"] for call in self.service.events().delete.call_args_list]
+        self.assertEqual(deleted, ["completed", "legacy-orphan"])
+
+    def test_rejected_token_removes_missing_tasks(self):
+        """Test that the full sync after a rejected token deletes the events of the tasks it no longer returns."""
+        with TaskStateStore(os.path.join(self.temp_dir.name, "sync_state.db")) as store:
+            store.put("cal", "2", "event-2", "hash-2")
+        self.service.events().list().execute.return_value = {"items": [
+            {"id": "event-3", "summary": "Task", "extendedProperties": {"private": {"todoist_id": "3"}}}
+        ]}
+        self.service.reset_mock()
+
+        with patch("src.sync.load_todoist_sync_token", return_value="expired"), \
+                patch("src.sync.save_todoist_sync_token"), \
+                patch("src.sync.get_task_deltas", return_value=(self.tasks, "token-2", True)):
+            sync_todoist_to_gcal(delta=True)
+            deleted = [call.kwargs["eventId"] for call in self.service.events().delete.call_args_list]
+            self.assertEqual(deleted, ["event-2"])
+
+            # Without the state store, the calendar is reconciled instead
+            self.service.reset_mock()
+            sync_todoist_to_gcal(delta=True, use_state_store=False)
+            deleted = [call.kwargs["eventId"] for call in self.service.events().delete.call_args_list]
+            self.assertEqual(deleted, ["event-3"])
+
+    def test_reconcile_keeps_manual_events(self):
+        """Test that an untagged event of a routed calendar survives reconcile unless the store records its task."""
+        work_task = make_task("1", "Task")
+        work_task.project_id = "work"
+        self.tasks = [work_task]
+        with TaskStateStore(os.path.join(self.temp_dir.name, "sync_state.db")) as store:
+            store.put("cal", "7", "recorded", "hash-7")
+        self.service.events().list().execute.return_value = {"items": [
+            {"id": "dentist", "summary": "Dentist"},
+            {"id": "recorded", "summary": "Completed task"},
+        ]}
+        self.service.reset_mock()
+
+        with patch("src.sync.load_calendar_routes", return_value=CalendarRoutes(default=None, projects={"work": "Work"})):
+            sync_todoist_to_gcal(reconcile=True, reconcile_untagged=True)
+        deleted = [call.kwargs["eventId"] for call in self.service.events().delete.call_args_list]
+        self.assertEqual(deleted, ["recorded"])
+
+    def test_delta_removes_completed_tasks(self):
+        """Test that a delta sync deletes the events of completed tasks, and reconciles without changes."""
+        sync_todoist_to_gcal()
+        self.service.reset_mock()
+
+        completed = make_task("1", "Task [30m]")
+        completed.is_completed = True
+        with patch("src.sync.load_todoist_sync_token", return_value="token-1"), \
+                patch("src.sync.save_todoist_sync_token") as save_token:
+            with patch("src.sync.get_task_deltas", return_value=([completed], "token-2", False)):
+                sync_todoist_to_gcal(delta=True)
+            self.assertEqual(self.service.events().delete.call_args.kwargs["eventId"], "event-1")
+            save_token.assert_called_with("token-2")
+
+            self.service.events().list().execute.return_value = {"items": [
+                {"id": "orphan", "summary": "Task", "extendedProperties": {"private": {"todoist_id": "9"}}}
+            ]}
+            self.service.reset_mock()
+            with patch("src.sync.get_task_deltas", return_value=([], "token-3", False)):
+                sync_todoist_to_gcal(delta=True, reconcile=True)
+            self.assertEqual(self.service.events().delete.call_args.kwargs["eventId"], "orphan")
+            save_token.assert_called_with("token-3")
+
+
+    @patch("src.sync.get_id_mappings", return_value={"2995104339": "6Xq7", "2995104340": "6Xq8"})
+    def test_legacy_task_ids_migrated(self, get_id_mappings):
+        """Test that the records, tags and derived event IDs of legacy task IDs move to the current IDs."""
+        path = os.path.join(self.temp_dir.name, "sync_state.db")
+        with TaskStateStore(path) as store:
+            store.put("cal", "2995104339", "event-old", "hash-1")
+            store.put("cal", "2995104340", task_event_id("2995104340"), "hash-2")
+        with sqlite3.connect(path) as connection:
+            connection.execute("PRAGMA user_version = 0")
+        times = {"start": {"date": "2024-05-01"}, "end": {"date": "2024-05-02"}}
+        self.service.events().list().execute.return_value = {"items": [
+            dict(times, id="event-old", summary="A", extendedProperties={"private": {"todoist_id": "2995104339"}}),
+            dict(times, id=task_event_id("2995104340"), summary="B",
+                 extendedProperties={"private": {"todoist_id": "2995104340"}}),
+        ]}
+        self.service.reset_mock()
+
+        with TaskStateStore(path) as store:
+            self.assertTrue(store.has_legacy_task_ids)
+            self.assertEqual(migrate_legacy_task_ids(self.service, "cal", store), [])
+            self.assertEqual(store.get("cal", "6Xq7"), ("event-old", "hash-1"))
+            self.assertEqual(store.get("cal", "6Xq8"), (task_event_id("6Xq8"), "hash-2"))
+            self.assertIsNone(store.get("cal", "2995104339"))
+
+        patched = self.service.events().patch.call_args.kwargs
+        self.assertEqual(patched["eventId"], "event-old")
+        self.assertEqual(patched["body"], {"extendedProperties": {"private": {"todoist_id": "6Xq7"}}})
+        inserted = self.service.events().insert.call_args.kwargs["body"]
+        self.assertEqual((inserted["id"], inserted["summary"]), (task_event_id("6Xq8"), "B"))
+        self.assertEqual(get_private_property(inserted, "todoist_id"), "6Xq8")
+        self.assertEqual(self.service.events().delete.call_args.kwargs["eventId"], task_event_id("2995104340"))
+
+    def test_task_changes_upsert_and_delete(self):
+        """Test that changed tasks are written and the events of completed tasks are deleted without listing."""
+        sync_todoist_to_gcal()
+        self.service.events().list().execute.return_value = {"items": [{"id": "event-2"}]}
+        self.service.reset_mock()
+
+        sync_todoist_changes_to_gcal([
+            SyncTask(id="1", content="Task [30m]", due=SyncDue(date="2024-05-01"), is_completed=True),
+            SyncTask(id="2", content="Completed elsewhere", is_completed=True),
+            SyncTask(id="3", content="New task", due=SyncDue(date="2024-05-03")),
+        ])
+        deleted = [call.kwargs["eventId"] for call in self.service.events().delete.call_args_list]
+        self.assertEqual(deleted, ["event-1", "event-2"])
+        self.assertEqual(self.service.events().insert.call_count, 1)
+        lookups = [call.kwargs.get("privateExtendedProperty") for call in self.service.events().list.call_args_list]
+        self.assertIn("todoist_id=2", lookups)
+        self.assertNotIn("todoist_id=1", lookups)
+
+
+class TestFanOutTasks(unittest.TestCase):
+    """
+    Tests for fan_out_tasks.
+    """
+
+    def test_bounded_pool_does_not_deadlock(self):
+        """Test that calendars waiting for a thread get all their tasks while another one is synced."""
+        calendar_names = ["A", "B", "C"]
+        routes = CalendarRoutes(default=None, projects={name: name for name in calendar_names})
+        task_count = (CALENDAR_QUEUE_CHUNKS + 2) * MAX_BATCH_SIZE
+        tasks = []
+        for number in range(task_count):
+            for name in calendar_names:
+                task = make_task(f"{name}{number}", "Task")
+                task.project_id = name
+                tasks.append(task)
+
+        received = {}
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            def start_calendar(calendar_name, calendar_tasks):
+                return executor.submit(lambda: received.setdefault(calendar_name, len(list(calendar_tasks))))
+
+            fan_out = threading.Thread(target=fan_out_tasks, args=(tasks, routes, start_calendar), daemon=True)
+            fan_out.start()
+            fan_out.join(timeout=10)
+            self.assertFalse(fan_out.is_alive())
+        self.assertEqual(received, {name: task_count for name in calendar_names})
+
+
+class TestTaskEventId(unittest.TestCase):
+    """
+    Unit tests for the task_event_id function.
+    """
+
+    def test_ids_are_valid_base32hex(self):
+        """Test that derived IDs are stable, distinct and use only base32hex characters."""
+        event_id = task_event_id("8152345678")
+        self.assertEqual(event_id, task_event_id("8152345678"))
+        self.assertNotEqual(event_id, task_event_id("8152345679"))
+        self.assertRegex(event_id, r"^[0-9a-v]{5,1024}$")
+
+
+class TestExecuteEventWrites(unittest.TestCase):
+    """
+    Unit tests for the execute_event_writes function.
+    """
+
+    def test_only_failed_writes_are_retried(self):
+        """Test that retryable failures are retried alone and reported per write."""
+        service = MagicMock()
+        service.new_batch_http_request.side_effect = FakeBatch
+        outcomes = {
+            "a": iter([{"id": "a"}]),
+            "b": iter([HttpError(Response({"status": 503}), b"Unavailable"), {"id": "b"}]),
+            "c": iter([HttpError(Response({"status": 400}), b"Bad Request")]),
+        }
+
+        def insert(calendarId, body, fields=None):
+            request = MagicMock()
+            request.execute.side_effect = [next(outcomes[body["summary"]])]
+            return request
+
+        service.events().insert.side_effect = insert
+        writes = [EventWrite({"summary": summary}) for summary in "abc"]
+        execute_event_writes(service, "cal", writes, rate_limiter=RateLimiter(1000, sleep=lambda seconds: None))
+
+        self.assertEqual([write.result["id"] if write.result else None for write in writes], ["a", "b", None])
+        self.assertEqual(writes[2].error.resp.status, 400)
+        self.assertEqual(service.new_batch_http_request.call_count, 2)
+
+
+class TestTaskStateStore(unittest.TestCase):
+    """
+    Unit tests for the TaskStateStore class and hash_event function.
+    """
+
+    def test_round_trip(self):
+        """Test that records survive closing and reopening the store."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "state.db")
+            with TaskStateStore(path) as store:
+                store.put("cal", "1", "event-1", "hash")
+            with TaskStateStore(path) as store:
+                self.assertEqual(store.get("cal", "1"), ("event-1", "hash"))
+                self.assertIsNone(store.get("other", "1"))
+                store.delete("cal", "1")
+                self.assertIsNone(store.get("cal", "1"))
+
+    def test_hash_covers_pushed_fields(self):
+        """Test that the hash changes with pushed fields and ignores others."""
+        event = {"summary": "Task", "start": {"dateTime": "2024-05-01T09:00:00", "timeZone": "UTC"}}
+        self.assertEqual(hash_event(event), hash_event(dict(event, htmlLink="link")))
+        self.assertNotEqual(hash_event(event), hash_event(dict(event, summary="Other")))
+        self.assertNotEqual(
+            hash_event(event),
+            hash_event(dict(event, start={"dateTime": "2024-05-01T09:00:00", "timeZone": "Europe/Paris"}))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
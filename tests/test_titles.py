@@ -0,0 +1,33 @@
+from src.titles import ParsedTitle, parse_title, parse_titles
+import unittest
+
+
+class TestParseTitle(unittest.TestCase):
+    """
+    Unit tests for the single-pass title parser.
+    """
+
+    def test_summary_and_duration(self):
+        """Test that durations are removed from the summary and added up."""
+        self.assertEqual(parse_title("Buy  groceries [30m] "), ParsedTitle("Buy groceries", 30))
+        self.assertEqual(parse_title("Plan [1h] trip [1 hora 15 minutos]"), ParsedTitle("Plan trip", 135))
+        self.assertEqual(parse_title("Read [chapter 2]"), ParsedTitle("Read [chapter 2]", None))
+        self.assertEqual(parse_title("Call mom"), ParsedTitle("Call mom", None))
+
+    def test_results_cached(self):
+        """Test that a title is only parsed once."""
+        parse_title.cache_clear()
+        parse_title("Write report [2h]")
+        parse_title("Write report [2h]")
+        self.assertEqual(parse_title.cache_info().hits, 1)
+
+    def test_batch(self):
+        """Test that a batch is parsed in order, each distinct title once."""
+        parse_title.cache_clear()
+        parsed = parse_titles(["Gym [45]", "Call mom", "Gym [45]"])
+        self.assertEqual([title.summary for title in parsed], ["Gym", "Call mom", "Gym"])
+        self.assertEqual(parse_title.cache_info().misses, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+from src.todoist_client import get_task_deltas, iter_task_pages, SyncTask
+from src.sync import is_syncable_delta
+from unittest.mock import MagicMock, patch
+import requests
+import unittest
+
+
+def make_response(payload, status_code=200):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = payload
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(response=response)
+    return response
+
+
+class TestSyncTask(unittest.TestCase):
+    """
+    Unit tests for building tasks from Todoist Sync API items.
+    """
+
+    def test_due_datetime_is_split(self):
+        """Test that a due date with a time is split into date and datetime."""
+        task = SyncTask.from_sync_item({
+            "id": "1", "content": "Task", "checked": False, "is_deleted": False,
+            "due": {"date": "2024-05-01T09:30:00", "timezone": None, "is_recurring": False},
+            "duration": {"amount": 45, "unit": "minute"},
+        })
+        self.assertEqual(task.due.date, "2024-05-01")
+        self.assertEqual(task.due.datetime, "2024-05-01T09:30:00")
+        self.assertEqual(task.duration.amount, 45)
+
+    def test_due_date_only(self):
+        """Test that a due date without a time has no datetime."""
+        task = SyncTask.from_sync_item({"id": "1", "content": "Task", "due": {"date": "2024-05-01"}})
+        self.assertEqual(task.due.date, "2024-05-01")
+        self.assertIsNone(task.due.datetime)
+
+    def test_legacy_item_uses_current_ids(self):
+        """Test that items shaped by the Sync API v9 get the current IDs from their 'v2_' fields."""
+        task = SyncTask.from_sync_item({
+            "id": "2995104339", "v2_id": "6Xq7", "project_id": "2203306141", "v2_project_id": "6Jf8",
+            "parent_id": None, "v2_parent_id": None, "content": "Task",
+        })
+        self.assertEqual((task.id, task.project_id, task.parent_id), ("6Xq7", "6Jf8", None))
+
+    def test_syncable_deltas(self):
+        """Test that completed, deleted and subtasks are not synced, while recurring tasks are."""
+        self.assertTrue(is_syncable_delta(SyncTask.from_sync_item({"id": "1", "content": "A"})))
+        self.assertFalse(is_syncable_delta(SyncTask.from_sync_item({"id": "1", "content": "A", "checked": True})))
+        self.assertFalse(is_syncable_delta(SyncTask.from_sync_item({"id": "1", "content": "A", "is_deleted": True})))
+        self.assertFalse(is_syncable_delta(SyncTask.from_sync_item({"id": "1", "content": "A", "parent_id": "2"})))
+        self.assertTrue(is_syncable_delta(SyncTask.from_sync_item(
+            {"id": "1", "content": "A", "due": {"date": "2024-05-01", "is_recurring": True}}
+        )))
+
+
+class TestIterTaskPages(unittest.TestCase):
+    """
+    Unit tests for the iter_task_pages function.
+    """
+
+    @patch("src.todoist_client.requests.get")
+    def test_cursor_followed_lazily(self, get):
+        """Test that each page is only requested once the previous one was consumed."""
+        get.side_effect = [
+            make_response({"results": [{"id": "1", "content": "A"}], "next_cursor": "next"}),
+            make_response({"results": [{"id": "2", "content": "B"}], "next_cursor": None}),
+        ]
+        pages = iter_task_pages(page_size=1)
+        self.assertEqual([task.id for task in next(pages)], ["1"])
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual([task.id for task in next(pages)], ["2"])
+        self.assertEqual(get.call_args.kwargs["params"], {"limit": 1, "cursor": "next"})
+        self.assertIsNone(next(pages, None))
+
+
+class TestGetTaskDeltas(unittest.TestCase):
+    """
+    Unit tests for the get_task_deltas function.
+    """
+
+    @patch("src.todoist_client.requests.post")
+    def test_incremental_sync(self, post):
+        """Test that the stored token is sent and the new token returned."""
+        post.return_value = make_response({"items": [{"id": "1", "content": "A"}], "sync_token": "new", "full_sync": False})
+        tasks, sync_token, full_sync = get_task_deltas("old")
+        self.assertEqual([task.id for task in tasks], ["1"])
+        self.assertEqual(sync_token, "new")
+        self.assertFalse(full_sync)
+        self.assertEqual(post.call_args.kwargs["data"]["sync_token"], "old")
+
+    @patch("src.todoist_client.requests.post")
+    def test_first_run_is_full_sync(self, post):
+        """Test that a full sync is requested when there is no token."""
+        post.return_value = make_response({"items": [], "sync_token": "new", "full_sync": True})
+        self.assertTrue(get_task_deltas(None)[2])
+        self.assertEqual(post.call_args.kwargs["data"]["sync_token"], "*")
+
+    @patch("src.todoist_client.requests.post")
+    def test_rejected_token_falls_back_to_full_sync(self, post):
+        """Test that a rejected token triggers a full sync."""
+        post.side_effect = [
+            make_response({}, status_code=400),
+            make_response({"items": [{"id": "1", "content": "A"}], "sync_token": "new", "full_sync": True}),
+        ]
+        tasks, sync_token, full_sync = get_task_deltas("invalid")
+        self.assertEqual(len(tasks), 1)
+        self.assertTrue(full_sync)
+        self.assertEqual(post.call_args.kwargs["data"]["sync_token"], "*")
+
+
+if __name__ == "__main__":
+    unittest.main()